@@ -0,0 +1,665 @@
+# ProxyEater.AsyncChecker.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import ssl  # This module is used to wrap the connections in TLS.
+import time  # This module is used to measure the latencies and the budget.
+import socket  # This module is used to create non-blocking sockets.
+import struct  # This module is used to build the SOCKS handshakes.
+import asyncio  # This module is used to run thousands of checks on one event loop.
+import ipaddress
+from typing import (Dict as _Dict, List as _List, Tuple as _Tuple, Union as _Union,
+                    Callable as _Callable, Optional as _Optional,
+                    Awaitable as _Awaitable, NamedTuple as _NamedTuple)
+from urllib.parse import SplitResult, urlsplit
+
+from .Proxy import Proxy, ProxyList, ProxyType, ProxyStatus
+from .Timeout import TimeoutPolicy
+from .Limits import HostLimiter, check_order
+from .Prefilter import PrefilterReport, run_prefilters
+from .Classifier import UrlRotation, find_real_ip
+from .Metrics import observe
+
+__all__ = [
+    'AsyncProxyChecker', 'ProxyProtocolError', 'ProxyResponse', 'fetch_via_proxy'
+]
+
+# The maximum number of body bytes that will be read from a check response.
+MAX_BODY_SIZE = 64 * 1024
+# The maximum number of bytes of the reply to a CONNECT read from the socket.
+MAX_HEAD_SIZE = 16 * 1024
+
+
+class ProxyProtocolError(Exception):
+    """This exception is raised when a proxy does not speak the expected
+    protocol."""
+
+
+class ProxyResponse(_NamedTuple):
+    """The response of a request sent through a proxy."""
+    status_code: int
+    headers: _Dict[str, str]
+    body: bytes  # At most MAX_BODY_SIZE bytes of the body
+    connect_time: float  # The seconds it took to connect to the proxy
+    ttfb: float  # The seconds it took to receive the first byte of the response
+    # Whether the proxy opened a CONNECT tunnel when asked to or None if it
+    # was not asked
+    supports_connect: _Optional[bool] = None
+
+
+def _insecure_context() -> ssl.SSLContext:
+    """Returns an SSL context that does not verify the peer.
+
+    It is used for the TLS hop to a proxy of type HTTPS: we are checking
+    whether the proxy works, not whether it can be trusted.
+    """
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+async def _connect(
+    loop: asyncio.AbstractEventLoop, host: str, port: int
+) -> socket.socket:
+    """Opens a non-blocking TCP connection to the given address.
+
+    :param loop: The running event loop.
+    :param host: The host to connect to.
+    :param port: The port to connect to.
+    :return: The connected socket.
+    """
+    family, type_, proto, _, address = (
+        await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    )[0]
+    sock = socket.socket(family, type_, proto)
+    sock.setblocking(False)
+    try:
+        await loop.sock_connect(sock, address)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+async def _recv_exactly(
+    loop: asyncio.AbstractEventLoop, sock: socket.socket, size: int
+) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = await loop.sock_recv(sock, size - len(data))
+        if not chunk:
+            raise ProxyProtocolError(
+                'The proxy closed the connection during the handshake.'
+            )
+        data += chunk
+    return data
+
+
+async def _socks4_handshake(
+    loop: asyncio.AbstractEventLoop, sock: socket.socket, host: str, port: int
+) -> None:
+    """Asks a SOCKS4 proxy to connect to the given address.
+
+    Like requests, the target host is resolved locally.
+    """
+    try:
+        address = ipaddress.IPv4Address(host).packed
+    except ValueError:
+        infos = await loop.getaddrinfo(host, port, family=socket.AF_INET,
+                                       type=socket.SOCK_STREAM)
+        address = socket.inet_aton(infos[0][4][0])
+    await loop.sock_sendall(sock, struct.pack('>BBH', 4, 1, port) + address + b'\x00')
+    reply = await _recv_exactly(loop, sock, 8)
+    if reply[1] != 0x5A:
+        raise ProxyProtocolError(f'The SOCKS4 proxy rejected the request({reply[1]}).')
+
+
+async def _socks5_handshake(
+    loop: asyncio.AbstractEventLoop, sock: socket.socket, host: str, port: int
+) -> None:
+    """Asks a SOCKS5 proxy to connect to the given address without
+    authentication."""
+    await loop.sock_sendall(sock, b'\x05\x01\x00')
+    reply = await _recv_exactly(loop, sock, 2)
+    if reply != b'\x05\x00':
+        raise ProxyProtocolError('The SOCKS5 proxy requires an authentication method.')
+    host_bytes = host.encode('idna')
+    await loop.sock_sendall(
+        sock,
+        b'\x05\x01\x00\x03' + bytes([len(host_bytes)]) + host_bytes +
+        struct.pack('>H', port)
+    )
+    reply = await _recv_exactly(loop, sock, 4)
+    if reply[1] != 0x00:
+        raise ProxyProtocolError(f'The SOCKS5 proxy rejected the request({reply[1]}).')
+    # Skip the bound address
+    if reply[3] == 0x01:
+        await _recv_exactly(loop, sock, 4 + 2)
+    elif reply[3] == 0x04:
+        await _recv_exactly(loop, sock, 16 + 2)
+    elif reply[3] == 0x03:
+        length = (await _recv_exactly(loop, sock, 1))[0]
+        await _recv_exactly(loop, sock, length + 2)
+    else:
+        raise ProxyProtocolError(
+            f'The SOCKS5 proxy sent an invalid address type({reply[3]}).'
+        )
+
+
+async def _http_connect(
+    loop: asyncio.AbstractEventLoop, sock: socket.socket, host: str, port: int
+) -> None:
+    """Asks an HTTP proxy to open a tunnel to the given address before the
+    socket is wrapped in a stream, so TLS to the target can be set up with
+    `asyncio.open_connection` on any Python version."""
+    await loop.sock_sendall(
+        sock,
+        f'CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n'.encode()
+    )
+    # The proxy sends nothing after its reply until the TLS handshake starts
+    head = b''
+    while b'\r\n\r\n' not in head:
+        if len(head) > MAX_HEAD_SIZE:
+            raise ProxyProtocolError('The proxy sent an invalid HTTP response.')
+        data = await loop.sock_recv(sock, 4096)
+        if not data:
+            raise ProxyProtocolError('The proxy closed the connection.')
+        head += data
+    status_line = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+    if len(status_line) < 2 or not status_line[0].startswith('HTTP/') or \
+            not status_line[1].isdigit():
+        raise ProxyProtocolError('The proxy sent an invalid HTTP response.')
+    if status_line[1] != '200':
+        raise ProxyProtocolError(f'The proxy refused to CONNECT({status_line[1]}).')
+
+
+async def _read_head(
+    reader: asyncio.StreamReader
+) -> _Tuple[int, _Dict[str, str], float]:
+    """Reads the status line and the headers of an HTTP/1.x response.
+
+    :param reader: The stream to read from.
+    :return: The status code, the headers and the time.perf_counter() time when
+            the status line arrived.
+    """
+    status_line = (await reader.readline()).decode('latin-1').split(' ', 2)
+    first_byte_time = time.perf_counter()
+    if len(status_line) < 2 or not status_line[0].startswith('HTTP/'):
+        raise ProxyProtocolError('The proxy sent an invalid HTTP response.')
+    status_code = int(status_line[1])
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if line in ('\r\n', '\n', ''):
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status_code, headers, first_byte_time
+
+
+async def _read_response(
+    reader: asyncio.StreamReader
+) -> _Tuple[int, _Dict[str, str], bytes, float]:
+    """Reads an HTTP/1.x response from the stream.
+
+    :param reader: The stream to read from.
+    :return: The status code, the headers, at most MAX_BODY_SIZE bytes of the body
+            and the time.perf_counter() time when the status line arrived.
+    """
+    status_code, headers, first_byte_time = await _read_head(reader)
+    body = b''
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while len(body) < MAX_BODY_SIZE:
+            size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                break
+            body += await reader.readexactly(size)
+            await reader.readline()
+    elif 'content-length' in headers:
+        body = await reader.readexactly(
+            min(int(headers['content-length']), MAX_BODY_SIZE)
+        )
+    else:
+        body = await reader.read(MAX_BODY_SIZE)
+    return status_code, headers, body, first_byte_time
+
+
+async def _wait(coroutine: _Awaitable, timeout: _Optional[float]):
+    if timeout is None:
+        return await coroutine
+    return await asyncio.wait_for(coroutine, timeout)
+
+
+async def _open_tunnel(proxy: Proxy, target: SplitResult) -> _Tuple[
+        asyncio.StreamReader, asyncio.StreamWriter, str, float]:
+    """Connects to the proxy and prepares it to forward a request to the
+    target.
+
+    The tunnels of the HTTP and SOCKS proxies are opened on the socket before
+    it is wrapped in a stream, so TLS to an https target works on every
+    supported Python version. Through an HTTPS proxy, the TLS of the target
+    runs inside the TLS of the proxy, which needs `StreamWriter.start_tls` of
+    Python 3.11; older versions raise a ProxyProtocolError for https targets.
+
+    :param proxy: The proxy to connect to.
+    :param target: The split url of the target.
+    :return: The reader, the writer, the request target to use in the request
+            line and the time it took to connect to the proxy.
+    """
+    loop = asyncio.get_running_loop()
+    host = target.hostname or ''
+    is_https = target.scheme == 'https'
+    port = target.port or (443 if is_https else 80)
+    path = target.path or '/'
+    if target.query:
+        path += '?' + target.query
+
+    start_time = time.perf_counter()
+    sock = await _connect(loop, proxy.ip, proxy.port)
+    connect_time = time.perf_counter() - start_time
+    writer = None
+    try:
+        if proxy.type in (ProxyType.SOCKS4, ProxyType.SOCKS5):
+            if proxy.type == ProxyType.SOCKS4:
+                await _socks4_handshake(loop, sock, host, port)
+            else:
+                await _socks5_handshake(loop, sock, host, port)
+            reader, writer = await asyncio.open_connection(
+                sock=sock,
+                ssl=ssl.create_default_context() if is_https else None,
+                server_hostname=host if is_https else None
+            )
+            return reader, writer, path, connect_time
+
+        if proxy.type != ProxyType.HTTPS:
+            if is_https:
+                await _http_connect(loop, sock, host, port)
+            reader, writer = await asyncio.open_connection(
+                sock=sock,
+                ssl=ssl.create_default_context() if is_https else None,
+                server_hostname=host if is_https else None
+            )
+            return reader, writer, path if is_https else target.geturl(), connect_time
+
+        reader, writer = await asyncio.open_connection(
+            sock=sock, ssl=_insecure_context(), server_hostname=proxy.ip
+        )
+        if not is_https:
+            return reader, writer, target.geturl(), connect_time
+        # The tunnel of an HTTPS proxy runs inside its TLS connection, so the TLS
+        # of the target has to be set up on top of the stream
+        if not hasattr(writer, 'start_tls'):  # Python < 3.11
+            raise ProxyProtocolError(
+                'TLS through an HTTPS proxy requires Python 3.11 or newer.'
+            )
+        writer.write(
+            f'CONNECT {host}:{port} HTTP/1.1\r\n'
+            f'Host: {host}:{port}\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        # A CONNECT reply has no body; reading one would wait for the tunnel
+        status_code, _, _ = await _read_head(reader)
+        if status_code != 200:
+            raise ProxyProtocolError(f'The proxy refused to CONNECT({status_code}).')
+        await writer.start_tls(ssl.create_default_context(), server_hostname=host)
+        return reader, writer, path, connect_time
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        else:
+            sock.close()
+        raise
+
+
+async def _send_connect(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, port: int
+) -> bool:
+    """Asks the proxy on the other end of the stream to open a tunnel.
+
+    :return: True if the proxy answered the CONNECT with 200.
+    """
+    writer.write(f'CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n'
+                 .encode())
+    await writer.drain()
+    status_code, _, _ = await _read_head(reader)
+    return status_code == 200
+
+
+async def _probe_connect(
+    proxy: Proxy,
+    host: str,
+    port: int,
+    connect_timeout: _Optional[float],
+    read_timeout: _Optional[float]
+) -> bool:
+    """Asks the proxy to CONNECT on a new connection; used when the
+    connection of the check could not be kept open."""
+    try:
+        reader, writer, _, _ = await _wait(
+            _open_tunnel(proxy, urlsplit(f'http://{host}/')), connect_timeout
+        )
+    except (OSError, asyncio.TimeoutError, ProxyProtocolError, ValueError):
+        return False
+    try:
+        return await _wait(_send_connect(reader, writer, host, port), read_timeout)
+    except (OSError, asyncio.TimeoutError, ProxyProtocolError, ValueError):
+        return False
+    finally:
+        writer.close()
+
+
+async def fetch_via_proxy(
+    proxy: Proxy,
+    url: str,
+    connect_timeout: _Optional[float] = None,
+    read_timeout: _Optional[float] = None,
+    connect_probe: _Optional[_Tuple[str, int]] = None
+) -> ProxyResponse:
+    """Sends a GET request to the url through the proxy.
+
+    The proxy types are handled the same way requests handles the
+    `{scheme}://ip:port` proxy URLs built by `str(proxy)`: HTTP proxies
+    get plain connections, HTTPS proxies get a TLS connection to the
+    proxy, and SOCKS proxies are asked to open a tunnel to the target.
+
+    :param proxy: The proxy to send the request through.
+    :param url: The url to request.
+    :param connect_timeout: The time limit of connecting to the proxy and
+            setting up the tunnel.
+    :param read_timeout: The time limit of sending the request and reading the
+            response.
+    :param connect_probe: A (host, port) address; if given, after a successful
+            response the proxy is asked to CONNECT to it on the same connection,
+            or on a new one if the proxy closed the first, and the answer is
+            returned as `supports_connect`.
+    :return: A ProxyResponse.
+    """
+    start_time = time.perf_counter()
+    target = urlsplit(url)
+    reader, writer, request_target, connect_time = await _wait(
+        _open_tunnel(proxy, target), connect_timeout
+    )
+    tunnel_time = time.perf_counter()
+    keep_alive = connect_probe is not None
+    try:
+        writer.write(
+            (
+                f'GET {request_target} HTTP/1.1\r\n'
+                f'Host: {target.netloc}\r\n'
+                'User-Agent: ProxyEater\r\n'
+                'Accept: */*\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+            ).encode()
+        )
+        await writer.drain()
+        status_code, headers, body, first_byte_time = await _wait(
+            _read_response(reader), read_timeout
+        )
+        end_time = time.perf_counter()
+        response = ProxyResponse(
+            status_code, headers, body, connect_time, first_byte_time - start_time
+        )
+        # The phases add up to the whole request: the TCP connect, the SOCKS,
+        # CONNECT and TLS handshakes, the wait for the first byte and the body
+        for phase, seconds in (
+            ('connect', connect_time),
+            ('handshake', tunnel_time - start_time - connect_time),
+            ('ttfb', first_byte_time - tunnel_time),
+            ('body', end_time - first_byte_time)
+        ):
+            observe('check_phase_seconds', seconds, phase=phase)
+        if not keep_alive or status_code != 200:
+            return response
+        # The connection can be reused only if the end of the body was known
+        # and the proxy did not say it would close it
+        reusable = headers.get('connection', '').lower() != 'close' and (
+            'content-length' in headers or
+            headers.get('transfer-encoding', '').lower() == 'chunked'
+        ) and len(body) < MAX_BODY_SIZE
+        supports_connect = None
+        if reusable:
+            try:
+                supports_connect = await _wait(
+                    _send_connect(reader, writer, *connect_probe), read_timeout
+                )
+            except (OSError, asyncio.TimeoutError, ProxyProtocolError, ValueError):
+                supports_connect = None  # Closed; ask again on a new connection
+        if supports_connect is None:
+            supports_connect = await _probe_connect(
+                proxy, *connect_probe, connect_timeout, read_timeout
+            )
+        observe('check_phase_seconds', time.perf_counter() - end_time, phase='classify')
+        return response._replace(supports_connect=supports_connect)
+    finally:
+        writer.close()
+
+
+class AsyncProxyChecker:
+    """This class is used to check many proxies concurrently on a single
+    event loop."""
+
+    def __init__(
+        self,
+        timeout: _Union[float, _Tuple[float, float]] = 10,
+        concurrency: int = 500,
+        url: _Union[str, _List[str]] = 'http://icanhazip.com/',
+        prefilter_timeout: _Optional[float] = None,
+        prefilter_concurrency: int = 500,
+        adaptive_percentile: _Optional[float] = None,
+        budget: _Optional[float] = None,
+        max_per_host: _Optional[int] = None,
+        max_per_subnet: _Optional[int] = None,
+        subnet_prefix: int = 24,
+        host_probe_timeout: _Optional[float] = None,
+        stop_after_alive: _Optional[int] = None,
+        order: _Optional[_Union[str, _Callable]] = None,
+        classify: bool = False,
+        real_ip: _Optional[str] = None
+    ) -> None:
+        """
+        :param timeout: The timeout of each check; either one number used for both
+                connecting and reading or a (connect, read) tuple.
+        :param concurrency: The maximum number of checks in flight at once.
+        :param url: The url to try to connect to through the proxies, or a list of
+                urls, e.g. of several judges, that the checks use in turn.
+        :param prefilter_timeout: If set, every check first runs `tcp_prefilter`
+                with this connect timeout and only the proxies that accept the
+                connection get the full check.
+        :param prefilter_concurrency: The maximum number of connections the
+                pre-filter opens at once.
+        :param adaptive_percentile: If set (0-100), the timeouts are lowered to this
+                percentile of the latencies of the proxies found alive so far.
+        :param budget: If set, each check stops after this many seconds and the
+                proxies that were not checked yet are marked as UNKNOWN.
+        :param max_per_host: The maximum number of checks in flight per IP.
+        :param max_per_subnet: The maximum number of checks in flight per subnet.
+        :param subnet_prefix: The prefix length of the IPv4 subnets.
+        :param host_probe_timeout: If set, every check first runs `host_probe` with
+                this connect timeout and skips all the ports of the IPs that do
+                not answer.
+        :param stop_after_alive: If set, each check stops as soon as this many
+                proxies are found alive; the checks in flight are cancelled and
+                the proxies that were not checked are marked as UNKNOWN.
+        :param order: The order to check the proxies in; see `check_order`.
+        :param classify: If True, the anonymity and the HTTPS support of the alive
+                proxies are found during the checks; see `Proxy.check_status`.
+        :param real_ip: Our own IP; if not given, it is found with the url on the
+                first check that classifies the proxies.
+        """
+        if concurrency < 1:
+            raise ValueError(f'The concurrency({concurrency}) must be at least 1.')
+        # Validate the limits now; every check gets a limiter of its own loop
+        HostLimiter(max_per_host, max_per_subnet, subnet_prefix)
+        self.max_per_host: _Optional[int] = max_per_host
+        self.max_per_subnet: _Optional[int] = max_per_subnet
+        self.subnet_prefix: int = subnet_prefix
+        self.host_probe_timeout: _Optional[float] = host_probe_timeout
+        # The report of the host probe of the last check
+        self.host_probe_report: _Optional[PrefilterReport] = None
+        if stop_after_alive is not None and stop_after_alive < 1:
+            raise ValueError(
+                f'The stop_after_alive({stop_after_alive}) must be at least 1.'
+            )
+        self.stop_after_alive: _Optional[int] = stop_after_alive
+        if isinstance(order, str):
+            ProxyList._metric_key(order)  # Raises a ValueError for unknown orders
+        self.order: _Optional[_Union[str, _Callable]] = order
+        self.classify: bool = classify
+        self.real_ip: _Optional[str] = real_ip
+        self.timeout: _Union[float, _Tuple[float, float]] = timeout
+        self.timeout_policy = TimeoutPolicy(timeout, adaptive_percentile)
+        self.budget: _Optional[float] = budget
+        self.concurrency: int = concurrency
+        self.url: _Union[str, _List[str]] = url
+        self.urls = UrlRotation(url)
+        self.prefilter_timeout: _Optional[float] = prefilter_timeout
+        self.prefilter_concurrency: int = prefilter_concurrency
+        # The report of the pre-filter of the last check
+        self.prefilter_report: _Optional[PrefilterReport] = None
+
+    async def check_proxy(
+        self, proxy: Proxy, remaining: _Optional[float] = None
+    ) -> bool:
+        """This method is used to check a single proxy.
+
+        :param proxy: The proxy to check.
+        :param remaining: The seconds left of the budget, if any.
+        :return: True if the proxy is alive, False otherwise.
+        """
+        start_time = time.perf_counter()
+        alive = await proxy.check_status_async(
+            self.timeout_policy.get(remaining), self.urls.next(),
+            classify=self.classify, real_ip=self.real_ip
+        )
+        if alive:
+            self.timeout_policy.record(time.perf_counter() - start_time)
+        return alive
+
+    async def check(
+        self,
+        proxies: ProxyList,
+        remove_dead: bool = True,
+        on_progress_callback: _Optional[_Callable] = None
+    ) -> None:
+        """This method is used to check the status of all proxies in the
+        list.
+
+        :param proxies: The list of proxies to check.
+        :param remove_dead: If True, dead proxies will be removed from the list.
+        :param on_progress_callback: A callback function to be called on each progress.
+        """
+        if on_progress_callback is not None:
+            if not callable(on_progress_callback):
+                raise TypeError(
+                    "AsyncProxyChecker.check() argument on_progress_callback must be "
+                    "a callable."
+                )
+        else:
+            on_progress_callback = lambda proxy_list, progress: None
+
+        start_time = time.perf_counter()
+        deadline = None
+        if self.budget is not None:
+            deadline = start_time + self.budget
+        loop = asyncio.get_running_loop()
+        if self.classify and self.real_ip is None:
+            self.real_ip = await loop.run_in_executor(
+                None, find_real_ip, self.urls.first, self.timeout_policy.read_timeout
+            )
+        prefilter_start_time = time.perf_counter()
+        # The filters have their own selector loop; keep them off the event loop
+        to_check, self.host_probe_report, self.prefilter_report = \
+            await loop.run_in_executor(
+                None, lambda: run_prefilters(
+                    proxies,
+                    remove_dead,
+                    self.host_probe_timeout,
+                    self.prefilter_timeout,
+                    concurrency=self.prefilter_concurrency,
+                    check_timeout=self.timeout_policy.connect_timeout,
+                    check_parallelism=self.concurrency
+                )
+            )
+        if self.host_probe_report is not None or self.prefilter_report is not None:
+            observe(
+                'check_prefilter_seconds', time.perf_counter() - prefilter_start_time
+            )
+
+        length = len(to_check)
+        finished: int = 0  # The number of proxies that have been checked.
+        alive_count: int = 0  # The number of proxies that turned out to be alive.
+        unchecked = set(to_check)
+        enough_alive = asyncio.Event()
+        pending = iter(check_order(to_check, self.order, self.subnet_prefix))
+        limiter = HostLimiter(
+            self.max_per_host, self.max_per_subnet, self.subnet_prefix
+        )
+
+        queued_time = time.perf_counter()
+
+        async def worker():
+            nonlocal finished, alive_count
+            # The iterator is shared by all the workers, so each proxy is checked once
+            for proxy in pending:
+                picked_time = time.perf_counter()
+                observe('check_queue_wait_seconds', picked_time - queued_time)
+                remaining = None if deadline is None else deadline - picked_time
+                if remaining is not None and remaining <= 0:
+                    proxy.status = ProxyStatus.UNKNOWN
+                else:
+                    try:
+                        await asyncio.wait_for(limiter.acquire_async(proxy), remaining)
+                    except asyncio.TimeoutError:
+                        proxy.status = ProxyStatus.UNKNOWN
+                    else:
+                        if limiter.enabled:
+                            observe(
+                                'check_limit_wait_seconds',
+                                time.perf_counter() - picked_time
+                            )
+                        try:
+                            alive = await self.check_proxy(
+                                proxy,
+                                None if deadline is None else
+                                deadline - time.perf_counter()
+                            )
+                        finally:
+                            await limiter.release_async(proxy)
+                        if not alive and deadline is not None and \
+                                time.perf_counter() >= deadline:
+                            # The check may have failed only because the budget
+                            # cut its timeout short
+                            proxy.status = ProxyStatus.UNKNOWN
+                unchecked.discard(proxy)
+                if proxy.status == ProxyStatus.DEAD and remove_dead:
+                    proxies.discard(proxy)
+                elif proxy.status == ProxyStatus.ALIVE:
+                    alive_count += 1
+                    if self.stop_after_alive is not None and \
+                            alive_count >= self.stop_after_alive:
+                        enough_alive.set()
+                finished += 1
+                on_progress_callback(proxies, finished / length * 99.99)
+
+        workers = asyncio.gather(
+            *(worker() for _ in range(min(self.concurrency, length)))
+        )
+        stopper = asyncio.ensure_future(enough_alive.wait())
+        await asyncio.wait([workers, stopper], return_when=asyncio.FIRST_COMPLETED)
+        stopper.cancel()
+        if not workers.done():
+            # Enough alive proxies were found; cancel the checks in flight
+            workers.cancel()
+            try:
+                await workers
+            except asyncio.CancelledError:
+                pass
+            for proxy in unchecked:
+                proxy.status = ProxyStatus.UNKNOWN
+        else:
+            workers.result()
+        observe('check_run_seconds', time.perf_counter() - start_time, engine='async')
+
+        on_progress_callback(proxies, 100)
@@ -0,0 +1,592 @@
+# ProxyEater.Benchmark.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import sys
+import json
+import math
+import queue
+import time  # This module is used to measure the durations.
+import random  # This module is used to give the fake proxies their behavior.
+import socket
+import asyncio  # This module is used to run thousands of fake proxies at once.
+import functools
+import importlib.util
+import multiprocessing  # This module is used to keep the fakes out of the numbers.
+from typing import (Any as _Any, Dict as _Dict, List as _List, Tuple as _Tuple,
+                    Callable as _Callable, Iterable as _Iterable, Optional as _Optional,
+                    NamedTuple as _NamedTuple)
+
+try:
+    import resource  # This module is used to measure the peak RSS and the CPU time.
+except ImportError:  # Windows
+    resource = None
+
+from .Proxy import Proxy, ProxyList, ProxyType
+from .Judge import JudgeServer
+
+__all__ = ['FakeProxyFarm', 'BenchmarkResult', 'run_benchmark']
+
+# The kinds of fake proxies: `connect` proxies forward plain requests and open
+# CONNECT tunnels, `http` proxies only forward plain requests
+PROXY_KINDS = ('http', 'connect', 'socks4', 'socks5')
+# The url the checks of the benchmark use; the fake proxies answer it themselves
+CHECK_URL = 'http://127.0.0.1/'
+SOURCE_FORMATS = ('pandas', 'json', 'text')
+
+
+class BenchmarkResult(_NamedTuple):
+    """The outcome of one benchmark case."""
+    case: str  # check:<engine> or scrape:<format>
+    size: int  # The number of proxies
+    concurrency: _Optional[int]  # The threads or the checks in flight
+    seconds: float
+    rate: float  # Checks or scraped proxies per second
+    p50: _Optional[float]  # The median latency of a check or of a page
+    p99: _Optional[float]
+    found: int  # The proxies found alive or scraped
+    peak_rss_mb: _Optional[float]  # The peak RSS of the process that ran the case
+    cpu_percent: float  # The CPU time of the case relative to its duration
+    note: str = ''  # What the case left out, if anything
+
+    def __str__(self) -> str:
+        def ms(value: _Optional[float]) -> str:
+            return '-' if value is None else f'{value * 1000:.1f}ms'
+
+        return (
+            f'{self.case:<14} size={self.size:<6} '
+            f'concurrency={"-" if self.concurrency is None else self.concurrency:<5} '
+            f'{self.rate:>9.1f}/s p50={ms(self.p50):>9} p99={ms(self.p99):>9} '
+            f'found={self.found:<6} rss='
+            f'{"-" if self.peak_rss_mb is None else f"{self.peak_rss_mb:.1f}MB":>8} '
+            f'cpu={self.cpu_percent:.0f}%' + (f' ({self.note})' if self.note else '')
+        )
+
+
+def _percentile(values: _List[float], percentile: float) -> _Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(math.ceil(percentile / 100 * len(values)) - 1, len(values) - 1)]
+
+
+def _socks_supported() -> bool:
+    """Tells if requests can use SOCKS proxies, which needs PySocks."""
+    return importlib.util.find_spec('socks') is not None
+
+
+def _raise_file_limit() -> None:
+    """Raises the soft limit of open files to the hard limit, as every fake
+    proxy needs a listening socket."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and (hard == resource.RLIM_INFINITY or
+                                           soft < hard):
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+class _Fakes:
+    """The fake proxies and source pages; lives in the process of the farm."""
+
+    def __init__(self, options: dict, addresses: _List[_Tuple[int, str]]) -> None:
+        self.options = options
+        self.addresses = addresses
+        self.random = random.Random(options['seed'])
+
+    async def handle_proxy(
+        self, kind: str, blackhole: bool, reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            if blackhole:
+                await reader.read()  # Never answer; wait until the client gives up
+                return
+            if kind == 'socks4':
+                await reader.readexactly(8)
+                await reader.readuntil(b'\x00')  # The user id
+                writer.write(b'\x00\x5a' + b'\x00' * 6)
+            elif kind == 'socks5':
+                methods = (await reader.readexactly(2))[1]
+                await reader.readexactly(methods)
+                writer.write(b'\x05\x00')
+                address_type = (await reader.readexactly(4))[3]
+                if address_type == 0x01:
+                    await reader.readexactly(4 + 2)
+                elif address_type == 0x04:
+                    await reader.readexactly(16 + 2)
+                else:
+                    await reader.readexactly((await reader.readexactly(1))[0] + 2)
+                writer.write(b'\x05\x00\x00\x01' + b'\x00' * 6)
+            head = await reader.readuntil(b'\r\n\r\n')
+            if head.startswith(b'CONNECT '):
+                if kind != 'connect':
+                    writer.write(b'HTTP/1.1 405 Method Not Allowed\r\n'
+                                 b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+                    return
+                writer.write(b'HTTP/1.1 200 Connection established\r\n\r\n')
+                head = await reader.readuntil(b'\r\n\r\n')
+            if self.random.random() < self.options['drop_rate']:
+                return  # Drop the connection without an answer
+            delay = self.options['latency'] + \
+                self.random.uniform(0, self.options['jitter'])
+            if delay > 0:
+                await asyncio.sleep(delay)
+            body = JudgeServer.render(
+                writer.get_extra_info('peername')[0], head.rstrip(b'\r\n')
+            )
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: ' +
+                str(len(body)).encode() + b'\r\nConnection: close\r\n\r\n' + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def render_page(self, format_: str, page: int) -> _Tuple[bytes, bytes]:
+        """Returns the content type and the body of a source page; the pages
+        after the last proxy are empty."""
+        per_page = self.options['per_page']
+        addresses = self.addresses[(page - 1) * per_page:page * per_page]
+        host = self.options['host']
+        if format_ == 'json':
+            return b'application/json', json.dumps({'data': [
+                {'ip': host, 'port': port} for port, _ in addresses
+            ]}).encode()
+        if format_ == 'text':
+            return b'text/plain', ''.join(
+                f'{host}:{port}\n' for port, _ in addresses
+            ).encode()
+        rows = ''.join(
+            f'<tr><td>{host}</td><td>{port}</td>'
+            f'<td>{kind if kind.startswith("socks") else "http"}</td></tr>'
+            for port, kind in addresses
+        )
+        return b'text/html', (
+            '<html><body><table><thead><tr><th>IP Address</th><th>Port</th>'
+            f'<th>Protocol</th></tr></thead><tbody>{rows}</tbody></table>'
+            '</body></html>'
+        ).encode()
+
+    async def handle_source(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                # GET /<format>/<page> HTTP/1.1
+                parts = head.split(b' ', 2)[1].decode().strip('/').split('/')
+                if len(parts) == 2 and parts[0] in SOURCE_FORMATS and \
+                        parts[1].isdigit() and int(parts[1]) >= 1:
+                    content_type, body = self.render_page(parts[0], int(parts[1]))
+                    status = b'200 OK'
+                else:
+                    content_type, body, status = b'text/plain', b'', b'404 Not Found'
+                writer.write(
+                    b'HTTP/1.1 ' + status + b'\r\nContent-Type: ' + content_type +
+                    b'\r\nContent-Length: ' + str(len(body)).encode() + b'\r\n\r\n' +
+                    body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve_fakes(options: dict, messages: multiprocessing.Queue) -> None:
+    _raise_file_limit()
+    rng = random.Random(options['seed'])
+    addresses: _List[_Tuple[int, str]] = []
+    fakes = _Fakes(options, addresses)
+    servers = []
+    for index in range(options['size']):
+        kind = options['kinds'][index % len(options['kinds'])]
+        roll = rng.random()
+        sock = socket.socket()
+        sock.bind((options['host'], 0))
+        addresses.append((sock.getsockname()[1], kind))
+        if roll < options['dead_rate']:
+            sock.close()  # Nothing listens on the port, so connecting is refused
+            continue
+        blackhole = roll < options['dead_rate'] + options['blackhole_rate']
+        servers.append(await asyncio.start_server(
+            functools.partial(fakes.handle_proxy, kind, blackhole), sock=sock
+        ))
+    source = await asyncio.start_server(fakes.handle_source, options['host'], 0)
+    messages.put((addresses, source.sockets[0].getsockname()[1]))
+    await asyncio.Event().wait()
+
+
+def _run_fakes(options: dict, messages: multiprocessing.Queue) -> None:
+    try:
+        asyncio.run(_serve_fakes(options, messages))
+    except KeyboardInterrupt:
+        pass
+    except BaseException as ex:
+        messages.put(ex)
+
+
+class FakeProxyFarm:
+    """This class runs local fake proxies and proxy list pages in a separate
+    process, so the checker and the scraper can be measured without the
+    internet:
+
+    >>> with FakeProxyFarm(1000, latency=0.05, blackhole_rate=0.1) as farm:
+    ...     proxies = farm.proxy_list()
+    ...     proxies.check_all(url=CHECK_URL, timeout=2)
+
+    Every fake proxy listens on its own port and answers any request with
+    the body of a judge. The behavior of each proxy is picked with the seed,
+    so the same arguments give the same farm.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        kinds: _Iterable[str] = PROXY_KINDS,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        blackhole_rate: float = 0.0,
+        dead_rate: float = 0.0,
+        per_page: int = 100,
+        seed: int = 0,
+        host: str = '127.0.0.1'
+    ) -> None:
+        """
+        :param size: The number of fake proxies.
+        :param kinds: The kinds of the proxies, used in turn: http, connect (HTTP
+                with CONNECT support), socks4 and socks5.
+        :param latency: The seconds every proxy waits before answering.
+        :param jitter: Up to this many seconds are added to the latency at random.
+        :param drop_rate: The share of the requests answered by closing the
+                connection.
+        :param blackhole_rate: The share of the proxies that accept connections
+                but never answer.
+        :param dead_rate: The share of the proxies whose port refuses connections.
+        :param per_page: The number of proxies on each source page.
+        :param seed: The seed of the random behavior.
+        :param host: The address the fakes listen on.
+        """
+        kinds = tuple(kinds)
+        if size < 1:
+            raise ValueError(f'The size({size}) must be at least 1.')
+        if not kinds or any(kind not in PROXY_KINDS for kind in kinds):
+            raise ValueError(f'The kinds({kinds}) must be some of {PROXY_KINDS}.')
+        for name, rate in (('drop_rate', drop_rate), ('blackhole_rate', blackhole_rate),
+                           ('dead_rate', dead_rate)):
+            if not 0 <= rate <= 1:
+                raise ValueError(f'The {name}({rate}) must be between 0 and 1.')
+        if per_page < 1:
+            raise ValueError(f'The per_page({per_page}) must be at least 1.')
+        self.options: dict = dict(
+            size=size, kinds=kinds, latency=latency, jitter=jitter,
+            drop_rate=drop_rate, blackhole_rate=blackhole_rate, dead_rate=dead_rate,
+            per_page=per_page, seed=seed, host=host
+        )
+        self.host: str = host
+        self.addresses: _List[_Tuple[int, str]] = []  # (port, kind) of each proxy
+        self.source_port: _Optional[int] = None
+        self._process: _Optional[multiprocessing.Process] = None
+
+    def start(self, timeout: float = 60) -> None:
+        """Starts the fakes and waits until they listen.
+
+        :param timeout: The seconds to wait for the fakes to start.
+        """
+        if self._process is not None:
+            return
+        messages = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_run_fakes, args=(self.options, messages), daemon=True
+        )
+        self._process.start()
+        message = messages.get(timeout=timeout)
+        if isinstance(message, BaseException):
+            self.stop()
+            raise message
+        self.addresses, self.source_port = message
+
+    def stop(self) -> None:
+        """Stops the fakes."""
+        if self._process is None:
+            return
+        self._process.terminate()
+        self._process.join()
+        self._process = None
+
+    def proxy_list(self, size: _Optional[int] = None) -> ProxyList:
+        """Returns new Proxy objects for the first `size` fake proxies.
+
+        :param size: The number of proxies(default: all of them).
+        """
+        return _proxy_list(self.host, self.addresses[:size])
+
+    def sources(self) -> _List[dict]:
+        """Returns the specs of the fake source pages, in the format of
+        sources.json, for the `pandas`, `json` and `text` parsers."""
+        base = f'http://{self.host}:{self.source_port}'
+        pages = {'start': 1, 'end': 'no-proxy'}
+        return [
+            {
+                'id': 'fake-pandas', 'url': base + '/pandas/{page}', 'method': 'GET',
+                'parser': {'pandas': {
+                    'table_index': 0, 'ip': 'IP Address', 'port': 'Port',
+                    'combined': None, 'pages': pages,
+                    'type': {'default': 'HTTP', 'protocols': {
+                        'header': 'Protocol', 'http': 'http', 'https': 'https',
+                        'socks4': 'socks4', 'socks5': 'socks5'
+                    }}
+                }}
+            },
+            {
+                'id': 'fake-json', 'url': base + '/json/{page}', 'method': 'GET',
+                'parser': {'json': {
+                    'data': 'data', 'ip': 'ip', 'port': 'port', 'pages': pages,
+                    'type': {'default': 'HTTP'}
+                }}
+            },
+            {
+                'id': 'fake-text', 'url': base + '/text/{page}', 'method': 'GET',
+                'parser': {'text': {'pages': pages, 'type': {'default': 'HTTP'}}}
+            }
+        ]
+
+    def __enter__(self) -> FakeProxyFarm:
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f'FakeProxyFarm(size={self.options["size"]}, host={self.host!r})'
+
+
+def _proxy_list(host: str, addresses: _List[_Tuple[int, str]]) -> ProxyList:
+    types = {'http': ProxyType.HTTP, 'connect': ProxyType.HTTP,
+             'socks4': ProxyType.SOCKS4, 'socks5': ProxyType.SOCKS5}
+    return ProxyList(Proxy(host, port, types[kind]) for port, kind in addresses)
+
+
+def _limit_source(source: dict, size: int, per_page: int) -> dict:
+    """Returns a copy of a source spec that stops after the pages holding the
+    first `size` proxies."""
+    source = json.loads(json.dumps(source))
+    config = list(source['parser'].values())[0]
+    config['pages'] = {'start': 1, 'end': math.ceil(size / per_page)}
+    return source
+
+
+def _usage() -> _Tuple[float, _Optional[float]]:
+    """Returns the CPU seconds used by this process and its children and the
+    peak RSS in megabytes, if it can be measured."""
+    if resource is None:
+        return time.process_time(), None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes, but in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (
+        own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        max(own.ru_maxrss, children.ru_maxrss) / unit
+    )
+
+
+def _measure_check(
+    proxies: ProxyList, engine: str, concurrency: int, processes: _Optional[int],
+    timeout: float
+) -> _Tuple[int, _List[float]]:
+    if engine == 'async':
+        asyncio.run(proxies.check_all_async(
+            timeout=timeout, concurrency=concurrency, url=CHECK_URL
+        ))
+    else:
+        proxies.check_all(
+            timeout=timeout, threads_no=concurrency, url=CHECK_URL,
+            processes=processes
+        )
+    return proxies.count, [proxy.latency for proxy in proxies
+                           if proxy.latency is not None]
+
+
+def _make_scraper(source: dict, timeout: float):
+    from .Scraper import Scraper
+
+    # Building the scraper imports pandas for the pandas sources
+    return Scraper(
+        url=source['url'], parser=source['parser'], method=source['method'],
+        name=source['id'], request_timeout=timeout
+    )
+
+
+def _measure_scrape(scraper) -> _Tuple[int, _List[float]]:
+    page_times: _List[float] = []
+    started: _Dict[int, float] = {}
+
+    def on_progress(_, progress: float, page: int) -> None:
+        if progress == 0:
+            started[page] = time.perf_counter()
+        elif progress == 100 and page in started:
+            page_times.append(time.perf_counter() - started.pop(page))
+
+    errors = []
+    proxies = scraper.get_proxies(
+        on_progress_callback=on_progress,
+        on_failure_callback=lambda _, error: errors.append(error)
+    )
+    if errors:
+        raise errors[0]
+    return proxies.count, page_times
+
+
+def _run_case(case: dict, messages: multiprocessing.Queue) -> None:
+    """Runs one case in a fresh process so its peak RSS and CPU time are its
+    own."""
+    try:
+        # The proxies and the scraper are made before the clock starts
+        if case['kind'] == 'check':
+            proxies = _proxy_list(case['host'], case['addresses'])
+        else:
+            scraper = _make_scraper(case['source'], case['timeout'])
+        cpu_start, _ = _usage()
+        start_time = time.perf_counter()
+        if case['kind'] == 'check':
+            found, latencies = _measure_check(
+                proxies, case['engine'], case['concurrency'], case['processes'],
+                case['timeout']
+            )
+        else:
+            found, latencies = _measure_scrape(scraper)
+        seconds = time.perf_counter() - start_time
+        cpu_end, peak_rss = _usage()
+        messages.put(BenchmarkResult(
+            case=case['name'],
+            size=case['size'],
+            concurrency=case.get('concurrency'),
+            seconds=seconds,
+            rate=(case['size'] if case['kind'] == 'check' else found) / seconds,
+            p50=_percentile(latencies, 50),
+            p99=_percentile(latencies, 99),
+            found=found,
+            peak_rss_mb=peak_rss,
+            cpu_percent=(cpu_end - cpu_start) / seconds * 100,
+            note=case.get('note', '')
+        ))
+    except BaseException as ex:
+        messages.put(RuntimeError(f'{case["name"]}: {ex.__class__.__name__}: {ex}'))
+
+
+def run_benchmark(
+    sizes: _Iterable[int] = (100, 1000),
+    concurrency_levels: _Iterable[int] = (50, 200),
+    engine: str = 'threads',
+    processes: _Optional[int] = None,
+    timeout: float = 5,
+    latency: float = 0.05,
+    jitter: float = 0.05,
+    drop_rate: float = 0.0,
+    blackhole_rate: float = 0.0,
+    dead_rate: float = 0.0,
+    seed: int = 0,
+    scrape: bool = True,
+    on_result_callback: _Optional[_Callable] = None
+) -> _List[BenchmarkResult]:
+    """Measures the checker at every size and concurrency level and the
+    scraper at every size against a `FakeProxyFarm`.
+
+    Every case runs in its own process and the farm in another, so the
+    reported peak RSS and CPU time belong to the case alone.
+
+    The threads engine needs PySocks for SOCKS proxies. If it is missing, the
+    farm has no SOCKS fakes and the note of each result says so.
+
+    :param sizes: The numbers of proxies to check and to scrape.
+    :param concurrency_levels: The numbers of threads, or of checks in flight for
+            the async engine.
+    :param engine: The checking engine; threads or async.
+    :param processes: The processes of the threads engine; see `check_all`.
+    :param timeout: The timeout of the checks and of the page requests.
+    :param latency: The seconds every fake proxy waits before answering.
+    :param jitter: Up to this many seconds are added to the latency at random.
+    :param drop_rate: The share of the requests the fakes drop.
+    :param blackhole_rate: The share of the fakes that never answer.
+    :param dead_rate: The share of the fakes that refuse connections.
+    :param seed: The seed of the behavior of the fakes.
+    :param scrape: If False, the scraper is not measured.
+    :param on_result_callback: A callback function to be called with each
+            BenchmarkResult as soon as it is ready.
+    :return: The results.
+    """
+    if on_result_callback is not None:
+        if not callable(on_result_callback):
+            raise TypeError(
+                "run_benchmark() argument on_result_callback must be a callable."
+            )
+    else:
+        on_result_callback = lambda result: None
+    if engine not in ('threads', 'async'):
+        raise ValueError(f'The engine({engine}) must be either threads or async.')
+    sizes = sorted(set(sizes))
+    concurrency_levels = sorted(set(concurrency_levels))
+    if not sizes or sizes[0] < 1 or not concurrency_levels or concurrency_levels[0] < 1:
+        raise ValueError('The sizes and the concurrency levels must be at least 1.')
+
+    kinds, note = PROXY_KINDS, ''
+    if engine == 'threads' and not _socks_supported():
+        kinds = tuple(kind for kind in PROXY_KINDS if not kind.startswith('socks'))
+        note = 'no SOCKS proxies: PySocks is not installed'
+
+    results: _List[BenchmarkResult] = []
+    with FakeProxyFarm(
+        sizes[-1], kinds=kinds, latency=latency, jitter=jitter, drop_rate=drop_rate,
+        blackhole_rate=blackhole_rate, dead_rate=dead_rate, seed=seed
+    ) as farm:
+        cases: _List[_Dict[str, _Any]] = []
+        for size in sizes:
+            for concurrency in concurrency_levels:
+                # Plain tuples; the proxies are built in the process of the case
+                cases.append(dict(
+                    kind='check', name=f'check:{engine}', size=size,
+                    host=farm.host, addresses=farm.addresses[:size], engine=engine,
+                    concurrency=concurrency, processes=processes, timeout=timeout,
+                    note=note
+                ))
+        if scrape:
+            for size in sizes:
+                for source in farm.sources():
+                    cases.append(dict(
+                        kind='scrape', name='scrape:' + source['id'][len('fake-'):],
+                        size=size, timeout=timeout, source=_limit_source(
+                            source, size, farm.options['per_page']
+                        )
+                    ))
+        for case in cases:
+            messages = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_run_case, args=(case, messages))
+            process.start()
+            while True:
+                try:
+                    result = messages.get(timeout=0.5)
+                    break
+                except queue.Empty:
+                    if process.exitcode not in (None, 0):
+                        raise RuntimeError(
+                            f'{case["name"]}: The process of the case exited with '
+                            f'code {process.exitcode}.'
+                        )
+            process.join()
+            if isinstance(result, BaseException):
+                raise result
+            results.append(result)
+            on_result_callback(result)
+    return results
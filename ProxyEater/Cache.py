@@ -0,0 +1,344 @@
+# ProxyEater.Cache.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import os
+import json  # This module is used to store the cache on the disk.
+import time  # This module is used to timestamp the results.
+import pathlib
+import threading  # This module is used to share the source cache between threads.
+from typing import (Any as _Any, Dict as _Dict, Union as _Union, Mapping as _Mapping,
+                    Iterable as _Iterable, Optional as _Optional)
+
+from .Proxy import Proxy, ProxyList, ProxyType, ProxyStatus, ProxyAnonymity
+
+__all__ = ['CheckCache', 'SourceCache']
+
+
+def proxy_key(proxy: Proxy) -> str:
+    """Returns the key of a proxy in the files; ip:port, like the equality of
+    the proxies, so a proxy listed with another type is still found."""
+    return f'{proxy.ip}:{proxy.port}'
+
+
+def load_json(path: pathlib.Path) -> _Optional[_Dict[str, _Any]]:
+    """Returns the dict stored in a json file, or None if the file does not
+    exist or is damaged.
+
+    :param path: The path of the file.
+    """
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def save_json(
+    path: pathlib.Path, data: _Mapping[str, _Any], lock: _Optional[_Any] = None
+) -> None:
+    """Writes a dict to a json file through a temporary file that replaces
+    the old one at once, so a crash never leaves half a file.
+
+    :param path: The path of the file; its directory is created if needed.
+    :param data: The dict.
+    :param lock: A lock held while the dict is written, if others change it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        if lock is None:
+            json.dump(data, file)
+        else:
+            with lock:
+                json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+class CheckCache:
+    """This class keeps the results of the checks on the disk so the proxies
+    that were checked recently do not have to be checked again.
+
+    A result is reused while it is younger than its TTL; the TTL of the
+    dead proxies works as a cooldown before they are tried again:
+
+    >>> cache = CheckCache('checks.json', alive_ttl=900, dead_ttl=3600)
+    >>> proxies.check_all(cache=cache)
+    """
+
+    def __init__(
+        self,
+        path: _Union[str, os.PathLike],
+        alive_ttl: float = 900,
+        dead_ttl: float = 3600
+    ) -> None:
+        """
+        :param path: The path of the cache file; it is created on the first save.
+        :param alive_ttl: The number of seconds the result of an alive proxy is
+                reused.
+        :param dead_ttl: The number of seconds a dead proxy is not checked again.
+        """
+        if alive_ttl < 0 or dead_ttl < 0:
+            raise ValueError(
+                f'The TTLs(alive_ttl={alive_ttl}, dead_ttl={dead_ttl}) must not be '
+                'negative.'
+            )
+        self.path: pathlib.Path = pathlib.Path(path)
+        self.alive_ttl: float = alive_ttl
+        self.dead_ttl: float = dead_ttl
+        self.hits: int = 0  # The number of results reused by `apply`
+        self._entries: _Dict[str, dict] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Loads the cache file if it exists. A damaged file is ignored."""
+        entries = load_json(self.path)
+        if entries is not None:
+            self._entries = entries
+
+    def save(self) -> None:
+        """Writes the cache to the disk, leaving the expired results out."""
+        self.prune()
+        save_json(self.path, self._entries)
+
+    def _ttl(self, status: str) -> float:
+        return self.alive_ttl if status == 'alive' else self.dead_ttl
+
+    def prune(self) -> None:
+        """Removes the expired results."""
+        now = time.time()
+        self._entries = {
+            key: entry
+            for key, entry in self._entries.items()
+            if now - entry['checked_at'] < self._ttl(entry['status'])
+        }
+
+    def get(self, proxy: Proxy) -> _Optional[dict]:
+        """Returns the fresh result of a proxy or None.
+
+        :param proxy: The proxy.
+        :return: A dict with the type, status, checked_at, latency, connect_time,
+                ttfb, anonymity and supports_https keys or None if there is no fresh
+                result.
+        """
+        entry = self._entries.get(proxy_key(proxy))
+        if entry is None or time.time() - entry['checked_at'] >= self._ttl(
+                entry['status']):
+            return None
+        return entry
+
+    def apply(self, proxies: ProxyList) -> ProxyList:
+        """Sets the cached status and timings on the proxies that have a fresh
+        result.
+
+        :param proxies: The proxies.
+        :return: A list of the proxies that still need to be checked.
+        """
+        to_check = ProxyList()
+        for proxy in proxies:
+            entry = self.get(proxy)
+            if entry is None:
+                to_check.add(proxy)
+                continue
+            self.hits += 1
+            self._set_result(proxy, entry)
+        return to_check
+
+    @staticmethod
+    def _set_result(proxy: Proxy, entry: dict) -> None:
+        if entry.get('type') is not None:  # The type the result was found with
+            proxy.type = ProxyType.from_name(entry['type'])
+        proxy.status = ProxyStatus.from_name(entry['status'])
+        for name in ('latency', 'connect_time', 'ttfb', 'supports_https'):
+            if entry.get(name) is not None:
+                setattr(proxy, name, entry[name])
+        if entry.get('anonymity') is not None:
+            proxy.anonymity = ProxyAnonymity.from_name(entry['anonymity'])
+
+    def store(self, proxies: _Iterable[Proxy]) -> None:
+        """Records the results of the checked proxies. Proxies whose status is
+        UNKNOWN are not recorded.
+
+        :param proxies: The checked proxies.
+        """
+        now = time.time()
+        for proxy in proxies:
+            if proxy.status == ProxyStatus.UNKNOWN:
+                continue
+            self._entries[proxy_key(proxy)] = {
+                'type': proxy.type.name.lower(),
+                'status': proxy.status.name.lower(),
+                'checked_at': now,
+                'latency': proxy.latency,
+                'connect_time': proxy.connect_time,
+                'ttfb': proxy.ttfb,
+                'anonymity': proxy.anonymity.name.lower(),
+                'supports_https': proxy.supports_https
+            }
+
+    def merge(
+        self, proxies: ProxyList, checked: _Iterable[Proxy], remove_dead: bool = True
+    ) -> None:
+        """Records the results of the proxies returned by `apply` after they
+        were checked, saves the cache and removes the dead proxies.
+
+        :param proxies: The list that was passed to `apply`.
+        :param checked: The proxies that were checked.
+        :param remove_dead: If True, dead proxies will be removed from `proxies`,
+                including the ones known to be dead from the cache.
+        """
+        self.store(checked)
+        self.save()
+        if remove_dead:
+            for proxy in [proxy for proxy in proxies
+                          if proxy.status == ProxyStatus.DEAD]:
+                proxies.discard(proxy)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f'CheckCache(path={str(self.path)!r}, alive_ttl={self.alive_ttl}, '
+            f'dead_ttl={self.dead_ttl}, entries={len(self)})'
+        )
+
+
+class SourceCache:
+    """This class keeps the proxies found in the pages of the sources on the
+    disk together with the ETag and Last-Modified headers of the pages.
+
+    A page fetched less than its minimum refresh interval ago is not
+    requested at all; an older one is requested conditionally and, if the
+    server answers 304 Not Modified, its stored proxies are reused without
+    downloading or parsing it again:
+
+    >>> cache = SourceCache('sources.json')
+    >>> Scraper(url, parser, cache=cache, min_refresh=300).get_proxies()
+    >>> cache.save()
+    """
+
+    def __init__(
+        self, path: _Union[str, os.PathLike], max_age: float = 7 * 86400
+    ) -> None:
+        """
+        :param path: The path of the cache file; it is created on the first save.
+        :param max_age: The number of seconds a page that is not fetched again is
+                kept.
+        """
+        if max_age < 0:
+            raise ValueError(f'The maximum age({max_age}) must not be negative.')
+        self.path: pathlib.Path = pathlib.Path(path)
+        self.max_age: float = max_age
+        self.hits: int = 0  # The number of pages reused without a request
+        self.revalidations: int = 0  # The number of pages the server left unchanged
+        self._entries: _Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Loads the cache file if it exists. A damaged file is ignored."""
+        entries = load_json(self.path)
+        if entries is not None:
+            self._entries = entries
+
+    def save(self) -> None:
+        """Writes the cache to the disk, leaving the expired pages out."""
+        self.prune()
+        save_json(self.path, self._entries, self._lock)
+
+    def prune(self) -> None:
+        """Removes the pages that were not fetched for `max_age` seconds."""
+        now = time.time()
+        with self._lock:
+            self._entries = {
+                url: entry
+                for url, entry in self._entries.items()
+                if now - entry['fetched_at'] < self.max_age
+            }
+
+    @staticmethod
+    def _proxies(entry: dict) -> ProxyList:
+        return ProxyList(
+            Proxy(ip, port, ProxyType.from_name(type_))
+            for ip, port, type_ in entry['proxies']
+        )
+
+    def get_fresh(self, url: str, min_refresh: float) -> _Optional[ProxyList]:
+        """Returns the stored proxies of a page fetched less than `min_refresh`
+        seconds ago, or None if the page has to be requested.
+
+        :param url: The url of the page.
+        :param min_refresh: The minimum number of seconds between two requests of
+                the page.
+        :return: The proxies or None.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or time.time() - entry['fetched_at'] >= min_refresh:
+                return None
+            self.hits += 1
+        return self._proxies(entry)
+
+    def headers(self, url: str) -> _Dict[str, str]:
+        """Returns the headers that make the request of a page conditional.
+
+        :param url: The url of the page.
+        :return: The If-None-Match and If-Modified-Since headers the stored page
+                allows; empty if the page is not stored.
+        """
+        entry = self._entries.get(url)
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidate(self, url: str) -> ProxyList:
+        """Returns the stored proxies of a page the server answered with 304
+        Not Modified and restarts its refresh interval.
+
+        :param url: The url of the page.
+        :return: The proxies; empty if the page is not stored.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return ProxyList()
+            entry['fetched_at'] = time.time()
+            self.revalidations += 1
+        return self._proxies(entry)
+
+    def store(
+        self, url: str, headers: _Mapping[str, str], proxies: _Iterable[Proxy]
+    ) -> None:
+        """Records the proxies found in a page.
+
+        :param url: The url of the page.
+        :param headers: The headers of the response.
+        :param proxies: The proxies found in the page.
+        """
+        entry = {
+            'fetched_at': time.time(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'proxies': [[proxy.ip, proxy.port, proxy.type.name.lower()]
+                        for proxy in proxies]
+        }
+        with self._lock:
+            self._entries[url] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f'SourceCache(path={str(self.path)!r}, max_age={self.max_age}, '
+            f'entries={len(self)})'
+        )
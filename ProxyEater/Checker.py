@@ -0,0 +1,716 @@
+# ProxyEater.Checker.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import os
+import math
+import time  # This module is used to measure the latencies and the budget.
+import queue  # This module is used to hand the proxies to the worker threads.
+import asyncio
+import threading  # This module is used to create threads.
+import traceback
+import multiprocessing  # This module is used to check the shards in parallel.
+from typing import (Any as _Any, Dict as _Dict, List as _List, Tuple as _Tuple,
+                    Union as _Union, Callable as _Callable, Iterable as _Iterable,
+                    Optional as _Optional)
+
+import requests  # This module is used for sending requests to the servers.
+
+from .Proxy import Proxy, ProxyList, ProxyStatus, ProxyAnonymity
+from .Pool import ProxyPoolAdapter
+from .Timeout import TimeoutPolicy
+from .Limits import HostLimiter, check_order, subnet_of
+from .Prefilter import PrefilterReport, run_prefilters
+from .Classifier import UrlRotation, find_real_ip
+from .Metrics import Metrics, observe, get_metrics, enable_metrics
+from .AsyncChecker import AsyncProxyChecker
+
+__all__ = ['ProxyChecker', 'ShardedProxyChecker']
+
+
+class _Batch:
+    """This class keeps track of the proxies of one `ProxyChecker.check` or
+    `ProxyChecker.check_stream` call."""
+
+    def __init__(
+        self, proxies: ProxyList, to_check: set, remove_dead: bool,
+        on_progress_callback: _Callable, deadline: _Optional[float],
+        stop_after_alive: _Optional[int] = None,
+        on_checked_callback: _Optional[_Callable] = None, feeding: bool = False
+    ) -> None:
+        self.proxies: ProxyList = proxies
+        self.remove_dead: bool = remove_dead
+        self.on_progress_callback: _Callable = on_progress_callback
+        self.pending: set = set(to_check)  # The proxies that are not checked yet.
+        self.length: int = len(to_check)  # The number of proxies queued for checking.
+        self.deadline: _Optional[float] = deadline  # In time.perf_counter() seconds
+        self.stop_after_alive: _Optional[int] = stop_after_alive
+        self.finished: int = 0  # The number of proxies that have been checked.
+        self.alive: int = 0  # The number of proxies that turned out to be alive.
+        # Set once enough alive proxies are found; the rest are left unchecked
+        self.stopped: bool = False
+        self.error: _Optional[BaseException] = None
+        self.on_checked_callback: _Optional[_Callable] = on_checked_callback
+        # Set while more proxies may be added; the batch is not done until then
+        self.feeding: bool = feeding
+        self.lock = threading.Lock()
+        self.done_event = threading.Event()
+        if self.length == 0 and not self.feeding:
+            self.done_event.set()
+
+    def remaining(self) -> _Optional[float]:
+        """Returns the seconds left of the budget or None if there is no
+        budget."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.perf_counter()
+
+    def add(self, proxy: Proxy) -> bool:
+        """Adds a proxy to a batch that is being fed.
+
+        :param proxy: The proxy that is going to be checked.
+        :return: False if the batch stopped and the proxy must not be checked.
+        """
+        with self.lock:
+            if self.stopped:
+                return False
+            self.pending.add(proxy)
+            self.length += 1
+            return True
+
+    def close_feed(self) -> None:
+        """Tells the batch no more proxies are added."""
+        with self.lock:
+            self.feeding = False
+            if self.finished == self.length:
+                self.done_event.set()
+
+    def done(self, proxy: Proxy) -> None:
+        """Records the result of a checked proxy.
+
+        :param proxy: The proxy that was checked.
+        """
+        with self.lock:
+            if self.stopped:
+                # The check was still running when the batch stopped
+                if proxy.status != ProxyStatus.ALIVE:
+                    proxy.status = ProxyStatus.UNKNOWN
+                return
+            self.pending.discard(proxy)
+            if proxy.status == ProxyStatus.DEAD and self.remove_dead:
+                self.proxies.discard(proxy)
+            elif proxy.status == ProxyStatus.ALIVE:
+                self.alive += 1
+            self.finished += 1
+            try:
+                self.on_progress_callback(
+                    self.proxies, self.finished / self.length * 99.99
+                )
+                if self.on_checked_callback is not None:
+                    self.on_checked_callback(proxy)
+            finally:
+                if self.stop_after_alive is not None and \
+                        self.alive >= self.stop_after_alive:
+                    self.stop()
+                if self.finished == self.length and not self.feeding:
+                    self.done_event.set()
+
+    def stop(self) -> None:
+        """Marks the proxies that are not checked yet as UNKNOWN and lets the
+        check return without waiting for them; call it while holding the
+        lock."""
+        self.stopped = True
+        for proxy in self.pending:
+            proxy.status = ProxyStatus.UNKNOWN
+        self.done_event.set()
+
+
+class ProxyChecker:
+    """This class is used to check proxies using a fixed pool of worker
+    threads.
+
+    The workers are started on the first check and are reused by the
+    next checks until the checker is closed, so one checker can be
+    shared by many lists:
+
+    >>> with ProxyChecker(threads_no=50) as checker:
+    ...     checker.check(proxies)
+    ...     checker.check(more_proxies)
+    """
+
+    def __init__(
+        self,
+        threads_no: int = 21,
+        timeout: _Union[float, _Tuple[float, float]] = 10,
+        url: _Union[str, _List[str]] = 'http://icanhazip.com/',
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        proxy_pools: int = 8,
+        prefilter_timeout: _Optional[float] = None,
+        prefilter_concurrency: int = 500,
+        adaptive_percentile: _Optional[float] = None,
+        budget: _Optional[float] = None,
+        max_per_host: _Optional[int] = None,
+        max_per_subnet: _Optional[int] = None,
+        subnet_prefix: int = 24,
+        host_probe_timeout: _Optional[float] = None,
+        stop_after_alive: _Optional[int] = None,
+        order: _Optional[_Union[str, _Callable]] = None,
+        classify: bool = False,
+        real_ip: _Optional[str] = None
+    ) -> None:
+        """
+        :param threads_no: The number of worker threads to use.
+        :param timeout: The timeout of each check; either one number used for both
+                connecting and reading or a (connect, read) tuple.
+        :param url: The url to try to connect to through the proxies, or a list of
+                urls, e.g. of several judges, that the checks use in turn.
+        :param pool_connections: The number of connection pools each worker's
+                session keeps.
+        :param pool_maxsize: The maximum number of connections kept in each pool.
+        :param proxy_pools: The number of proxies whose connections each worker's
+                session keeps open for their next checks; the pools of the least
+                recently checked proxies are closed.
+        :param prefilter_timeout: If set, every check first runs `tcp_prefilter`
+                with this connect timeout and only the proxies that accept the
+                connection get the full check.
+        :param prefilter_concurrency: The maximum number of connections the
+                pre-filter opens at once.
+        :param adaptive_percentile: If set (0-100), the timeouts are lowered to this
+                percentile of the latencies of the proxies found alive so far.
+        :param budget: If set, each check stops after this many seconds and the
+                proxies that were not checked yet are marked as UNKNOWN.
+        :param max_per_host: The maximum number of checks in flight per IP.
+        :param max_per_subnet: The maximum number of checks in flight per subnet.
+        :param subnet_prefix: The prefix length of the IPv4 subnets.
+        :param host_probe_timeout: If set, every check first runs `host_probe` with
+                this connect timeout and skips all the ports of the IPs that do
+                not answer.
+        :param stop_after_alive: If set, each check stops as soon as this many
+                proxies are found alive and the proxies that were not checked yet
+                are marked as UNKNOWN; the checks still running are not waited for.
+        :param order: The order to check the proxies in; see `check_order`.
+        :param classify: If True, the anonymity and the HTTPS support of the alive
+                proxies are found during the checks; see `Proxy.check_status`.
+        :param real_ip: Our own IP; if not given, it is found with the url on the
+                first check that classifies the proxies.
+        """
+        if threads_no < 1:
+            raise ValueError(f'The number of threads({threads_no}) must be at least 1.')
+        self.threads_no: int = threads_no
+        self.timeout: _Union[float, _Tuple[float, float]] = timeout
+        self.timeout_policy = TimeoutPolicy(timeout, adaptive_percentile)
+        self.budget: _Optional[float] = budget
+        for name, value in (('pool_connections', pool_connections),
+                            ('pool_maxsize', pool_maxsize),
+                            ('proxy_pools', proxy_pools)):
+            if value < 1:
+                raise ValueError(f'The {name}({value}) must be at least 1.')
+        self.url: _Union[str, _List[str]] = url
+        self.urls = UrlRotation(url)
+        self.pool_connections: int = pool_connections
+        self.pool_maxsize: int = pool_maxsize
+        self.proxy_pools: int = proxy_pools
+        self.prefilter_timeout: _Optional[float] = prefilter_timeout
+        self.prefilter_concurrency: int = prefilter_concurrency
+        # The report of the pre-filter of the last check
+        self.prefilter_report: _Optional[PrefilterReport] = None
+        self.subnet_prefix: int = subnet_prefix
+        self.limiter = HostLimiter(max_per_host, max_per_subnet, subnet_prefix)
+        self.host_probe_timeout: _Optional[float] = host_probe_timeout
+        # The report of the host probe of the last check
+        self.host_probe_report: _Optional[PrefilterReport] = None
+        if stop_after_alive is not None and stop_after_alive < 1:
+            raise ValueError(
+                f'The stop_after_alive({stop_after_alive}) must be at least 1.'
+            )
+        self.stop_after_alive: _Optional[int] = stop_after_alive
+        if isinstance(order, str):
+            ProxyList._metric_key(order)  # Raises a ValueError for unknown orders
+        self.order: _Optional[_Union[str, _Callable]] = order
+        self.classify: bool = classify
+        self.real_ip: _Optional[str] = real_ip
+        self._queue: queue.Queue = queue.Queue()
+        self._threads: _List[threading.Thread] = []
+
+    def create_session(self) -> requests.Session:
+        """Creates the session that a worker uses for all of its checks.
+
+        :return: The session.
+        """
+        session = requests.Session()
+        adapter = ProxyPoolAdapter(
+            self.proxy_pools,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _worker(self) -> None:
+        with self.create_session() as session:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    break
+                proxy, batch, queued_time = job
+                if batch.stopped:
+                    continue
+                try:
+                    start_time = time.perf_counter()
+                    observe('check_queue_wait_seconds', start_time - queued_time)
+                    remaining = batch.remaining()
+                    if remaining is not None and remaining <= 0 or \
+                            not self.limiter.acquire(proxy, remaining):
+                        proxy.status = ProxyStatus.UNKNOWN
+                    else:
+                        if self.limiter.enabled:
+                            observe(
+                                'check_limit_wait_seconds',
+                                time.perf_counter() - start_time
+                            )
+                        try:
+                            alive = self.check_proxy(proxy, session, batch.remaining())
+                        finally:
+                            self.limiter.release(proxy)
+                        if not alive and batch.remaining() is not None and \
+                                batch.remaining() <= 0:
+                            # The check may have failed only because the budget
+                            # cut its timeout short
+                            proxy.status = ProxyStatus.UNKNOWN
+                    batch.done(proxy)
+                except Exception as ex:  # Keep the worker alive for the next proxies
+                    with batch.lock:
+                        # The queued proxies of the batch are skipped, as the
+                        # check raises right away
+                        batch.error = ex
+                        batch.stop()
+
+    def check_proxy(
+        self,
+        proxy: Proxy,
+        session: _Optional[requests.Session] = None,
+        remaining: _Optional[float] = None
+    ) -> bool:
+        """This method is used to check a single proxy.
+
+        :param proxy: The proxy to check.
+        :param session: The session to send the request with.
+        :param remaining: The seconds left of the budget, if any.
+        :return: True if the proxy is alive, False otherwise.
+        """
+        start_time = time.perf_counter()
+        alive = proxy.check_status(
+            self.timeout_policy.get(remaining), self.urls.next(), session=session,
+            classify=self.classify, real_ip=self.real_ip
+        )
+        if alive:
+            self.timeout_policy.record(time.perf_counter() - start_time)
+        return alive
+
+    def start(self) -> None:
+        """Starts the worker threads if they are not running."""
+        if self._threads:
+            return
+        for _ in range(self.threads_no):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self, wait: bool = True) -> None:
+        """Stops the worker threads after the queued proxies are checked.
+
+        :param wait: If False, the threads still busy with the checks left over
+                by `stop_after_alive` are not waited for; they are daemon
+                threads and stop on their own once their checks are done.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def check(
+        self,
+        proxies: ProxyList,
+        remove_dead: bool = True,
+        on_progress_callback: _Optional[_Callable] = None
+    ) -> None:
+        """This method is used to check the status of all proxies in the
+        list.
+
+        :param proxies: The list of proxies to check.
+        :param remove_dead: If True, dead proxies will be removed from the list.
+        :param on_progress_callback: A callback function to be called on each progress.
+        """
+        if on_progress_callback is not None:
+            if not callable(on_progress_callback):
+                raise TypeError(
+                    "ProxyChecker.check() argument on_progress_callback must be a "
+                    "callable."
+                )
+        else:
+            on_progress_callback = lambda proxy_list, progress: None
+
+        start_time = time.perf_counter()
+        deadline = None
+        if self.budget is not None:
+            deadline = start_time + self.budget
+        if self.classify and self.real_ip is None:
+            self.real_ip = find_real_ip(
+                self.urls.first, self.timeout_policy.read_timeout
+            )
+        prefilter_start_time = time.perf_counter()
+        to_check, self.host_probe_report, self.prefilter_report = run_prefilters(
+            proxies,
+            remove_dead,
+            self.host_probe_timeout,
+            self.prefilter_timeout,
+            concurrency=self.prefilter_concurrency,
+            check_timeout=self.timeout_policy.connect_timeout,
+            check_parallelism=self.threads_no
+        )
+        if self.host_probe_report is not None or self.prefilter_report is not None:
+            observe(
+                'check_prefilter_seconds', time.perf_counter() - prefilter_start_time
+            )
+
+        self.start()
+        batch = _Batch(
+            proxies, to_check, remove_dead, on_progress_callback, deadline,
+            self.stop_after_alive
+        )
+        queued_time = time.perf_counter()
+        for proxy in check_order(to_check, self.order, self.subnet_prefix):
+            self._queue.put((proxy, batch, queued_time))
+        batch.done_event.wait()
+        if batch.error is not None:
+            raise batch.error
+        observe('check_run_seconds', time.perf_counter() - start_time, engine='threads')
+
+        on_progress_callback(proxies, 100)
+
+    def check_stream(
+        self,
+        proxies: _Iterable[Proxy],
+        on_checked_callback: _Callable[[Proxy], None]
+    ) -> None:
+        """This method is used to check the proxies while they are still being
+        found, e.g. by the scrapers; each proxy goes to the workers as soon as
+        the iterable gives it:
+
+        >>> checker.check_stream(scraped_proxies(), print)
+
+        The pre-filters and the order need the whole list, so they are not
+        used; the budget, the host limits and stop_after_alive are.
+
+        :param proxies: The proxies to check; getting the next one may block
+                until it is found.
+        :param on_checked_callback: A callback function to be called with each
+                proxy once it is checked, from the worker threads. The proxies
+                left unchecked by the budget are passed as UNKNOWN and the ones
+                left by stop_after_alive are not passed.
+        """
+        if not callable(on_checked_callback):
+            raise TypeError(
+                "ProxyChecker.check_stream() argument on_checked_callback must be a "
+                "callable."
+            )
+        start_time = time.perf_counter()
+        deadline = None
+        if self.budget is not None:
+            deadline = start_time + self.budget
+        if self.classify and self.real_ip is None:
+            self.real_ip = find_real_ip(
+                self.urls.first, self.timeout_policy.read_timeout
+            )
+
+        self.start()
+        batch = _Batch(
+            ProxyList(), set(), False, lambda proxy_list, progress: None, deadline,
+            self.stop_after_alive, on_checked_callback, feeding=True
+        )
+        try:
+            for proxy in proxies:
+                if not batch.add(proxy):
+                    break
+                self._queue.put((proxy, batch, time.perf_counter()))
+        finally:
+            batch.close_feed()
+        batch.done_event.wait()
+        if batch.error is not None:
+            raise batch.error
+        observe('check_run_seconds', time.perf_counter() - start_time, engine='threads')
+
+    def __enter__(self) -> ProxyChecker:
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def _dump_state(proxy: Proxy) -> tuple:
+    """Returns the outcome of the checks of a proxy as a picklable tuple."""
+    return (
+        proxy.status.name, proxy.connect_time, proxy.ttfb, proxy.latency,
+        proxy.last_success, proxy.last_failure, list(proxy.history),
+        proxy.anonymity.name, proxy.supports_https
+    )
+
+
+def _load_state(proxy: Proxy, state: tuple) -> None:
+    """Applies a state made by `_dump_state` in another process to a proxy."""
+    status, connect_time, ttfb, latency, last_success, last_failure, history, \
+        anonymity, supports_https = state
+    proxy.status = ProxyStatus[status]
+    proxy.anonymity = ProxyAnonymity[anonymity]
+    if supports_https is not None:
+        proxy.supports_https = supports_https
+    for name, value in (('connect_time', connect_time), ('ttfb', ttfb),
+                        ('latency', latency), ('last_success', last_success),
+                        ('last_failure', last_failure)):
+        if value is not None:
+            setattr(proxy, name, value)
+    proxy.history.extend(history)
+
+
+def _check_shard(
+    index: int,
+    shard: _List[_Tuple[str, int, str]],
+    engine: str,
+    options: dict,
+    messages: multiprocessing.Queue,
+    collect_metrics: bool = False
+) -> None:
+    """Checks one shard of the proxies; runs in a worker process.
+
+    The progress is put on the messages queue as ('progress', checked) and
+    the outcome as ('result', index, states, reports, metrics).
+    """
+    try:
+        # A forked process inherits the registry of the parent; start a new one
+        # so only the metrics of this shard are sent back
+        metrics = enable_metrics(Metrics()) if collect_metrics else None
+        proxies = [Proxy(ip, port, type_) for ip, port, type_ in shard]
+        proxy_list = ProxyList(proxies)
+        # Report roughly every 0.1% so a million proxies do not flood the queue
+        step = max(len(proxies) // 1000, 1)
+        reported = 0
+
+        def on_progress(_, progress: float) -> None:
+            nonlocal reported
+            checked = round(progress / 100 * len(proxies))
+            if checked - reported >= step or progress >= 100:
+                messages.put(('progress', checked - reported))
+                reported = checked
+
+        if engine == 'async':
+            checker = AsyncProxyChecker(**options)
+            asyncio.run(checker.check(proxy_list, False, on_progress))
+        else:
+            checker = ProxyChecker(**options)
+            try:
+                checker.check(proxy_list, False, on_progress)
+            finally:
+                checker.close(wait=checker.stop_after_alive is None)
+
+        reports = []
+        for report in (checker.host_probe_report, checker.prefilter_report):
+            if report is not None:
+                unreachable = [i for i, proxy in enumerate(proxies)
+                               if proxy in report.unreachable]
+                report = (report.checked, unreachable, report.elapsed, report.saved)
+            reports.append(report)
+        messages.put(('result', index, [_dump_state(proxy) for proxy in proxies],
+                      reports, metrics.to_dict() if metrics is not None else None))
+    except BaseException:
+        messages.put(('error', index, traceback.format_exc()))
+
+
+class ShardedProxyChecker:
+    """This class is used to check very large lists of proxies by splitting
+    them into shards and checking each shard in its own process.
+
+    Every process runs its own `ProxyChecker` (or `AsyncProxyChecker`), so
+    the checks are not limited by the GIL of a single interpreter. The
+    results are merged back into the checked list:
+
+    >>> checker = ShardedProxyChecker(processes=4, threads_no=100)
+    >>> checker.check(proxies)
+    """
+
+    def __init__(
+        self,
+        processes: _Optional[int] = None,
+        engine: str = 'threads',
+        **options: _Any
+    ) -> None:
+        """
+        :param processes: The number of worker processes(default: the number of
+                CPUs).
+        :param engine: The checker each process runs; 'threads' for
+                `ProxyChecker` and 'async' for `AsyncProxyChecker`.
+        :param options: The keyword arguments passed to the checker of each
+                process, e.g. threads_no, concurrency, timeout or url. A
+                stop_after_alive is shared out among the shards in proportion to
+                their size, so each process stops after its part of the alive
+                proxies is found.
+        """
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes < 1:
+            raise ValueError(
+                f'The number of processes({processes}) must be at least 1.'
+            )
+        if engine not in ('threads', 'async'):
+            raise ValueError(f'The engine({engine}) must be either threads or async.')
+        # Let the checker validate the options before any process is started
+        if engine == 'async':
+            AsyncProxyChecker(**options)
+        else:
+            ProxyChecker(**options)
+        self.processes: int = processes
+        self.engine: str = engine
+        self.stop_after_alive: _Optional[int] = options.pop('stop_after_alive', None)
+        self.options: dict = options
+        # The reports of the pre-filter and of the host probe of the last check
+        self.prefilter_report: _Optional[PrefilterReport] = None
+        self.host_probe_report: _Optional[PrefilterReport] = None
+
+    def split(self, proxies: _Iterable[Proxy]) -> _List[_List[Proxy]]:
+        """Splits the proxies into shards of about the same size, keeping the
+        proxies of a subnet in the same shard so the per-host and per-subnet
+        limits of the checkers hold across the processes.
+
+        :param proxies: The proxies.
+        :return: The non-empty shards.
+        """
+        subnet_prefix = self.options.get('subnet_prefix', 24)
+        subnets: _Dict[str, _List[Proxy]] = {}
+        for proxy in proxies:
+            subnets.setdefault(subnet_of(proxy.ip, subnet_prefix), []).append(proxy)
+        shards: _List[_List[Proxy]] = [[] for _ in range(self.processes)]
+        # Largest subnets first, each into the smallest shard so far
+        for group in sorted(subnets.values(), key=len, reverse=True):
+            min(shards, key=len).extend(group)
+        return [shard for shard in shards if shard]
+
+    def check(
+        self,
+        proxies: ProxyList,
+        remove_dead: bool = True,
+        on_progress_callback: _Optional[_Callable] = None
+    ) -> None:
+        """This method is used to check the status of all proxies in the
+        list.
+
+        :param proxies: The list of proxies to check.
+        :param remove_dead: If True, dead proxies will be removed from the list.
+        :param on_progress_callback: A callback function to be called on each progress.
+        """
+        if on_progress_callback is not None:
+            if not callable(on_progress_callback):
+                raise TypeError(
+                    "ShardedProxyChecker.check() argument on_progress_callback must "
+                    "be a callable."
+                )
+        else:
+            on_progress_callback = lambda proxy_list, progress: None
+
+        if self.options.get('classify') and self.options.get('real_ip') is None:
+            # Found once here instead of once per process
+            self.options['real_ip'] = find_real_ip(
+                UrlRotation(self.options.get('url', 'http://icanhazip.com/')).first,
+                TimeoutPolicy(self.options.get('timeout', 10)).read_timeout
+            )
+        start_time = time.perf_counter()
+        metrics = get_metrics()
+        to_check = list(proxies)
+        shards = self.split(to_check)
+        messages = multiprocessing.Queue()
+        workers = []
+        for index, shard in enumerate(shards):
+            options = dict(self.options)
+            if self.stop_after_alive is not None:
+                options['stop_after_alive'] = math.ceil(
+                    self.stop_after_alive * len(shard) / len(to_check)
+                )
+            workers.append(multiprocessing.Process(
+                target=_check_shard,
+                args=(
+                    index,
+                    [(proxy.ip, proxy.port, proxy.type.name) for proxy in shard],
+                    self.engine, options, messages, metrics is not None
+                ),
+                daemon=True
+            ))
+        for worker in workers:
+            worker.start()
+
+        results = {}
+        checked = 0
+        try:
+            while len(results) < len(shards):
+                try:
+                    message = messages.get(timeout=0.5)
+                except queue.Empty:
+                    for index, worker in enumerate(workers):
+                        if index not in results and worker.exitcode not in (None, 0):
+                            raise RuntimeError(
+                                f'The checker process of shard {index} exited with '
+                                f'code {worker.exitcode}.'
+                            )
+                    continue
+                if message[0] == 'progress':
+                    checked += message[1]
+                    on_progress_callback(proxies, checked / len(to_check) * 99.99)
+                elif message[0] == 'result':
+                    results[message[1]] = message[2:]
+                else:
+                    raise RuntimeError(
+                        f'The checker process of shard {message[1]} failed:\n'
+                        f'{message[2]}'
+                    )
+        finally:
+            for worker in workers:
+                if worker.is_alive() and len(results) < len(shards):
+                    worker.terminate()
+                worker.join()
+
+        # The reports of the shards: (host probe reports, pre-filter reports)
+        reports: _Tuple[list, list] = ([], [])
+        for index, shard in enumerate(shards):
+            states, shard_reports, shard_metrics = results[index]
+            for proxy, state in zip(shard, states):
+                _load_state(proxy, state)
+            if metrics is not None and shard_metrics is not None:
+                metrics.merge(shard_metrics)
+            for kind, report in enumerate(shard_reports):
+                if report is not None:
+                    checked, unreachable, elapsed, saved = report
+                    reports[kind].append(
+                        (checked, [shard[i] for i in unreachable], elapsed, saved)
+                    )
+        # The shards are filtered in parallel, so the slowest one counts
+        self.host_probe_report, self.prefilter_report = (
+            PrefilterReport(
+                checked=sum(report[0] for report in kind_reports),
+                unreachable=ProxyList(
+                    proxy for report in kind_reports for proxy in report[1]
+                ),
+                elapsed=max(report[2] for report in kind_reports),
+                saved=max(report[3] for report in kind_reports)
+            ) if kind_reports else None
+            for kind_reports in reports
+        )
+        if remove_dead:
+            for proxy in to_check:
+                if proxy.status == ProxyStatus.DEAD:
+                    proxies.discard(proxy)
+        observe('check_run_seconds', time.perf_counter() - start_time, engine='sharded')
+
+        on_progress_callback(proxies, 100)
@@ -0,0 +1,218 @@
+# ProxyEater.Classifier.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import re
+import ssl
+import json  # This module is used to read the headers echoed as json.
+import socket  # This module is used to send the CONNECT probes.
+import itertools
+from typing import (Any as _Any, List as _List, Set as _Set, Union as _Union,
+                    Mapping as _Mapping, Iterable as _Iterable, Optional as _Optional,
+                    Tuple as _Tuple)
+from urllib.parse import urlsplit
+
+import requests  # This module is used to find our own IP.
+
+from .Proxy import Proxy, ProxyType, ProxyAnonymity
+
+__all__ = [
+    'UrlRotation', 'find_real_ip', 'classify_anonymity', 'connect_target',
+    'probe_connect'
+]
+
+# An IPv4 address or a (loose) IPv6 address in a response body
+IP_PATTERN = re.compile(
+    r'(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?![\d.])|'
+    r'(?<![0-9a-fA-F:])(?:[0-9a-fA-F]{1,4}:){2,7}[0-9a-fA-F]{1,4}(?![0-9a-fA-F:])'
+)
+# A `Name: value` or CGI style `HTTP_NAME = value` line of an echoed header,
+# maybe after the tags of an HTML page
+HEADER_LINE_PATTERN = re.compile(
+    r'^\s*(?:<[^>]*>\s*)*([A-Za-z][A-Za-z0-9_-]*)\s*[:=]', re.MULTILINE
+)
+# The request headers that tell the target a proxy is in the way; written
+# lower case with dashes, the way `_echoed_header_names` returns the names
+REVEALING_HEADERS = (
+    'via', 'x-forwarded-for', 'forwarded', 'x-real-ip', 'client-ip', 'x-client-ip',
+    'x-proxy-id', 'proxy-connection', 'x-forwarded', 'forwarded-for',
+    'x-originating-ip', 'x-bluecoat-via'
+)
+# The response headers a proxy adds when it announces itself
+PROXY_RESPONSE_HEADERS = ('via', 'x-forwarded-for', 'proxy-connection', 'x-proxy-id')
+
+
+class UrlRotation:
+    """This class hands out the check urls in turn so the load of the checks
+    is spread over several judges:
+
+    >>> urls = UrlRotation(['http://10.0.0.1:8080/', 'http://10.0.0.2:8080/'])
+    >>> urls.next()
+    'http://10.0.0.1:8080/'
+    >>> urls.next()
+    'http://10.0.0.2:8080/'
+    """
+
+    def __init__(self, urls: _Union[str, _Iterable[str]]) -> None:
+        """
+        :param urls: One url or a list of urls.
+        """
+        self.urls: _List[str] = [urls] if isinstance(urls, str) else list(urls)
+        if not self.urls:
+            raise ValueError('At least one url is needed.')
+        # next() of a cycle is atomic, so the threads can share it without a lock
+        self._cycle = itertools.cycle(self.urls)
+
+    @property
+    def first(self) -> str:
+        """The first url; used for the requests that are sent only once."""
+        return self.urls[0]
+
+    def next(self) -> str:
+        """Returns the url to use for the next check.
+
+        :return: The url.
+        """
+        return next(self._cycle)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __repr__(self) -> str:
+        return f'UrlRotation(urls={self.urls})'
+
+
+def find_real_ip(url: str = 'http://icanhazip.com/', timeout: float = 10) -> \
+        _Optional[str]:
+    """Requests the url without a proxy and returns the first IP address in
+    the response, which is our own IP as the target sees it.
+
+    :param url: An url that echoes the IP of the client.
+    :param timeout: The timeout of the request.
+    :return: The IP address or None if it could not be found.
+    """
+    try:
+        match = IP_PATTERN.search(requests.get(url, timeout=timeout).text)
+    except requests.RequestException:
+        return None
+    return match.group() if match else None
+
+
+def _normalize_header_name(name: str) -> str:
+    name = name.strip().lower().replace('_', '-')
+    # The CGI variables of the request headers are HTTP_ and the name
+    return name[5:] if name.startswith('http-') else name
+
+
+def _echoed_header_names(body: str) -> _Optional[_Set[str]]:
+    """Returns the names of the request headers a judge echoed: the keys of
+    a json body (or of its `headers` object, as httpbin sends them) or the
+    names of the `Name: value` lines, as the judge mode sends them.
+
+    :param body: The body of the response.
+    :return: The names written lower case with dashes, or None if the body
+            echoes no headers.
+    """
+    try:
+        echoed: _Any = json.loads(body)
+    except ValueError:
+        names = HEADER_LINE_PATTERN.findall(body)
+    else:
+        if not isinstance(echoed, dict):
+            return None
+        headers = echoed.get('headers')
+        names = list(headers if isinstance(headers, dict) else echoed)
+    return {_normalize_header_name(name) for name in names} or None
+
+
+def classify_anonymity(
+    body: _Union[str, bytes], headers: _Mapping[str, str], real_ip: _Optional[str]
+) -> ProxyAnonymity:
+    """Decides the anonymity of a proxy from the response of a check.
+
+    A proxy is TRANSPARENT if the target saw our IP, ANONYMOUS if it hid
+    our IP but told the target a proxy was used, and ELITE if the echoed
+    request headers show no trace of a proxy. Only the names of the echoed
+    headers are compared, so a value that happens to contain `via` does not
+    count. Urls that only echo the IP cannot show the headers, so ELITE needs
+    an url that echoes them, like the one served by the judge mode.
+
+    :param body: The body of the response.
+    :param headers: The headers of the response.
+    :param real_ip: Our own IP as returned by `find_real_ip`.
+    :return: The ProxyAnonymity.
+    """
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    if real_ip is None:
+        return ProxyAnonymity.UNKNOWN
+    if real_ip in IP_PATTERN.findall(body):
+        return ProxyAnonymity.TRANSPARENT
+    names = _echoed_header_names(body) or set()
+    response_names = {key.lower() for key in headers}
+    if names.intersection(REVEALING_HEADERS) or \
+            response_names.intersection(PROXY_RESPONSE_HEADERS):
+        return ProxyAnonymity.ANONYMOUS
+    if 'user-agent' in names:  # The url echoes the request headers
+        return ProxyAnonymity.ELITE
+    return ProxyAnonymity.ANONYMOUS
+
+
+def connect_target(url: str) -> _Tuple[str, int]:
+    """Returns the address to ask for in the CONNECT probes of a check of the
+    url: the same host on the HTTPS port.
+
+    :param url: The url of the checks.
+    :return: The host and the port.
+    """
+    return urlsplit(url).hostname or '', 443
+
+
+def _send_connect(sock: socket.socket, host: str, port: int) -> bool:
+    """Sends a CONNECT request on an open connection to a proxy.
+
+    :return: Whether the proxy opened the tunnel.
+    """
+    sock.sendall(
+        f'CONNECT {host}:{port} HTTP/1.1\r\n'
+        f'Host: {host}:{port}\r\n\r\n'.encode()
+    )
+    status_line = b''
+    while b'\r\n' not in status_line and len(status_line) < 1024:
+        chunk = sock.recv(1024)
+        if not chunk:
+            break
+        status_line += chunk
+    parts = status_line.split(b' ', 2)
+    return len(parts) >= 2 and parts[0].startswith(b'HTTP/') and parts[1] == b'200'
+
+
+def probe_connect(
+    proxy: Proxy,
+    host: str,
+    port: int = 443,
+    timeout: float = 10
+) -> bool:
+    """Asks an HTTP or HTTPS proxy to open a tunnel with CONNECT, which is what
+    clients need to reach HTTPS sites through it.
+
+    The probe opens a connection of its own, since the connection of the
+    check is a tunnel once the proxy accepts.
+
+    :param proxy: The proxy.
+    :param host: The host to ask for.
+    :param port: The port to ask for.
+    :param timeout: The timeout of connecting and of reading the answer.
+    :return: True if the proxy opened the tunnel.
+    """
+    try:
+        with socket.create_connection((proxy.ip, proxy.port), timeout) as sock:
+            if proxy.type == ProxyType.HTTPS:
+                context = ssl.create_default_context()
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+                sock = context.wrap_socket(sock, server_hostname=proxy.ip)
+            return _send_connect(sock, host, port)
+    except (OSError, ssl.SSLError):
+        return False
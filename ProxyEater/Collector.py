@@ -0,0 +1,463 @@
+# ProxyEater.Collector.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import sys
+import queue  # This module is used to pass the proxies from the scrapers to the checks.
+import threading
+import concurrent.futures  # This module is used to scrape the sources concurrently.
+from typing import (Any as _Any, Dict as _Dict, List as _List, Union as _Union,
+                    Mapping as _Mapping, Callable as _Callable, Iterable as _Iterable,
+                    Iterator as _Iterator, Optional as _Optional)
+
+from .Proxy import Proxy, ProxyList, ProxyType, ProxyStatus, ProxyAnonymity
+from .Cache import CheckCache
+from .Store import ProxyStore
+from .Stats import SourceStats
+from .Scraper import Scraper
+from .Checker import ProxyChecker, ShardedProxyChecker
+from .AsyncChecker import AsyncProxyChecker
+
+__all__ = ['ProxyCollector', 'meets_classification']
+
+
+def meets_classification(
+    proxy: Proxy, min_anonymity: _Optional[ProxyAnonymity] = None,
+    https_only: bool = False
+) -> bool:
+    """Tells whether a checked proxy is anonymous enough and can CONNECT if
+    asked to.
+
+    :param proxy: The proxy.
+    :param min_anonymity: If set, the proxies less anonymous than this fail.
+    :param https_only: If True, the proxies that cannot CONNECT fail.
+    :return: True if the proxy is wanted.
+    """
+    if min_anonymity is not None and proxy.anonymity.value < min_anonymity.value:
+        return False
+    return not https_only or bool(proxy.supports_https)
+
+
+class ProxyCollector:
+    """This class scrapes the sources of a sources.json concurrently and
+    passes on the proxies they list, each proxy only once even if several
+    sources list it.
+
+    Each source is checked as soon as it is scraped while the others keep
+    downloading; in the pipeline mode the proxies of every page go to the
+    checks as soon as the page is read:
+
+    >>> collector = ProxyCollector(
+    ...     sources, checker=checker,
+    ...     check_callback=lambda proxies, name: checker.check(proxies),
+    ...     on_proxies_callback=lambda proxies: proxies.to_text_file(...)
+    ... )
+    >>> collector.run()
+    """
+
+    def __init__(
+        self,
+        sources: _Iterable[dict],
+        scraper_options: _Optional[_Mapping[str, _Any]] = None,
+        source_concurrency: int = 8,
+        proxy_types: _Optional[_Iterable[ProxyType]] = None,
+        check_callback: _Optional[_Callable] = None,
+        checker: _Optional[_Union[ProxyChecker, AsyncProxyChecker,
+                                  ShardedProxyChecker]] = None,
+        cache: _Optional[CheckCache] = None,
+        stats: _Optional[SourceStats] = None,
+        min_yield: _Optional[float] = None,
+        want: _Optional[int] = None,
+        pipeline: bool = False,
+        min_anonymity: _Optional[ProxyAnonymity] = None,
+        https_only: bool = False,
+        on_source_callback: _Optional[_Callable] = None,
+        on_progress_callback: _Optional[_Callable] = None,
+        on_success_callback: _Optional[_Callable] = None,
+        on_failure_callback: _Optional[_Callable] = None,
+        on_error_callback: _Optional[_Callable] = None,
+        on_proxies_callback: _Optional[_Callable] = None
+    ) -> None:
+        """
+        :param sources: The sources, in the format of sources.json.
+        :param scraper_options: The arguments given to every Scraper, e.g. the
+                useragent, the proxy and the timeouts; the "min_refresh" of a
+                source overrides the one given here.
+        :param source_concurrency: The number of sources scraped at once.
+        :param proxy_types: If set, the proxies of the other types are dropped.
+        :param check_callback: A callback function to be called with the new
+                proxies and the name of their source or "Pipeline"; it checks
+                the proxies and removes the dead and the unwanted ones. If None,
+                the proxies are not checked.
+        :param checker: The checker `check_callback` uses; its stop_after_alive
+                is set to the alive proxies still missing for `want` and its
+                order to the order of the statistics. In the pipeline mode, a
+                ProxyChecker checks each proxy as soon as it is scraped.
+        :param cache: The CheckCache the checks use. The ones of the pipeline
+                mode are looked up in it and stored to it; a ProxyStore also
+                records the proxies each source listed.
+        :param stats: If set, the sources with the highest yield are scraped and
+                their proxies checked first, and the runs are recorded.
+        :param min_yield: If set with `stats`, the sources yielding less alive
+                proxies per second are skipped, except for a retry now and then.
+        :param want: If set with `check_callback`, the scraping stops once this
+                many alive proxies are found.
+        :param pipeline: If True, the proxies of every page are checked as soon
+                as the page is read instead of once their source is done.
+        :param min_anonymity: In the pipeline mode of a ProxyChecker, the
+                proxies less anonymous than this are not passed on.
+        :param https_only: In the pipeline mode of a ProxyChecker, the proxies
+                that cannot CONNECT are not passed on.
+        :param on_source_callback: A callback function to be called with the
+                config of each source as its scraping starts.
+        :param on_progress_callback: Passed to `Scraper.get_proxies`.
+        :param on_success_callback: Passed to `Scraper.get_proxies`.
+        :param on_failure_callback: Passed to `Scraper.get_proxies`.
+        :param on_error_callback: A callback function to be called with the
+                config of a source and the exception it raised, or with None
+                and the exception the checks of the pipeline raised.
+        :param on_proxies_callback: A callback function to be called with each
+                list of proxies that were not passed on before.
+        """
+        if source_concurrency < 1:
+            raise ValueError(
+                f'The source concurrency({source_concurrency}) must be at least 1.'
+            )
+        if want is not None and want < 1:
+            raise ValueError(f'The want({want}) must be at least 1.')
+        for name, callback in (
+            ('check_callback', check_callback),
+            ('on_source_callback', on_source_callback),
+            ('on_error_callback', on_error_callback),
+            ('on_proxies_callback', on_proxies_callback)
+        ):
+            if callback is not None and not callable(callback):
+                raise TypeError(
+                    f"ProxyCollector() argument {name} must be a callable."
+                )
+        self.sources: _List[dict] = list(sources)
+        self.scraper_options: _Dict[str, _Any] = dict(scraper_options or {})
+        self.source_concurrency: int = source_concurrency
+        self.proxy_types: _Optional[_List[ProxyType]] = \
+            None if proxy_types is None else list(proxy_types)
+        self.check_callback: _Optional[_Callable] = check_callback
+        self.checker = checker
+        self.cache: _Optional[CheckCache] = cache
+        self.store: _Optional[ProxyStore] = \
+            cache if isinstance(cache, ProxyStore) else None
+        self.stats: _Optional[SourceStats] = stats
+        self.want: _Optional[int] = want
+        self.pipeline: bool = pipeline
+        self.min_anonymity: _Optional[ProxyAnonymity] = min_anonymity
+        self.https_only: bool = https_only
+        self.on_source_callback: _Callable = on_source_callback or \
+            (lambda config: None)
+        self.scraper_callbacks: _Dict[str, _Optional[_Callable]] = dict(
+            on_progress_callback=on_progress_callback,
+            on_success_callback=on_success_callback,
+            on_failure_callback=on_failure_callback
+        )
+        self.on_error_callback: _Callable = on_error_callback or \
+            (lambda config, error: None)
+        self.on_proxies_callback: _Callable = on_proxies_callback or \
+            (lambda proxies: None)
+
+        self.proxies: ProxyList = ProxyList()  # The proxies passed on
+        self.skipped: _List[str] = []  # The sources skipped for their low yield
+        self.scraped: _List[Scraper] = []
+        # The proxies already taken from a source, alive or not; a proxy listed
+        # by several sources is only checked once
+        self._seen: _Dict[Proxy, Proxy] = {}  # Each proxy and the checked instance
+        # For the statistics: the source that listed each proxy first and the
+        # checked instances of the proxies each source listed
+        self._origins: _Dict[Proxy, str] = {}
+        self._listed: _Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._futures: _Dict[concurrent.futures.Future, dict] = {}
+        # Set once the scraping is over; the scrapers still running stop
+        self._stop_event = threading.Event()
+        # The order given to the checker wins over the one of the statistics
+        self._stats_order = stats is not None and checker is not None and (
+            checker.options.get('order') if isinstance(checker, ShardedProxyChecker)
+            else checker.order
+        ) is None
+        if stats is not None:
+            self.sources = stats.order(self.sources)
+            if min_yield is not None:
+                self.skipped = [config.get('id') for config in self.sources
+                                if stats.skip(config.get('id'), min_yield)]
+                self.sources = [config for config in self.sources
+                                if config.get('id') not in self.skipped]
+
+    def has_enough(self) -> bool:
+        """Tells whether `want` alive proxies were passed on."""
+        return self.want is not None and self.check_callback is not None and \
+            self.proxies.count >= self.want
+
+    def add(self, proxies: ProxyList) -> ProxyList:
+        """Passes on the proxies that were not passed on before, e.g. the ones
+        known to be alive from a store.
+
+        :param proxies: The proxies.
+        :return: The proxies that were passed on.
+        """
+        new_proxies = ProxyList(proxy for proxy in proxies if proxy not in self.proxies)
+        if new_proxies.count > 0:
+            self.proxies.update(new_proxies)
+            self.on_proxies_callback(new_proxies)
+        return new_proxies
+
+    def _scrape(
+        self, config: dict, on_proxies_callback: _Optional[_Callable] = None
+    ) -> Scraper:
+        self.on_source_callback(config)
+        options = dict(self.scraper_options)
+        if 'min_refresh' in config:  # A source may ask to be fetched less often
+            options['min_refresh'] = config['min_refresh']
+        scraper = Scraper(
+            config.get('url'),
+            config.get('parser'),
+            method=config.get('method'),
+            name=config.get('id'),
+            stop_event=self._stop_event,
+            **options
+        )
+        scraper.get_proxies(
+            on_proxies_callback=on_proxies_callback, **self.scraper_callbacks
+        )
+        self.scraped.append(scraper)
+        return scraper
+
+    def _take_new(self, proxies: ProxyList, name: str) -> ProxyList:
+        if self.proxy_types is not None:
+            proxies = proxies.filter(type_=self.proxy_types)
+        if self.store is not None:
+            self.store.record_seen(proxies, name)
+        with self._lock:
+            new_proxies = ProxyList(
+                proxy for proxy in proxies if proxy not in self._seen
+            )
+            self._seen.update((proxy, proxy) for proxy in new_proxies)
+            if self.stats is not None:
+                self._origins.update(dict.fromkeys(new_proxies, name))
+                self._listed.setdefault(name, set()).update(
+                    self._seen[proxy] for proxy in proxies
+                )
+        return new_proxies
+
+    def _missing(self) -> _Optional[int]:
+        """Sets the stop_after_alive of the checker to the alive proxies still
+        missing and returns their number; None if any number is wanted."""
+        if self.want is None:
+            return None
+        missing = self.want - self.proxies.count
+        if missing > 0 and self.checker is not None:
+            self.checker.stop_after_alive = missing
+        return missing
+
+    def _check(self, proxies: ProxyList, name: str) -> None:
+        if self.check_callback is None or proxies.count < 1:
+            return
+        missing = self._missing()
+        if missing is not None and missing < 1:
+            # Enough alive proxies are known, e.g. from a store; like the
+            # proxies left unchecked by stop_after_alive, these are not kept
+            proxies.clear()
+            return
+        if self._stats_order:
+            # Check the proxies of the sources with the highest yield first
+            with self._lock:
+                key = self.stats.check_order({
+                    proxy: self._origins[proxy] for proxy in proxies
+                    if proxy in self._origins
+                })
+            if isinstance(self.checker, ShardedProxyChecker):
+                self.checker.options['order'] = key
+            else:
+                self.checker.order = key
+        self.check_callback(proxies, name)
+
+    def _stream(self, pending: queue.Queue) -> None:
+        """Checks the proxies queued by the scrapers one by one as they come
+        and passes on the alive ones as soon as they are found."""
+        missing = self._missing()
+        if missing is not None and missing < 1:
+            return
+        # Each proxy with whether it was checked now; None once all are done
+        results = queue.Queue()
+
+        def arrivals() -> _Iterator[Proxy]:
+            while not self._stop_event.is_set():
+                proxy = pending.get()
+                if proxy is None:
+                    return
+                if self.cache is not None and \
+                        self.cache.apply(ProxyList([proxy])).count == 0:
+                    results.put((proxy, False))  # Its result is in the cache
+                else:
+                    yield proxy
+
+        def run_checks() -> None:
+            try:
+                self.checker.check_stream(
+                    arrivals(), lambda proxy: results.put((proxy, True))
+                )
+            except Exception as ex:
+                self.on_error_callback(None, ex)
+            finally:
+                results.put(None)
+
+        threading.Thread(target=run_checks, daemon=True).start()
+        finished = False
+        while not finished:
+            items = [results.get()]
+            # Take everything checked while the last ones were being passed on
+            while True:
+                try:
+                    items.append(results.get_nowait())
+                except queue.Empty:
+                    break
+            finished = None in items
+            items = [item for item in items if item is not None]
+            if self.cache is not None:
+                self.cache.store(proxy for proxy, checked in items if checked)
+            self.add(ProxyList(
+                proxy for proxy, _ in items
+                if proxy.status == ProxyStatus.ALIVE and
+                meets_classification(proxy, self.min_anonymity, self.https_only)
+            ))
+            if self.has_enough():
+                break
+        if self.cache is not None:
+            self.cache.save()
+
+    def _submit(
+        self, executor: concurrent.futures.Executor,
+        on_proxies_callback: _Optional[_Callable] = None
+    ) -> _Dict[concurrent.futures.Future, dict]:
+        self._futures = {
+            executor.submit(self._scrape, config, on_proxies_callback): config
+            for config in self.sources
+        }
+        return self._futures
+
+    def _run_pipeline(self, executor: concurrent.futures.Executor) -> None:
+        # The scrapers queue the new proxies of every page as soon as it is
+        # read. A ProxyChecker checks each of them as it comes; the other
+        # checkers check all the proxies queued since their last round in the
+        # next one, while the scrapers keep going
+        pending = queue.Queue()  # The new proxies; None once every source is done
+
+        def queue_proxies(scraper: Scraper, proxies: ProxyList) -> None:
+            for proxy in self._take_new(proxies, scraper.name):
+                pending.put(proxy)
+
+        futures = self._submit(executor, queue_proxies)
+        remaining = len(futures)
+
+        def source_done(future: concurrent.futures.Future) -> None:
+            nonlocal remaining
+            if not future.cancelled() and future.exception() is not None:
+                self.on_error_callback(futures[future], future.exception())
+            with self._lock:
+                remaining -= 1
+                if remaining == 0:
+                    pending.put(None)  # Every source is done
+
+        for future in futures:
+            future.add_done_callback(source_done)
+        if not futures:
+            pending.put(None)
+        if isinstance(self.checker, ProxyChecker) and self.check_callback is not None:
+            self._stream(pending)
+            return
+        finished = False
+        while not finished:
+            proxies = ProxyList()
+            proxy = pending.get()
+            # Take everything queued while the last round was being checked
+            while proxy is not None:
+                proxies.add(proxy)
+                try:
+                    proxy = pending.get_nowait()
+                except queue.Empty:
+                    break
+            finished = proxy is None
+            self._check(proxies, 'Pipeline')
+            self.add(proxies)
+            if self.has_enough():
+                break
+
+    def _run_sources(self, executor: concurrent.futures.Executor) -> None:
+        # Check each source as it finishes while the others are scraped
+        futures = self._submit(executor)
+        for future in concurrent.futures.as_completed(futures):
+            if self.has_enough():
+                break
+            try:
+                scraper = future.result()
+            except Exception as ex:  # A broken source must not stop the others
+                self.on_error_callback(futures[future], ex)
+                continue
+            proxies = self._take_new(scraper.proxies, scraper.name)
+            self._check(proxies, scraper.name)
+            self.add(proxies)
+
+    def _record_stats(self) -> None:
+        unique = {}
+        with self._lock:
+            for name in self._origins.values():
+                unique[name] = unique.get(name, 0) + 1
+        for scraper in self.scraped:
+            if scraper.is_stopped:
+                continue  # Cut short, so its numbers are not fair
+            listed = self._listed.get(scraper.name, ())
+            self.stats.record(
+                scraper.name,
+                fetched=scraper.proxies.count,
+                unique=unique.get(scraper.name, 0),
+                seconds=scraper.elapsed or 0,
+                failed=not scraper.is_succeed,
+                checked=None if self.check_callback is None else sum(
+                    proxy.status != ProxyStatus.UNKNOWN for proxy in listed
+                ),
+                alive=sum(proxy.status == ProxyStatus.ALIVE for proxy in listed)
+            )
+        self.stats.save()
+
+    def run(self) -> ProxyList:
+        """Scrapes the sources and passes on their proxies until all of them
+        are done or `want` alive proxies are found.
+
+        :return: The proxies passed on.
+        """
+        if self.has_enough():
+            return self.proxies  # E.g. the store already has the wanted proxies
+        executor = concurrent.futures.ThreadPoolExecutor(self.source_concurrency)
+        try:
+            if self.pipeline:
+                self._run_pipeline(executor)
+            else:
+                self._run_sources(executor)
+        finally:
+            # Do not wait for the sources that are still being scraped: the
+            # ones not started are dropped and the running ones stop before
+            # their next request
+            self._stop_event.set()
+            if sys.version_info >= (3, 9):
+                executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                for future in self._futures:
+                    future.cancel()
+                executor.shutdown(wait=False)
+            if self.stats is not None:
+                self._record_stats()
+        return self.proxies
+
+    def __repr__(self) -> str:
+        return (
+            f'ProxyCollector(sources={len(self.sources)}, '
+            f'source_concurrency={self.source_concurrency}, '
+            f'pipeline={self.pipeline}, proxies={self.proxies.count})'
+        )
@@ -0,0 +1,235 @@
+# ProxyEater.Judge.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import socket
+import asyncio  # This module is used to serve many keep-alive connections at once.
+import threading  # This module is used to run the server in the background.
+import multiprocessing  # This module is used to serve on all the CPUs.
+from typing import Optional as _Optional
+
+from .Classifier import UrlRotation  # Kept importable from Judge
+
+__all__ = ['JudgeServer', 'UrlRotation']
+
+# The largest request head the judge accepts
+MAX_HEAD_SIZE = 16 * 1024
+
+
+class JudgeServer:
+    """This class is a small HTTP server that echoes the IP and the headers
+    of each request, so the proxies can be checked without relying on a
+    third-party service.
+
+    The body of each response starts with the IP of the client on its own
+    line followed by the request headers, which is what the checks need to
+    tell transparent, anonymous and elite proxies apart. The connections are
+    kept alive and the server runs on asyncio, so one process handles tens
+    of thousands of requests per second; `run` can start more processes
+    that share the port:
+
+    >>> with JudgeServer(port=0) as judge:
+    ...     proxies.check_all(url=judge.url)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080) -> None:
+        """
+        :param host: The address to listen on; use 0.0.0.0 to let the proxies
+                reach the judge from the internet.
+        :param port: The port to listen on; 0 picks a free port.
+        """
+        self.host: str = host
+        self.port: int = port
+        self.requests: int = 0  # The number of requests answered so far
+        self._loop: _Optional[asyncio.AbstractEventLoop] = None
+        self._server: _Optional[asyncio.AbstractServer] = None
+        self._thread: _Optional[threading.Thread] = None
+        self._task: _Optional[asyncio.Task] = None
+
+    @property
+    def url(self) -> str:
+        """The url to check the proxies with."""
+        host = self.host
+        if host in ('0.0.0.0', '::', ''):
+            try:
+                host = socket.gethostbyname(socket.gethostname())
+            except OSError:
+                host = '127.0.0.1'
+        elif ':' in host:
+            host = f'[{host}]'
+        return f'http://{host}:{self.port}/'
+
+    @staticmethod
+    def render(client_ip: str, head: bytes) -> bytes:
+        """Builds the body of the response to a request.
+
+        :param client_ip: The IP the request came from.
+        :param head: The request line and the headers of the request.
+        :return: The body.
+        """
+        headers = head.split(b'\r\n')[1:]
+        return client_ip.encode() + b'\n' + b''.join(
+            header + b'\n' for header in headers if header
+        )
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answers the requests of one connection until the client closes it.
+
+        :param reader: The reader of the connection.
+        :param writer: The writer of the connection.
+        """
+        client_ip = writer.get_extra_info('peername')[0]
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.LimitOverrunError:
+                    writer.write(b'HTTP/1.1 431 Request Header Fields Too Large\r\n'
+                                 b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                lowered = head.lower()
+                # Skip the body of the requests that have one
+                for line in lowered.split(b'\r\n'):
+                    if line.startswith(b'content-length:'):
+                        await reader.readexactly(int(line.split(b':', 1)[1]))
+                if lowered.split(b'\r\n', 1)[0].endswith(b'http/1.0'):
+                    close = b'connection: keep-alive' not in lowered
+                else:
+                    close = b'connection: close' in lowered
+                body = self.render(client_ip, head.rstrip(b'\r\n'))
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n'
+                    b'Content-Length: ' + str(len(body)).encode() + b'\r\n' +
+                    (b'Connection: close\r\n\r\n' if close else b'\r\n') +
+                    (b'' if head.startswith(b'HEAD ') else body)
+                )
+                self.requests += 1
+                if close:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # The server is stopping; end the connection quietly
+            pass
+        finally:
+            writer.close()
+
+    async def listen(self, reuse_port: bool = False) -> None:
+        """Starts listening; a port of 0 is replaced with the port picked.
+
+        :param reuse_port: If True, other processes may listen on the same port.
+        """
+        self._server = await asyncio.start_server(
+            self.handle, self.host, self.port, limit=MAX_HEAD_SIZE,
+            reuse_port=reuse_port or None, backlog=4096
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve(self, reuse_port: bool = False) -> None:
+        """Serves the requests until the coroutine is cancelled.
+
+        :param reuse_port: If True, other processes may listen on the same port.
+        """
+        await self.listen(reuse_port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start(self) -> None:
+        """Starts the server in a background thread; the port is listening
+        when this method returns."""
+        if self._thread is not None:
+            return
+        loop = asyncio.new_event_loop()
+        try:
+            # Bind here so the errors reach the caller
+            loop.run_until_complete(self.listen())
+        except BaseException:
+            loop.close()
+            raise
+        self._loop = loop
+        task = loop.create_task(self._server.serve_forever())
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                # Let the open connections see the cancellation before closing
+                pending = asyncio.all_tasks(loop)
+                for pending_task in pending:
+                    pending_task.cancel()
+                loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True)
+                )
+                self._server.close()
+                loop.run_until_complete(self._server.wait_closed())
+                loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        self._task = task
+
+    def stop(self) -> None:
+        """Stops the server started by `start`."""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._task.cancel)
+        self._thread.join()
+        self._thread = None
+        self._server = None
+        self._loop = None
+
+    def run(self, processes: int = 1) -> None:
+        """Serves in the current process until a KeyboardInterrupt.
+
+        :param processes: The number of processes that serve the port; more than
+                one needs SO_REUSEPORT (Linux, BSD).
+        """
+        if processes < 1:
+            raise ValueError(
+                f'The number of processes({processes}) must be at least 1.'
+            )
+        reuse_port = processes > 1
+        if reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+            raise ValueError('Serving with many processes needs SO_REUSEPORT.')
+        if reuse_port and self.port == 0:
+            raise ValueError('Serving with many processes needs a fixed port.')
+        workers = [
+            multiprocessing.Process(target=_serve, args=(self.host, self.port),
+                                    daemon=True)
+            for _ in range(processes - 1)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            asyncio.run(self.serve(reuse_port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
+
+    def __enter__(self) -> JudgeServer:
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f'JudgeServer(host={self.host!r}, port={self.port})'
+
+
+def _serve(host: str, port: int) -> None:
+    """Runs an extra judge process sharing the port."""
+    try:
+        asyncio.run(JudgeServer(host, port).serve(reuse_port=True))
+    except KeyboardInterrupt:
+        pass
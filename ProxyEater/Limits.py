@@ -0,0 +1,201 @@
+# ProxyEater.Limits.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import asyncio
+import ipaddress  # This module is used to find the subnet of the proxies.
+import threading
+import itertools
+from collections import Counter, OrderedDict
+from typing import (List as _List, Tuple as _Tuple, Union as _Union,
+                    Callable as _Callable, Iterable as _Iterable,
+                    Optional as _Optional)
+
+from .Proxy import Proxy, ProxyList
+
+__all__ = ['subnet_of', 'interleave', 'check_order', 'HostLimiter']
+
+
+def subnet_of(host: str, prefix: int = 24) -> str:
+    """Returns the subnet of an IPv4 address using the prefix length; IPv6
+    addresses use a /64 subnet and host names are their own subnet.
+
+    :param host: The IP address or host name.
+    :param prefix: The prefix length of the IPv4 subnets.
+    :return: The subnet, e.g. '10.0.0.0/24'.
+    """
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return host
+    if address.version == 6:
+        prefix = 64
+    return str(ipaddress.ip_network(f'{address}/{prefix}', strict=False))
+
+
+def interleave(proxies: _Iterable[Proxy], subnet_prefix: int = 24) -> _List[Proxy]:
+    """Orders the proxies so that consecutive proxies belong to different
+    subnets and hosts as much as possible.
+
+    The subnets take turns, and inside each subnet the hosts take turns, so
+    a block of proxies from one provider or many ports of one IP are spread
+    over the whole run instead of being checked all at once.
+
+    :param proxies: The proxies.
+    :param subnet_prefix: The prefix length of the IPv4 subnets.
+    :return: The proxies in the new order.
+    """
+    # subnet -> host -> proxies
+    subnets: OrderedDict = OrderedDict()
+    for proxy in proxies:
+        hosts = subnets.setdefault(subnet_of(proxy.ip, subnet_prefix), OrderedDict())
+        hosts.setdefault(proxy.ip, []).append(proxy)
+
+    def round_robin(groups: _List[_List]) -> _List:
+        return [item for items in itertools.zip_longest(*groups) for item in items
+                if item is not None]
+
+    return round_robin([
+        round_robin(list(hosts.values())) for hosts in subnets.values()
+    ])
+
+
+def check_order(
+    proxies: _Iterable[Proxy],
+    order: _Optional[_Union[str, _Callable]] = None,
+    subnet_prefix: int = 24
+) -> _List[Proxy]:
+    """Returns the proxies in the order they should be checked in.
+
+    The proxies are interleaved by subnet and host and then, if an order is
+    given, sorted by it; the sort is stable, so the proxies with the same
+    key stay interleaved.
+
+    :param proxies: The proxies.
+    :param order: One of latency, connect_time, ttfb or success_ratio to check
+            the best proxies of the previous checks first, or a key function
+            that returns lower values for the proxies to check first.
+    :param subnet_prefix: The prefix length of the IPv4 subnets.
+    :return: The proxies in the order to check them in.
+    """
+    ordered = interleave(proxies, subnet_prefix)
+    if order is not None:
+        ordered.sort(key=order if callable(order) else ProxyList._metric_key(order))
+    return ordered
+
+
+class HostLimiter:
+    """This class limits the number of checks in flight per host and per
+    subnet, so many proxies of one provider do not get rate limited and
+    reported as dead.
+
+    `acquire` and `release` are used from threads and `acquire_async` and
+    `release_async` from coroutines; one limiter must not be used from
+    both.
+    """
+
+    def __init__(
+        self,
+        max_per_host: _Optional[int] = None,
+        max_per_subnet: _Optional[int] = None,
+        subnet_prefix: int = 24
+    ) -> None:
+        """
+        :param max_per_host: The maximum number of checks in flight per IP.
+        :param max_per_subnet: The maximum number of checks in flight per subnet.
+        :param subnet_prefix: The prefix length of the IPv4 subnets.
+        """
+        for name, value in (('max_per_host', max_per_host),
+                            ('max_per_subnet', max_per_subnet)):
+            if value is not None and value < 1:
+                raise ValueError(f'The {name}({value}) must be at least 1.')
+        self.max_per_host: _Optional[int] = max_per_host
+        self.max_per_subnet: _Optional[int] = max_per_subnet
+        self.subnet_prefix: int = subnet_prefix
+        self._hosts: Counter = Counter()
+        self._subnets: Counter = Counter()
+        self._condition = threading.Condition()
+        self._async_condition: _Optional[asyncio.Condition] = None
+
+    @property
+    def enabled(self) -> bool:
+        """False if there are no limits, in which case acquiring never waits."""
+        return self.max_per_host is not None or self.max_per_subnet is not None
+
+    def _keys(self, proxy: Proxy) -> _Tuple[str, str]:
+        return proxy.ip, subnet_of(proxy.ip, self.subnet_prefix)
+
+    def _try_acquire(self, proxy: Proxy) -> bool:
+        host, subnet = self._keys(proxy)
+        if self.max_per_host is not None and self._hosts[host] >= self.max_per_host:
+            return False
+        if self.max_per_subnet is not None and \
+                self._subnets[subnet] >= self.max_per_subnet:
+            return False
+        self._hosts[host] += 1
+        self._subnets[subnet] += 1
+        return True
+
+    def _release(self, proxy: Proxy) -> None:
+        host, subnet = self._keys(proxy)
+        self._hosts[host] -= 1
+        if self._hosts[host] <= 0:
+            del self._hosts[host]
+        self._subnets[subnet] -= 1
+        if self._subnets[subnet] <= 0:
+            del self._subnets[subnet]
+
+    def acquire(self, proxy: Proxy, timeout: _Optional[float] = None) -> bool:
+        """Waits until the proxy may be checked and counts it as in flight.
+
+        :param proxy: The proxy about to be checked.
+        :param timeout: The maximum number of seconds to wait.
+        :return: True if the proxy may be checked, False if the timeout passed.
+        """
+        if not self.enabled:
+            return True
+        with self._condition:
+            return self._condition.wait_for(lambda: self._try_acquire(proxy), timeout)
+
+    def release(self, proxy: Proxy) -> None:
+        """Counts a checked proxy as no longer in flight.
+
+        :param proxy: The proxy that was checked.
+        """
+        if not self.enabled:
+            return
+        with self._condition:
+            self._release(proxy)
+            self._condition.notify_all()
+
+    async def acquire_async(self, proxy: Proxy) -> None:
+        """The coroutine version of `acquire`; wrap it in `asyncio.wait_for` to
+        give up after a timeout.
+
+        :param proxy: The proxy about to be checked.
+        """
+        if not self.enabled:
+            return
+        if self._async_condition is None:
+            self._async_condition = asyncio.Condition()
+        async with self._async_condition:
+            await self._async_condition.wait_for(lambda: self._try_acquire(proxy))
+
+    async def release_async(self, proxy: Proxy) -> None:
+        """The coroutine version of `release`.
+
+        :param proxy: The proxy that was checked.
+        """
+        if not self.enabled:
+            return
+        async with self._async_condition:
+            self._release(proxy)
+            self._async_condition.notify_all()
+
+    def __repr__(self) -> str:
+        return (
+            f'HostLimiter(max_per_host={self.max_per_host}, '
+            f'max_per_subnet={self.max_per_subnet}, '
+            f'subnet_prefix={self.subnet_prefix})'
+        )
@@ -0,0 +1,344 @@
+# ProxyEater.Metrics.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import json
+import math
+import bisect  # This module is used to find the bucket of an observation.
+import pathlib
+import threading
+from typing import (Any as _Any, Dict as _Dict, List as _List, Tuple as _Tuple,
+                    Union as _Union, Iterable as _Iterable, Optional as _Optional)
+
+__all__ = [
+    'Histogram', 'Metrics', 'enable_metrics', 'disable_metrics', 'get_metrics',
+    'observe', 'increment'
+]
+
+# The upper bounds of the buckets of the histograms in seconds
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+# The help lines of the Prometheus export
+DESCRIPTIONS = {
+    'check_seconds': 'The duration of the checks of single proxies.',
+    'check_phase_seconds': 'The duration of each phase of the checks of single '
+    'proxies.',
+    'check_queue_wait_seconds': 'The time the proxies waited for a free worker.',
+    'check_limit_wait_seconds': 'The time the proxies waited for the per-host and '
+    'per-subnet limits.',
+    'check_prefilter_seconds': 'The duration of the pre-filters of the checks.',
+    'check_run_seconds': 'The duration of the checks of whole lists.',
+    'scrape_request_seconds': 'The duration of the requests to the sources; the '
+    'streamed pages are timed until their headers arrive.',
+    'scrape_parse_seconds': 'The duration of parsing the pages of the sources.',
+    'scraped_proxies_total': 'The number of proxies found in the sources.',
+    'scrape_failures_total': 'The number of sources that could not be scraped.',
+    'scrape_cache_total': 'The number of pages of the sources looked up in the '
+    'source cache, by whether they were fresh, not modified or fetched again.',
+    'geolocation_request_seconds': 'The duration of the geolocation requests.'
+}
+
+# A metric name and its sorted label pairs
+_Key = _Tuple[str, _Tuple[_Tuple[str, str], ...]]
+
+
+class Histogram:
+    """This class counts observations in fixed buckets, which keeps recording
+    cheap and lets histograms of different processes be added up."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: _Iterable[float] = DEFAULT_BUCKETS) -> None:
+        """
+        :param buckets: The sorted upper bounds of the buckets; a last bucket
+                catches everything above them.
+        """
+        self.buckets: _Tuple[float, ...] = tuple(buckets)
+        self.counts: _List[int] = [0] * (len(self.buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """Records an observation.
+
+        :param value: The observed value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> _Optional[float]:
+        """Estimates a quantile by interpolating inside its bucket.
+
+        :param q: The quantile(0-1).
+        :return: The estimate, or None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):  # Above the last bound
+                    return self.buckets[-1] if self.buckets else None
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1] if self.buckets else None
+
+    def cumulative(self) -> _List[_Tuple[float, int]]:
+        """Returns the (upper bound, observations up to it) pairs, ending with
+        infinity."""
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def __repr__(self) -> str:
+        return f'Histogram(count={self.count}, sum={self.sum})'
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+
+def _format_labels(labels: _Iterable[_Tuple[str, str]]) -> str:
+    pairs = ','.join(
+        f'{name}="' + value.replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n') + '"'
+        for name, value in labels
+    )
+    return '{' + pairs + '}' if pairs else ''
+
+
+class Metrics:
+    """This class collects the counters and the timing histograms recorded by
+    the instrumented parts of ProxyEater.
+
+    The phases of check_phase_seconds are connect, handshake, ttfb, body and
+    classify; requests does not report the first two, so with the threads
+    engine they are part of ttfb.
+
+    Nothing is recorded until a registry is enabled, so the hooks cost a
+    single check when the metrics are not used:
+
+    >>> metrics = enable_metrics()
+    >>> proxies.check_all()
+    >>> metrics.write('metrics.prom')
+    """
+
+    def __init__(self, buckets: _Iterable[float] = DEFAULT_BUCKETS) -> None:
+        """
+        :param buckets: The upper bounds of the buckets of the histograms.
+        """
+        self.buckets: _Tuple[float, ...] = tuple(buckets)
+        self.counters: _Dict[_Key, float] = {}
+        self.histograms: _Dict[_Key, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Records an observation, usually a duration in seconds.
+
+        :param name: The name of the histogram.
+        :param value: The observed value.
+        :param labels: The labels of the observation, e.g. phase='connect'.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Adds to a counter.
+
+        :param name: The name of the counter.
+        :param amount: The amount to add.
+        :param labels: The labels of the counter.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        """Forgets everything recorded so far."""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def to_dict(self) -> _Dict[str, _List[_Dict[str, _Any]]]:
+        """Returns the recorded metrics as plain data.
+
+        :return: A dictionary with a list of counters and a list of histograms;
+                each histogram has its cumulative buckets and the estimated
+                50th, 90th and 99th percentiles.
+        """
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'p50': histogram.quantile(0.5),
+                    'p90': histogram.quantile(0.9),
+                    'p99': histogram.quantile(0.99),
+                    'buckets': [[_format_bound(bound), count]
+                                for bound, count in histogram.cumulative()]
+                }
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+        return {'counters': counters, 'histograms': histograms}
+
+    def merge(self, data: _Dict[str, _List[_Dict[str, _Any]]]) -> None:
+        """Adds the metrics made by `to_dict`, e.g. in another process, to
+        these ones.
+
+        :param data: The output of `to_dict` of a registry with the same buckets.
+        """
+        with self._lock:
+            # Nothing is added if any of the histograms does not fit
+            for item in data.get('histograms', []):
+                key = (item['name'], tuple(sorted(item['labels'].items())))
+                histogram = self.histograms.get(key)
+                counts = len(self.buckets) + 1 if histogram is None else \
+                    len(histogram.counts)
+                if len(item['buckets']) != counts:
+                    raise ValueError(
+                        f'The buckets of the histogram {item["name"]} do not match.'
+                    )
+            for counter in data.get('counters', []):
+                key = (counter['name'], tuple(sorted(counter['labels'].items())))
+                self.counters[key] = self.counters.get(key, 0) + counter['value']
+            for item in data.get('histograms', []):
+                key = (item['name'], tuple(sorted(item['labels'].items())))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(self.buckets)
+                previous = 0
+                for index, (_, total) in enumerate(item['buckets']):
+                    histogram.counts[index] += total - previous
+                    previous = total
+                histogram.sum += item['sum']
+                histogram.count += item['count']
+
+    def to_json(self, indent: _Optional[int] = 4) -> str:
+        """Returns the recorded metrics as a json string.
+
+        :param indent: The indentation of the json string.
+        """
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = 'proxyeater_') -> str:
+        """Returns the recorded metrics in the Prometheus text format, ready for
+        the textfile collector of the node exporter or a push gateway.
+
+        :param prefix: The prefix of the metric names.
+        """
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, histogram.cumulative(), histogram.sum, histogram.count)
+                for key, histogram in self.histograms.items()
+            )
+        lines = []
+        last_name = None
+        for (name, labels), value in counters:
+            if name != last_name:
+                if name in DESCRIPTIONS:
+                    lines.append(f'# HELP {prefix}{name} {DESCRIPTIONS[name]}')
+                lines.append(f'# TYPE {prefix}{name} counter')
+                last_name = name
+            lines.append(f'{prefix}{name}{_format_labels(labels)} {value}')
+        for (name, labels), cumulative, sum_, count in histograms:
+            if name != last_name:
+                if name in DESCRIPTIONS:
+                    lines.append(f'# HELP {prefix}{name} {DESCRIPTIONS[name]}')
+                lines.append(f'# TYPE {prefix}{name} histogram')
+                last_name = name
+            for bound, total in cumulative:
+                bucket_labels = labels + (('le', _format_bound(bound)), )
+                lines.append(f'{prefix}{name}_bucket{_format_labels(bucket_labels)} '
+                             f'{total}')
+            lines.append(f'{prefix}{name}_sum{_format_labels(labels)} {sum_}')
+            lines.append(f'{prefix}{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: _Union[str, pathlib.Path], format_: _Optional[str] = None
+              ) -> None:
+        """Writes the recorded metrics to a file.
+
+        :param path: The path of the file.
+        :param format_: Either json or prometheus; by default json is used for the
+                files ending in .json and prometheus for the rest.
+        """
+        path = pathlib.Path(path)
+        if format_ is None:
+            format_ = 'json' if path.suffix.lower() == '.json' else 'prometheus'
+        if format_ == 'json':
+            text = self.to_json()
+        elif format_ == 'prometheus':
+            text = self.to_prometheus()
+        else:
+            raise ValueError(f'The format({format_}) must be json or prometheus.')
+        # Write next to the file and rename, so a collector never reads half of it
+        temporary = path.with_name(path.name + '.tmp')
+        temporary.write_text(text, encoding='utf-8')
+        temporary.replace(path)
+
+    def __repr__(self) -> str:
+        return (
+            f'Metrics(counters={len(self.counters)}, '
+            f'histograms={len(self.histograms)})'
+        )
+
+
+# The registry the hooks record into, or None while the metrics are disabled
+_metrics: _Optional[Metrics] = None
+
+
+def enable_metrics(metrics: _Optional[Metrics] = None) -> Metrics:
+    """Starts recording the metrics of the checks, the scrapers and the
+    geolocation requests.
+
+    :param metrics: The registry to record into(default: a new one).
+    :return: The registry.
+    """
+    global _metrics
+    _metrics = metrics if metrics is not None else Metrics()
+    return _metrics
+
+
+def disable_metrics() -> None:
+    """Stops recording the metrics."""
+    global _metrics
+    _metrics = None
+
+
+def get_metrics() -> _Optional[Metrics]:
+    """Returns the registry the metrics are recorded into, or None if they are
+    disabled."""
+    return _metrics
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Records an observation in the enabled registry; does nothing if the
+    metrics are disabled. See `Metrics.observe`."""
+    if _metrics is not None:
+        _metrics.observe(name, value, **labels)
+
+
+def increment(name: str, amount: float = 1, **labels: str) -> None:
+    """Adds to a counter of the enabled registry; does nothing if the metrics
+    are disabled. See `Metrics.increment`."""
+    if _metrics is not None:
+        _metrics.increment(name, amount, **labels)
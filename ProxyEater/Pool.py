@@ -0,0 +1,89 @@
+# ProxyEater.Pool.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import time  # This module is used to time the new connections.
+import threading  # This module is used to keep the connect times of each thread apart.
+from collections import OrderedDict
+from typing import Any as _Any, Dict as _Dict, Optional as _Optional
+
+from requests.adapters import HTTPAdapter
+
+__all__ = ['ProxyPoolAdapter', 'pop_connect_time']
+
+# The seconds the last connection opened by each thread took to connect
+_connect_times = threading.local()
+# The timed subclasses of the urllib3 pool classes, made once per class
+_timed_pools: _Dict[type, type] = {}
+_timed_pools_lock = threading.Lock()
+
+
+def pop_connect_time() -> _Optional[float]:
+    """Returns the seconds the last connection opened by this thread through
+    a `ProxyPoolAdapter` took to connect, and forgets it.
+
+    :return: The seconds, or None if no connection was opened since the last
+            call, e.g. because a pooled connection was reused.
+    """
+    connect_time = getattr(_connect_times, 'value', None)
+    _connect_times.value = None
+    return connect_time
+
+
+def _timed_pool(pool_class: type) -> type:
+    """Returns a subclass of a urllib3 connection pool class whose connections
+    record how long opening their socket took: the TCP connect to an HTTP
+    proxy, or the connect and the handshake of a SOCKS proxy."""
+    with _timed_pools_lock:
+        timed_pool = _timed_pools.get(pool_class)
+        if timed_pool is not None:
+            return timed_pool
+
+        class TimedConnection(pool_class.ConnectionCls):
+
+            def _new_conn(self):
+                start_time = time.perf_counter()
+                sock = super()._new_conn()
+                _connect_times.value = time.perf_counter() - start_time
+                return sock
+
+        timed_pool = _timed_pools[pool_class] = type(
+            f'Timed{pool_class.__name__}', (pool_class, ),
+            {'ConnectionCls': TimedConnection}
+        )
+        return timed_pool
+
+
+class ProxyPoolAdapter(HTTPAdapter):
+    """An HTTPAdapter that keeps the connection pools of the last few proxies
+    it talked to and closes the older ones, so the connections to a proxy
+    checked again soon are reused without keeping a pool for every proxy
+    of a large list.
+
+    Its connections record how long they took to connect; see
+    `pop_connect_time`.
+    """
+
+    def __init__(self, max_proxies: int = 8, **kwargs: _Any) -> None:
+        """
+        :param max_proxies: The number of proxies whose pools are kept.
+        :param kwargs: The arguments of HTTPAdapter.
+        """
+        super().__init__(**kwargs)
+        self.max_proxies: int = max_proxies
+        self.proxy_manager = OrderedDict()
+
+    def proxy_manager_for(self, proxy: str, **proxy_kwargs: _Any):
+        is_new = proxy not in self.proxy_manager
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if is_new:
+            manager.pool_classes_by_scheme = {
+                scheme: _timed_pool(pool_class)
+                for scheme, pool_class in manager.pool_classes_by_scheme.items()
+            }
+        self.proxy_manager.move_to_end(proxy)
+        while len(self.proxy_manager) > self.max_proxies:
+            _, oldest = self.proxy_manager.popitem(last=False)
+            oldest.clear()
+        return manager
@@ -0,0 +1,266 @@
+# ProxyEater.Prefilter.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import time  # This module is used to measure the connect times.
+import errno
+import socket  # This module is used to open non-blocking connections.
+import selectors  # This module is used to wait on thousands of sockets at once.
+from typing import (Set as _Set, Dict as _Dict, List as _List, Tuple as _Tuple,
+                    Iterable as _Iterable, Optional as _Optional)
+
+from .Proxy import Proxy, ProxyList, ProxyStatus
+
+__all__ = ['PrefilterReport', 'tcp_prefilter', 'host_probe', 'run_prefilters']
+
+
+class PrefilterReport:
+    """This class holds the outcome of a `tcp_prefilter` run."""
+
+    def __init__(
+        self, checked: int, unreachable: ProxyList, elapsed: float, saved: float
+    ) -> None:
+        """
+        :param checked: The number of proxies that were probed.
+        :param unreachable: The proxies whose port refused or ignored the connection.
+        :param elapsed: The wall time the pre-filter took in seconds.
+        :param saved: The estimated wall time saved in the full check stage in
+                seconds.
+        """
+        self.checked: int = checked
+        self.unreachable: ProxyList = unreachable
+        self.elapsed: float = elapsed
+        self.saved: float = saved
+
+    @property
+    def removed(self) -> int:
+        return len(self.unreachable)
+
+    def __repr__(self) -> str:
+        return (
+            f'PrefilterReport(checked={self.checked}, removed={self.removed}, '
+            f'elapsed={self.elapsed:.2f}, saved={self.saved:.2f})'
+        )
+
+
+def _start_connect(proxy: Proxy) -> socket.socket:
+    family, type_, proto, _, address = socket.getaddrinfo(
+        proxy.ip, proxy.port, type=socket.SOCK_STREAM
+    )[0]
+    sock = socket.socket(family, type_, proto)
+    sock.setblocking(False)
+    code = sock.connect_ex(address)
+    if code not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+        sock.close()
+        raise OSError(code, 'connect failed')
+    return sock
+
+
+def _probe(
+    proxies: _Iterable[Proxy], timeout: float, concurrency: int
+) -> _Tuple[_Dict[Proxy, float], _Set[Proxy]]:
+    """Opens a plain TCP connection to every proxy.
+
+    :return: The connect times of the proxies that accepted the connection and
+            the proxies whose host refused it; the hosts of the rest did not
+            answer at all.
+    """
+    pending = iter(proxies)
+    selector = selectors.DefaultSelector()
+    # The sockets in flight: file descriptor -> (socket, proxy, deadline)
+    in_flight: _Dict[int, _Tuple[socket.socket, Proxy, float]] = {}
+    connect_times: _Dict[Proxy, float] = {}
+    refused: _Set[Proxy] = set()
+    exhausted = False
+
+    def finish(fd: int, error: _Optional[int]) -> None:
+        sock, proxy, deadline = in_flight.pop(fd)
+        selector.unregister(sock)
+        sock.close()
+        if error == 0:
+            connect_times[proxy] = time.perf_counter() - (deadline - timeout)
+        elif error == errno.ECONNREFUSED:
+            refused.add(proxy)
+
+    try:
+        while not exhausted or in_flight:
+            while not exhausted and len(in_flight) < concurrency:
+                proxy = next(pending, None)
+                if proxy is None:
+                    exhausted = True
+                    break
+                try:
+                    sock = _start_connect(proxy)
+                except OSError as ex:
+                    if ex.errno == errno.ECONNREFUSED:
+                        refused.add(proxy)
+                    continue
+                in_flight[sock.fileno()] = (sock, proxy, time.perf_counter() + timeout)
+                selector.register(sock, selectors.EVENT_WRITE)
+            if not in_flight:
+                continue
+
+            next_deadline = min(deadline for _, _, deadline in in_flight.values())
+            for key, _ in selector.select(max(next_deadline - time.perf_counter(), 0)):
+                finish(
+                    key.fd, key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                )
+            now = time.perf_counter()
+            for fd, (_, _, deadline) in list(in_flight.items()):
+                if deadline <= now:
+                    finish(fd, None)
+    finally:
+        for sock, _, _ in in_flight.values():
+            sock.close()
+        selector.close()
+    return connect_times, refused
+
+
+def _report(
+    proxies: ProxyList, checked: int, unreachable: ProxyList, remove_dead: bool,
+    start_time: float, check_timeout: float, check_parallelism: int
+) -> PrefilterReport:
+    for proxy in unreachable:
+        proxy.status = ProxyStatus.DEAD
+        if remove_dead:
+            proxies.discard(proxy)
+
+    elapsed = time.perf_counter() - start_time
+    saved = len(unreachable) * check_timeout / max(check_parallelism, 1) - elapsed
+    return PrefilterReport(
+        checked=checked, unreachable=unreachable, elapsed=elapsed, saved=max(saved, 0)
+    )
+
+
+def tcp_prefilter(
+    proxies: ProxyList,
+    timeout: float = 1.5,
+    concurrency: int = 500,
+    remove_dead: bool = True,
+    check_timeout: float = 10,
+    check_parallelism: int = 1
+) -> PrefilterReport:
+    """Opens a plain TCP connection to every proxy and marks the ones whose
+    port does not accept it within the timeout as DEAD.
+
+    This is much cheaper than a full check, so running it first keeps
+    the full check from waiting on proxies that are not even listening.
+    The connect time of the reachable proxies is recorded on them.
+
+    :param proxies: The proxies to probe.
+    :param timeout: The connect timeout of each probe.
+    :param concurrency: The maximum number of connections open at once.
+    :param remove_dead: If True, the unreachable proxies will be removed from the
+            list.
+    :param check_timeout: The timeout of the full check; used to estimate the saved
+            time.
+    :param check_parallelism: The number of full checks that run at once; used to
+            estimate the saved time.
+    :return: A PrefilterReport.
+    """
+    start_time = time.perf_counter()
+    to_probe = proxies.copy()
+    connect_times, _ = _probe(to_probe, timeout, concurrency)
+    unreachable = ProxyList()
+    for proxy in to_probe:
+        if proxy in connect_times:
+            proxy.connect_time = connect_times[proxy]
+        else:
+            unreachable.add(proxy)
+    return _report(
+        proxies, len(to_probe), unreachable, remove_dead, start_time, check_timeout,
+        check_parallelism
+    )
+
+
+def host_probe(
+    proxies: ProxyList,
+    timeout: float = 1.5,
+    concurrency: int = 500,
+    remove_dead: bool = True,
+    check_timeout: float = 10,
+    check_parallelism: int = 1
+) -> PrefilterReport:
+    """Probes one port of every IP and marks all the proxies of the IPs that
+    do not answer at all as DEAD.
+
+    Scraped lists often have dozens of ports of one IP; if the host is down,
+    every one of them would wait for the full timeout. A host that refuses
+    the connection is up, so only the probed port is marked as DEAD and
+    the other ports are left for the full check.
+
+    :param proxies: The proxies to probe.
+    :param timeout: The connect timeout of each probe.
+    :param concurrency: The maximum number of connections open at once.
+    :param remove_dead: If True, the unreachable proxies will be removed from the
+            list.
+    :param check_timeout: The timeout of the full check; used to estimate the saved
+            time.
+    :param check_parallelism: The number of full checks that run at once; used to
+            estimate the saved time.
+    :return: A PrefilterReport; `checked` is the number of probed IPs.
+    """
+    start_time = time.perf_counter()
+    hosts: _Dict[str, _List[Proxy]] = {}
+    for proxy in proxies:
+        hosts.setdefault(proxy.ip, []).append(proxy)
+    probes = [ports[0] for ports in hosts.values()]
+    connect_times, refused = _probe(probes, timeout, concurrency)
+    unreachable = ProxyList()
+    for proxy in probes:
+        if proxy in connect_times:
+            proxy.connect_time = connect_times[proxy]
+        elif proxy in refused:
+            unreachable.add(proxy)
+        else:
+            unreachable.update(hosts[proxy.ip])
+    return _report(
+        proxies, len(probes), unreachable, remove_dead, start_time, check_timeout,
+        check_parallelism
+    )
+
+
+def run_prefilters(
+    proxies: ProxyList,
+    remove_dead: bool,
+    host_probe_timeout: _Optional[float],
+    prefilter_timeout: _Optional[float],
+    concurrency: int,
+    check_timeout: float,
+    check_parallelism: int
+) -> _Tuple[set, _Optional[PrefilterReport], _Optional[PrefilterReport]]:
+    """Runs `host_probe` and then `tcp_prefilter` on the proxies, skipping
+    the ones whose timeout is None.
+
+    :param proxies: The proxies about to be checked.
+    :param remove_dead: If True, the unreachable proxies will be removed from the
+            list.
+    :param host_probe_timeout: The connect timeout of `host_probe`.
+    :param prefilter_timeout: The connect timeout of `tcp_prefilter`.
+    :param concurrency: The maximum number of connections open at once.
+    :param check_timeout: The timeout of the full check.
+    :param check_parallelism: The number of full checks that run at once.
+    :return: The proxies left for the full check and the reports of the host
+            probe and of the pre-filter.
+    """
+    to_check = proxies.copy()
+    reports = []
+    for function, timeout in ((host_probe, host_probe_timeout),
+                              (tcp_prefilter, prefilter_timeout)):
+        if timeout is None:
+            reports.append(None)
+            continue
+        # The filters drop the unreachable proxies from the copy they are given
+        report = function(
+            to_check,
+            timeout=timeout,
+            concurrency=concurrency,
+            check_timeout=check_timeout,
+            check_parallelism=check_parallelism
+        )
+        if remove_dead:
+            for proxy in report.unreachable:
+                proxies.discard(proxy)
+        reports.append(report)
+    return to_check, reports[0], reports[1]
@@ -6,16 +6,24 @@ from __future__ import annotations
 import os
 import csv  # This module is used to write proxies to a csv file.
 import json  # This module is used to parse the ProxyList to json.
-import time  # This module is used to sleep the program.
-import threading  # This module is used to create threads.
+import time  # This module is used to measure the latency of the proxies.
+import heapq  # This module is used to select the fastest proxies.
 from enum import Enum
-from typing import (Dict as _Dict, Union as _Union, Callable as _Callable,
-                    Iterable as _Iterable, Optional as _Optional)
+from collections import deque
+from typing import (Dict as _Dict, List as _List, Tuple as _Tuple, Union as _Union,
+                    BinaryIO as _BinaryIO, Callable as _Callable, Iterable as _Iterable,
+                    Optional as _Optional, TYPE_CHECKING)
 
 import requests  # This module is used for sending requests to the servers.
 from requests.exceptions import InvalidProxyURL
 
-__all__ = ['Proxy', 'ProxyType', 'ProxyList', 'ProxyStatus']
+from .Metrics import observe
+from .Pool import pop_connect_time
+
+if TYPE_CHECKING:  # Cache imports this module
+    from .Cache import CheckCache
+
+__all__ = ['Proxy', 'ProxyType', 'ProxyList', 'ProxyStatus', 'ProxyAnonymity']
 
 
 class ProxyStatus(Enum):
@@ -42,6 +50,34 @@ class ProxyStatus(Enum):
         raise ValueError(f'The proxy type({name}) is not valid.')
 
 
+class ProxyAnonymity(Enum):
+    """This class is used to define how much a proxy hides about its
+    clients; the higher, the more anonymous."""
+    UNKNOWN = 0
+    TRANSPARENT = 1  # The target sees the IP of the client
+    ANONYMOUS = 2  # The IP is hidden but the target can tell a proxy is used
+    ELITE = 3  # The target cannot tell a proxy is used
+
+    @staticmethod
+    def from_name(name: str) -> ProxyAnonymity:
+        """This method is used to for getting a ProxyAnonymity object from its
+        name.
+
+        :param name: The name of the ProxyAnonymity.
+        :return: The ProxyAnonymity.
+        """
+        name = name.lower()
+        if name == 'unknown':
+            return ProxyAnonymity.UNKNOWN
+        if name == 'transparent':
+            return ProxyAnonymity.TRANSPARENT
+        if name == 'anonymous':
+            return ProxyAnonymity.ANONYMOUS
+        if name == 'elite':
+            return ProxyAnonymity.ELITE
+        raise ValueError(f'The proxy anonymity({name}) is not valid.')
+
+
 class ProxyType(Enum):
     """This class is used to define the type of proxy."""
     HTTP = 0
@@ -71,6 +107,23 @@ class ProxyType(Enum):
 class Proxy:
     geolocation_info: dict = {}
     status: ProxyStatus = ProxyStatus.UNKNOWN
+    # Filled in by the checks that classify the proxies
+    anonymity: ProxyAnonymity = ProxyAnonymity.UNKNOWN
+    supports_https: _Optional[bool] = None  # Whether the proxy can CONNECT
+    # The timings of the last successful check in seconds
+    connect_time: _Optional[float] = None
+    ttfb: _Optional[float] = None  # Time to first byte
+    latency: _Optional[float] = None
+    # The unix timestamps of the last successful and the last failed checks
+    last_success: _Optional[float] = None
+    last_failure: _Optional[float] = None
+    # The number of recent checks used to compute the success ratio
+    HISTORY_SIZE: int = 10
+    # The names of the values in `Proxy.metrics`
+    METRICS = (
+        'connect_time_ms', 'ttfb_ms', 'latency_ms', 'last_success', 'last_failure',
+        'success_ratio'
+    )
 
     def __init__(self, ip: str, port: int, type_: ProxyType) -> None:
         self.ip: str = ip
@@ -78,20 +131,87 @@ class Proxy:
         if isinstance(type_, str):
             type_ = ProxyType.from_name(type_)
         self.type: ProxyType = type_
+        self.history: deque = deque(maxlen=self.HISTORY_SIZE)
+
+    def record_check(
+        self,
+        alive: bool,
+        connect_time: _Optional[float] = None,
+        ttfb: _Optional[float] = None,
+        latency: _Optional[float] = None
+    ) -> None:
+        """This method is used to record the outcome of a check.
+
+        The timings are only updated by successful checks, so they always
+        describe the last time the proxy worked.
+
+        :param alive: True if the check succeeded.
+        :param connect_time: The time it took to connect to the proxy.
+        :param ttfb: The time it took to receive the first byte of the response.
+        :param latency: The time the whole check took.
+        """
+        self.history.append(alive)
+        if alive:
+            self.last_success = time.time()
+            if connect_time is not None:
+                self.connect_time = connect_time
+            if ttfb is not None:
+                self.ttfb = ttfb
+            if latency is not None:
+                self.latency = latency
+        else:
+            self.last_failure = time.time()
+
+    @property
+    def success_ratio(self) -> _Optional[float]:
+        """The ratio of the recent checks that succeeded or None if the proxy
+        was never checked."""
+        if not self.history:
+            return None
+        return sum(self.history) / len(self.history)
+
+    @property
+    def metrics(self) -> _Dict[str, _Optional[float]]:
+        """The latency and health metrics of the proxy."""
+
+        def milliseconds(seconds: _Optional[float]) -> _Optional[int]:
+            return None if seconds is None else round(seconds * 1000)
+
+        return {
+            'connect_time_ms': milliseconds(self.connect_time),
+            'ttfb_ms': milliseconds(self.ttfb),
+            'latency_ms': milliseconds(self.latency),
+            'last_success': self.last_success,
+            'last_failure': self.last_failure,
+            'success_ratio': self.success_ratio
+        }
 
     def check_status(
         self,
-        timeout: int = 10,
+        timeout: _Union[float, _Tuple[float, float]] = 10,
         url: str = 'http://icanhazip.com/',
         on_success_callback: _Optional[_Callable] = None,
-        on_failure_callback: _Optional[_Callable] = None
+        on_failure_callback: _Optional[_Callable] = None,
+        session: _Optional[requests.Session] = None,
+        classify: bool = False,
+        real_ip: _Optional[str] = None
     ) -> bool:
         """This method is used to check if the proxy is alive.
 
-        :param timeout: The timeout of the request.
+        :param timeout: The timeout of the request; either one number used for both
+                connecting and reading or a (connect, read) tuple.
         :param url: The url to try to connect to through the proxy.
         :param on_success_callback: The callback to be called if the request succeeds.
         :param on_failure_callback: The callback to be called if the request fails.
+        :param session: The session to send the request with. Passing a session
+                avoids creating a new one for every check; the sessions of
+                `ProxyChecker` also measure the connect time of the new
+                connections, which is left as it was without them and when a
+                pooled connection is reused.
+        :param classify: If True, the anonymity of an alive proxy is read from the
+                same response and it is asked to CONNECT to the HTTPS port of
+                the url's host.
+        :param real_ip: Our own IP, used to tell whether the proxy is transparent.
         :return: True if the proxy is alive, False otherwise.
         """
         if on_success_callback is not None:
@@ -104,17 +224,152 @@ class Proxy:
                 raise TypeError('on_failure_callback must be a callable.')
         else:
             on_failure_callback = lambda proxy, error: None
+        get = session.get if session is not None else requests.get
+        start_time = time.perf_counter()
+        pop_connect_time()  # Forget the connections of the earlier requests
         try:
-            if requests.get(url, proxies={'http': str(self), 'https': str(self)},
-                            timeout=timeout).status_code == 200:
+            response = get(
+                url, proxies={'http': str(self), 'https': str(self)}, timeout=timeout
+            )
+            if response.status_code == 200:
+                connect_time = pop_connect_time()
+                ttfb = response.elapsed.total_seconds()
+                latency = time.perf_counter() - start_time
+                self.record_check(
+                    True, connect_time=connect_time, ttfb=ttfb, latency=latency
+                )
+                if connect_time is not None:
+                    observe('check_phase_seconds', connect_time, phase='connect')
+                    observe('check_phase_seconds', ttfb - connect_time, phase='ttfb')
+                else:
+                    observe('check_phase_seconds', ttfb, phase='ttfb')
+                observe('check_phase_seconds', latency - ttfb, phase='body')
+                if classify:
+                    from .Classifier import (classify_anonymity, connect_target,
+                                             probe_connect)
+
+                    classify_start_time = time.perf_counter()
+
+                    self.anonymity = classify_anonymity(
+                        response.content, response.headers, real_ip
+                    )
+                    if self.type in (ProxyType.SOCKS4, ProxyType.SOCKS5) or \
+                            url.startswith('https://'):
+                        # The check itself went through a tunnel
+                        self.supports_https = True
+                    else:
+                        self.supports_https = probe_connect(
+                            self, *connect_target(url),
+                            timeout=timeout[1] if isinstance(timeout, (tuple, list))
+                            else timeout
+                        )
+                    observe(
+                        'check_phase_seconds',
+                        time.perf_counter() - classify_start_time,
+                        phase='classify'
+                    )
+                observe(
+                    'check_seconds', time.perf_counter() - start_time, result='alive'
+                )
                 self.status = ProxyStatus.ALIVE
                 on_success_callback(self, ProxyStatus.ALIVE)
                 return True
             else:
+                self.record_check(False)
+                observe(
+                    'check_seconds', time.perf_counter() - start_time, result='dead'
+                )
                 self.status = ProxyStatus.DEAD
                 on_success_callback(self, ProxyStatus.DEAD)
                 return False
         except Exception as ex:
+            self.record_check(False)
+            observe(
+                'check_seconds', time.perf_counter() - start_time, result='error'
+            )
+            self.status = ProxyStatus.DEAD
+            on_failure_callback(self, ex)
+            return False
+
+    async def check_status_async(
+        self,
+        timeout: _Union[float, _Tuple[float, float]] = 10,
+        url: str = 'http://icanhazip.com/',
+        on_success_callback: _Optional[_Callable] = None,
+        on_failure_callback: _Optional[_Callable] = None,
+        classify: bool = False,
+        real_ip: _Optional[str] = None
+    ) -> bool:
+        """This method is the coroutine version of `check_status`. It does
+        not block the event loop, so many proxies can be checked at once.
+
+        :param timeout: The timeout of the request; either one number used for both
+                connecting and reading or a (connect, read) tuple.
+        :param url: The url to try to connect to through the proxy.
+        :param on_success_callback: The callback to be called if the request succeeds.
+        :param on_failure_callback: The callback to be called if the request fails.
+        :param classify: If True, the anonymity of an alive proxy is read from the
+                same response and, on the same connection, it is asked to
+                CONNECT to the HTTPS port of the url's host.
+        :param real_ip: Our own IP, used to tell whether the proxy is transparent.
+        :return: True if the proxy is alive, False otherwise.
+        """
+        from .AsyncChecker import fetch_via_proxy
+        from .Classifier import classify_anonymity, connect_target
+
+        if on_success_callback is not None:
+            if not callable(on_success_callback):
+                raise TypeError('on_success_callback must be a callable.')
+        else:
+            on_success_callback = lambda proxy, status: None
+        if on_failure_callback is not None:
+            if not callable(on_failure_callback):
+                raise TypeError('on_failure_callback must be a callable.')
+        else:
+            on_failure_callback = lambda proxy, error: None
+        start_time = time.perf_counter()
+        try:
+            if isinstance(timeout, (tuple, list)):
+                connect_timeout, read_timeout = timeout
+            else:
+                connect_timeout = read_timeout = timeout
+            tunnel = self.type in (ProxyType.SOCKS4, ProxyType.SOCKS5) or \
+                url.startswith('https://')
+            response = await fetch_via_proxy(
+                self, url, connect_timeout, read_timeout,
+                connect_probe=connect_target(url) if classify and not tunnel else None
+            )
+            if response.status_code == 200:
+                self.record_check(
+                    True,
+                    connect_time=response.connect_time,
+                    ttfb=response.ttfb,
+                    latency=time.perf_counter() - start_time
+                )
+                if classify:
+                    self.anonymity = classify_anonymity(
+                        response.body, response.headers, real_ip
+                    )
+                    self.supports_https = tunnel or bool(response.supports_connect)
+                observe(
+                    'check_seconds', time.perf_counter() - start_time, result='alive'
+                )
+                self.status = ProxyStatus.ALIVE
+                on_success_callback(self, ProxyStatus.ALIVE)
+                return True
+            else:
+                self.record_check(False)
+                observe(
+                    'check_seconds', time.perf_counter() - start_time, result='dead'
+                )
+                self.status = ProxyStatus.DEAD
+                on_success_callback(self, ProxyStatus.DEAD)
+                return False
+        except Exception as ex:
+            self.record_check(False)
+            observe(
+                'check_seconds', time.perf_counter() - start_time, result='error'
+            )
             self.status = ProxyStatus.DEAD
             on_failure_callback(self, ex)
             return False
@@ -210,7 +465,10 @@ class Proxy:
             'type': self.type.name,
             'status': self.status.name,
             'scheme': self.type.name.lower(),
-            'geolocation_info': self.geolocation_info
+            'anonymity': self.anonymity.name,
+            'supports_https': self.supports_https,
+            'geolocation_info': self.geolocation_info,
+            **self.metrics
         }
 
     def __iter__(self):
@@ -218,11 +476,37 @@ class Proxy:
             (
                 ('ip', self.ip), ('port', self.port), ('type', self.type.name),
                 ('status', self.status.name), ('scheme', self.type.name.lower()),
-                ('geolocation_info', self.geolocation_info)
+                ('anonymity', self.anonymity.name),
+                ('supports_https', self.supports_https),
+                ('geolocation_info', self.geolocation_info), *self.metrics.items()
             )
         )
 
 
+def _json_list_end(file: _BinaryIO) -> _Tuple[int, bool]:
+    """Finds where the items appended to a json list file are written.
+
+    :param file: The json file, opened for reading and writing in binary mode.
+    :return: The position right after the last item, or after the opening
+            bracket of an empty list, and whether the list is empty.
+    """
+    def previous_char(position: int) -> _Tuple[int, bytes]:
+        # Skips the whitespace before the position
+        while position > 0:
+            file.seek(position - 1)
+            char = file.read(1)
+            if not char.isspace():
+                return position - 1, char
+            position -= 1
+        return 0, b''
+
+    position, char = previous_char(file.seek(0, os.SEEK_END))
+    if char != b']':
+        raise ValueError(f'The file {file.name} does not hold a json list.')
+    position, char = previous_char(position)
+    return position + 1, char == b'['
+
+
 class ProxyList(set):
 
     def __init__(self, proxies: _Optional[_Iterable[Proxy]] = None):
@@ -262,62 +546,197 @@ class ProxyList(set):
 
     def check_all(
         self,
-        timeout: int = 10,
+        timeout: _Union[float, _Tuple[float, float]] = 10,
         threads_no: int = 21,
-        url: str = 'http://icanhazip.com/',
+        url: _Union[str, _List[str]] = 'http://icanhazip.com/',
         remove_dead: bool = True,
-        on_progress_callback: _Optional[_Callable] = None
+        on_progress_callback: _Optional[_Callable] = None,
+        prefilter_timeout: _Optional[float] = None,
+        adaptive_percentile: _Optional[float] = None,
+        budget: _Optional[float] = None,
+        processes: _Optional[int] = None,
+        cache: _Optional[CheckCache] = None,
+        max_per_host: _Optional[int] = None,
+        max_per_subnet: _Optional[int] = None,
+        host_probe_timeout: _Optional[float] = None,
+        stop_after_alive: _Optional[int] = None,
+        order: _Optional[_Union[str, _Callable]] = None,
+        classify: bool = False
     ) -> None:
         """This method is used to check the status of all proxies in the list.
 
-        :param timeout: The timeout of the requests.
+        :param timeout: The timeout of the requests; either one number used for both
+                connecting and reading or a (connect, read) tuple.
         :param threads_no: The number of threads to use.
-        :param url: The url to try to connect to through the proxy.
+        :param url: The url to try to connect to through the proxy, or a list of
+                urls, e.g. of several judges, that the checks use in turn.
         :param remove_dead: If True, dead proxies will be removed from the list.
         :param on_progress_callback: A callback function to be called on each progress.
+        :param prefilter_timeout: If set, proxies whose port does not accept a TCP
+                connection within this many seconds are marked as dead without
+                a full check.
+        :param adaptive_percentile: If set (0-100), the timeouts are lowered to this
+                percentile of the latencies of the proxies found alive so far.
+        :param budget: If set, the run stops after this many seconds and the
+                proxies that were not checked yet are marked as UNKNOWN.
+        :param processes: If set to more than 1, the list is split into this many
+                shards and each shard is checked in its own process with
+                `threads_no` threads.
+        :param cache: A CheckCache; the proxies with a fresh result in it are not
+                checked again and the new results are stored in it.
+        :param max_per_host: The maximum number of checks in flight per IP.
+        :param max_per_subnet: The maximum number of checks in flight per /24
+                subnet.
+        :param host_probe_timeout: If set, one port of every IP is probed first with
+                this connect timeout and all the ports of the IPs that do not
+                answer are marked as dead without a full check.
+        :param stop_after_alive: If set, the run stops as soon as this many proxies
+                are found alive and the proxies left unchecked are marked as
+                UNKNOWN.
+        :param order: One of latency, connect_time, ttfb or success_ratio to check
+                the best proxies of the previous checks first, or a key function
+                that returns lower values for the proxies to check first.
+        :param classify: If True, the anonymity and the HTTPS support of the alive
+                proxies are found during the checks without extra requests to
+                the url.
         """
-        if on_progress_callback is not None:
-            if not callable(on_progress_callback):
-                raise TypeError(
-                    "ProxyList.check_all() argument on_progress_callback must be "
-                    "a callable."
-                )
+        if on_progress_callback is not None and not callable(on_progress_callback):
+            raise TypeError(
+                "ProxyList.check_all() argument on_progress_callback must be "
+                "a callable."
+            )
+
+        from .Checker import ProxyChecker, ShardedProxyChecker
+
+        to_check = self
+        if cache is not None:
+            to_check = cache.apply(self)
+            if on_progress_callback is not None:
+                callback = on_progress_callback
+                on_progress_callback = lambda _, progress: callback(self, progress)
+        if processes is not None and processes > 1:
+            ShardedProxyChecker(
+                processes,
+                threads_no=threads_no,
+                timeout=timeout,
+                url=url,
+                prefilter_timeout=prefilter_timeout,
+                adaptive_percentile=adaptive_percentile,
+                budget=budget,
+                max_per_host=max_per_host,
+                max_per_subnet=max_per_subnet,
+                host_probe_timeout=host_probe_timeout,
+                stop_after_alive=stop_after_alive,
+                order=order,
+                classify=classify
+            ).check(to_check, remove_dead and cache is None, on_progress_callback)
         else:
-            on_progress_callback = lambda proxy_list, progress: None
+            checker = ProxyChecker(
+                threads_no=threads_no,
+                timeout=timeout,
+                url=url,
+                prefilter_timeout=prefilter_timeout,
+                adaptive_percentile=adaptive_percentile,
+                budget=budget,
+                max_per_host=max_per_host,
+                max_per_subnet=max_per_subnet,
+                host_probe_timeout=host_probe_timeout,
+                stop_after_alive=stop_after_alive,
+                order=order,
+                classify=classify
+            )
+            try:
+                checker.check(
+                    to_check, remove_dead and cache is None, on_progress_callback
+                )
+            finally:
+                # Do not wait for the checks cut short by stop_after_alive
+                checker.close(wait=stop_after_alive is None)
+        if cache is not None:
+            cache.merge(self, to_check, remove_dead)
+
+    async def check_all_async(
+        self,
+        timeout: _Union[float, _Tuple[float, float]] = 10,
+        concurrency: int = 500,
+        url: _Union[str, _List[str]] = 'http://icanhazip.com/',
+        remove_dead: bool = True,
+        on_progress_callback: _Optional[_Callable] = None,
+        prefilter_timeout: _Optional[float] = None,
+        adaptive_percentile: _Optional[float] = None,
+        budget: _Optional[float] = None,
+        cache: _Optional[CheckCache] = None,
+        max_per_host: _Optional[int] = None,
+        max_per_subnet: _Optional[int] = None,
+        host_probe_timeout: _Optional[float] = None,
+        stop_after_alive: _Optional[int] = None,
+        order: _Optional[_Union[str, _Callable]] = None,
+        classify: bool = False
+    ) -> None:
+        """This method is the asyncio version of `check_all`. All the checks
+        run on the current event loop instead of on separate threads.
+
+        :param timeout: The timeout of the requests; either one number used for both
+                connecting and reading or a (connect, read) tuple.
+        :param concurrency: The maximum number of checks in flight at once.
+        :param url: The url to try to connect to through the proxy, or a list of
+                urls, e.g. of several judges, that the checks use in turn.
+        :param remove_dead: If True, dead proxies will be removed from the list.
+        :param on_progress_callback: A callback function to be called on each progress.
+        :param prefilter_timeout: If set, proxies whose port does not accept a TCP
+                connection within this many seconds are marked as dead without
+                a full check.
+        :param adaptive_percentile: If set (0-100), the timeouts are lowered to this
+                percentile of the latencies of the proxies found alive so far.
+        :param budget: If set, the run stops after this many seconds and the
+                proxies that were not checked yet are marked as UNKNOWN.
+        :param cache: A CheckCache; the proxies with a fresh result in it are not
+                checked again and the new results are stored in it.
+        :param max_per_host: The maximum number of checks in flight per IP.
+        :param max_per_subnet: The maximum number of checks in flight per /24
+                subnet.
+        :param host_probe_timeout: If set, one port of every IP is probed first with
+                this connect timeout and all the ports of the IPs that do not
+                answer are marked as dead without a full check.
+        :param stop_after_alive: If set, the run stops as soon as this many proxies
+                are found alive and the proxies left unchecked are marked as
+                UNKNOWN.
+        :param order: One of latency, connect_time, ttfb or success_ratio to check
+                the best proxies of the previous checks first, or a key function
+                that returns lower values for the proxies to check first.
+        :param classify: If True, the anonymity and the HTTPS support of the alive
+                proxies are found during the checks without extra requests to
+                the url.
+        """
+        from .AsyncChecker import AsyncProxyChecker
 
-        length = len(self)
-        finished: int = 0  # The number of proxies that have been checked.
-
-        def check_proxy(proxy_: Proxy):
-            """This function is used for checking the status of a proxy.
-
-            :param proxy_: The proxy to check.
-            :return:
-            """
-            nonlocal finished
-            proxy_.check_status(timeout, url)
-            if (not proxy_.is_alive) and remove_dead:
-                self.remove(proxy_)
-            finished += 1
-            on_progress_callback(self, finished / length * 99.99)
-
-        threads = []
-        for proxy in self.copy():
-            thread = threading.Thread(target=check_proxy, args=(proxy, ))
-            threads.append(thread)
-            thread.start()
-            while len(threads) >= threads_no:
-                for thread in threads.copy():
-                    if not thread.is_alive():
-                        threads.remove(thread)
-                        break
-                time.sleep(0.1)
-
-        # Wait for all threads to finish
-        for thread in threads:
-            thread.join()
-
-        on_progress_callback(self, 100)
+        if on_progress_callback is not None and not callable(on_progress_callback):
+            raise TypeError(
+                "ProxyList.check_all_async() argument on_progress_callback must be "
+                "a callable."
+            )
+        to_check = self
+        if cache is not None:
+            to_check = cache.apply(self)
+            if on_progress_callback is not None:
+                callback = on_progress_callback
+                on_progress_callback = lambda _, progress: callback(self, progress)
+        await AsyncProxyChecker(
+            timeout=timeout,
+            concurrency=concurrency,
+            url=url,
+            prefilter_timeout=prefilter_timeout,
+            adaptive_percentile=adaptive_percentile,
+            budget=budget,
+            max_per_host=max_per_host,
+            max_per_subnet=max_per_subnet,
+            host_probe_timeout=host_probe_timeout,
+            stop_after_alive=stop_after_alive,
+            order=order,
+            classify=classify
+        ).check(to_check, remove_dead and cache is None, on_progress_callback)
+        if cache is not None:
+            cache.merge(self, to_check, remove_dead)
 
     def to_text(
         self, separator: str = "\n", format_: str = '{scheme}://{ip}:{port}'
@@ -366,6 +785,7 @@ class ProxyList(set):
             end_index = start_index + 100 if start_index + 100 < len(self
                                                                      ) else len(self)
             proxies = all_proxies[start_index:end_index]
+            start_time = time.perf_counter()
             try:
                 response = requests.post(
                     url=f"http://ip-api.com/batch?fields={fields}",
@@ -373,8 +793,16 @@ class ProxyList(set):
                 ).json()
                 for index, proxy in enumerate(proxies):
                     proxy.geolocation_info = response[index]
+                observe(
+                    'geolocation_request_seconds', time.perf_counter() - start_time,
+                    result='ok'
+                )
                 on_progress_callback(self, end_index / len(self) * 100)
             except Exception as ex:
+                observe(
+                    'geolocation_request_seconds', time.perf_counter() - start_time,
+                    result='error'
+                )
                 on_error_callback(
                     self, Exception("Failed to collect geolocation information.", ex)
                 )
@@ -383,15 +811,21 @@ class ProxyList(set):
         self,
         indent: int = 4,
         include_status: bool = True,
-        include_geolocation: bool = True
+        include_geolocation: bool = True,
+        include_metrics: bool = False,
+        include_classification: bool = False
     ) -> str:
         """This method is used to convert the list to a json string.
 
         :param indent: The indentation of the json string.
-        :param include_status: If True, the status of the proxy will be
-                included in the json string.
+        :param include_status: If True, the status of the proxy will be included in
+                the json string.
         :param include_geolocation: If True, the geolocation of the
                 proxy will be included in the json string.
+        :param include_metrics: If True, the latency and health metrics of the
+                proxy will be included in the json string.
+        :param include_classification: If True, the anonymity and the HTTPS support
+                of the proxy will be included in the json string.
         """
         if include_geolocation:
             self.batch_collect_geolocations()
@@ -408,6 +842,11 @@ class ProxyList(set):
                 proxies[-1]['status'] = proxy.status.name
             if include_geolocation:
                 proxies[-1]['geolocation_info'] = proxy.get_geolocation_info()
+            if include_metrics:
+                proxies[-1].update(proxy.metrics)
+            if include_classification:
+                proxies[-1]['anonymity'] = proxy.anonymity.name
+                proxies[-1]['supports_https'] = proxy.supports_https
 
         return json.dumps(proxies, indent=indent)
 
@@ -415,15 +854,19 @@ class ProxyList(set):
         self,
         filename: _Union[str, os.PathLike],
         separator: str = "\n",
-        format_: str = '{scheme}://{ip}:{port}'
+        format_: str = '{scheme}://{ip}:{port}',
+        append: bool = False
     ) -> None:
         """This method is used to write the list to a text file.
 
         :param filename: The name of the text file.
         :param separator: The separator of the text file.
         :param format_: The format of each proxy.
+        :param append: If True, the proxies are added to the end of the file.
         """
-        with open(filename, 'w', encoding='utf-8') as file:
+        with open(filename, 'a' if append else 'w', encoding='utf-8') as file:
+            if file.tell() > 0 and self:
+                file.write(separator)
             file.write(self.to_text(separator, format_))
 
     def to_json_file(
@@ -431,66 +874,97 @@ class ProxyList(set):
         filename: _Union[str, os.PathLike],
         indent: int = 4,
         include_status: bool = True,
-        include_geolocation: bool = True
+        include_geolocation: bool = True,
+        include_metrics: bool = False,
+        include_classification: bool = False,
+        append: bool = False
     ) -> None:
         """This method is used to write the list to a json file.
 
         :param filename: The name of the json file.
         :param indent: The indentation of the json string.
-        :param include_status: If True, the status of the proxy will be
-                included in the json string.
+        :param include_status: If True, the status of the proxy will be included in
+                the json string.
         :param include_geolocation: If True, the geolocation of the
                 proxy will be included in the json string.
+        :param include_metrics: If True, the latency and health metrics of the
+                proxy will be included in the json string.
+        :param include_classification: If True, the anonymity and the HTTPS support
+                of the proxy will be included in the json string.
+        :param append: If True, the proxies are added to the end of the list in the
+                file; the file stays a valid json list.
         """
-        with open(filename, 'w', encoding='utf-8') as file:
-            file.write(self.to_json(indent, include_status, include_geolocation))
+        text = self.to_json(
+            indent, include_status, include_geolocation, include_metrics,
+            include_classification
+        )
+        if not append or not os.path.exists(filename) or \
+                os.path.getsize(filename) == 0:
+            with open(filename, 'w', encoding='utf-8') as file:
+                file.write(text)
+            return
+        if not self:
+            return
+        with open(filename, 'rb+') as file:
+            position, empty = _json_list_end(file)
+            file.seek(position)
+            # The items without the brackets of the list, separated the way
+            # json.dumps separates them
+            separator = '' if empty else ',' if indent is not None else ', '
+            file.write((separator + text[1:]).encode('utf-8'))
+            file.truncate()
 
     def to_csv_file(
         self,
         filename: _Union[str, os.PathLike],
         include_status: bool = True,
-        include_geolocation: bool = True
+        include_geolocation: bool = True,
+        include_metrics: bool = False,
+        include_classification: bool = False,
+        append: bool = False
     ) -> None:
         """This method is used to convert the list to a csv file.
 
         :param filename: The name of the csv file.
-        :param include_status: If True, the status of the proxy will be
-                included in the csv file.
+        :param include_status: If True, the status of the proxy will be included in
+                the csv file.
         :param include_geolocation: If True, the geolocation of the
                 proxy will be included in the csv file.
+        :param include_metrics: If True, the latency and health metrics of the
+                proxy will be included in the csv file.
+        :param include_classification: If True, the anonymity and the HTTPS support
+                of the proxy will be included in the csv file.
+        :param append: If True, the rows are added to the end of the file; the
+                header is only written to an empty file.
         """
         if include_geolocation:
             self.batch_collect_geolocations()
-        with open(filename, 'w', newline='', encoding='utf-8') as csv_file:
+        header = ['ip', 'port', 'type']
+        if include_status:
+            header.append('status')
+        if include_geolocation:
+            header.append('geolocation_info')
+        if include_metrics:
+            header.extend(Proxy.METRICS)
+        if include_classification:
+            header.extend(('anonymity', 'supports_https'))
+        with open(
+            filename, 'a' if append else 'w', newline='', encoding='utf-8'
+        ) as csv_file:
             writer = csv.writer(csv_file)
-            if include_status and include_geolocation:
-                writer.writerow(['ip', 'port', 'type', 'status', 'geolocation_info'])
-                for proxy in self:
-                    writer.writerow(
-                        [
-                            proxy.ip, proxy.port, proxy.type.name, proxy.status.name,
-                            proxy.get_geolocation_info()
-                        ]
-                    )
-            elif include_status:
-                writer.writerow(['ip', 'port', 'type', 'status'])
-                for proxy in self:
-                    writer.writerow(
-                        [proxy.ip, proxy.port, proxy.type.name, proxy.status.name]
-                    )
-            elif include_geolocation:
-                writer.writerow(['ip', 'port', 'type', 'geolocation_info'])
-                for proxy in self:
-                    writer.writerow(
-                        [
-                            proxy.ip, proxy.port, proxy.type.name,
-                            proxy.get_geolocation_info()
-                        ]
-                    )
-            else:
-                writer.writerow(['ip', 'port', 'type'])
-                for proxy in self:
-                    writer.writerow([proxy.ip, proxy.port, proxy.type.name])
+            if csv_file.tell() == 0:
+                writer.writerow(header)
+            for proxy in self:
+                row = [proxy.ip, proxy.port, proxy.type.name]
+                if include_status:
+                    row.append(proxy.status.name)
+                if include_geolocation:
+                    row.append(proxy.get_geolocation_info())
+                if include_metrics:
+                    row.extend(proxy.metrics.values())
+                if include_classification:
+                    row.extend((proxy.anonymity.name, proxy.supports_https))
+                writer.writerow(row)
 
     @staticmethod
     def from_text(
@@ -528,8 +1002,18 @@ class ProxyList(set):
                 raise Exception(f"Invalid proxy format: {proxy}")
             if 'status' in proxy:
                 proxy_.status = ProxyStatus.from_name(proxy['status'])
+            if 'anonymity' in proxy:
+                proxy_.anonymity = ProxyAnonymity.from_name(proxy['anonymity'])
+            if proxy.get('supports_https') is not None:
+                proxy_.supports_https = proxy['supports_https']
             if 'geolocation_info' in proxy:
                 proxy_.geolocation_info = proxy['geolocation_info']
+            for name in ('connect_time', 'ttfb', 'latency'):
+                if proxy.get(name + '_ms') is not None:
+                    setattr(proxy_, name, proxy[name + '_ms'] / 1000)
+            for name in ('last_success', 'last_failure'):
+                if proxy.get(name) is not None:
+                    setattr(proxy_, name, proxy[name])
             proxy_list.add(proxy_)
 
         return proxy_list
@@ -606,7 +1090,9 @@ class ProxyList(set):
         city: _Optional[str] = None,
         isp: _Optional[str] = None,
         org: _Optional[str] = None,
-        asname: _Optional[str] = None
+        asname: _Optional[str] = None,
+        anonymity: _Optional[_Union[ProxyAnonymity, _Iterable[ProxyAnonymity]]] = None,
+        supports_https: _Optional[bool] = None
     ) -> 'ProxyList':
         """This method is used to filter the list of proxies.
 
@@ -619,6 +1105,8 @@ class ProxyList(set):
         :param isp: The isp of the proxy.
         :param org: The org of the proxy.
         :param asname: The asname of the proxy.
+        :param anonymity: The anonymity of the proxy.
+        :param supports_https: Whether the proxy can CONNECT to HTTPS sites.
         :return: The filtered list of proxies.
         """
         filtered_proxies = ProxyList()
@@ -648,10 +1136,49 @@ class ProxyList(set):
                 continue
             if asname is not None and proxy.get_geolocation_info()['asname'] != asname:
                 continue
+            if anonymity is not None:
+                if isinstance(anonymity, ProxyAnonymity):
+                    if proxy.anonymity != anonymity:
+                        continue
+                else:
+                    if proxy.anonymity not in anonymity:
+                        continue
+            if supports_https is not None and proxy.supports_https != supports_https:
+                continue
             filtered_proxies.add(proxy)
 
         return filtered_proxies
 
+    @staticmethod
+    def _metric_key(metric: str) -> _Callable:
+        # Lower is better for the timings and higher is better for the success
+        # ratio; the proxies without a value always come last.
+        if metric in ('latency', 'connect_time', 'ttfb'):
+            return lambda proxy: (getattr(proxy, metric) is None,
+                                  getattr(proxy, metric) or 0)
+        if metric == 'success_ratio':
+            return lambda proxy: (proxy.success_ratio is None,
+                                  -(proxy.success_ratio or 0))
+        raise ValueError(f'The metric({metric}) is not valid.')
+
+    def sort_by(self, metric: str = 'latency') -> _List[Proxy]:
+        """This method is used to sort the proxies from the best to the worst.
+
+        :param metric: One of latency, connect_time, ttfb or success_ratio.
+        :return: A list of the sorted proxies.
+        """
+        return sorted(self, key=self._metric_key(metric))
+
+    def top(self, n: int, metric: str = 'latency') -> _List[Proxy]:
+        """This method is used to select the n best proxies without sorting the
+        whole list.
+
+        :param n: The number of proxies to select.
+        :param metric: One of latency, connect_time, ttfb or success_ratio.
+        :return: A list of the best proxies, the best one first.
+        """
+        return heapq.nsmallest(n, self, key=self._metric_key(metric))
+
     @property
     def count(self) -> int:
         return len(self)
@@ -0,0 +1,316 @@
+# ProxyEater.Scheduler.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import time  # This module is used to decide when the proxies are due.
+import heapq  # This module is used to keep the proxies ordered by their due time.
+import itertools
+import threading  # This module is used to run the scheduler in the background.
+import concurrent.futures  # This module is used to check a few batches at once.
+from typing import (List as _List, Tuple as _Tuple, Union as _Union,
+                    Callable as _Callable, Iterable as _Iterable,
+                    Optional as _Optional)
+
+from .Proxy import Proxy, ProxyList, ProxyStatus
+from .Checker import ProxyChecker
+
+__all__ = ['RevalidationScheduler']
+
+
+class RevalidationScheduler:
+    """This class keeps a list of proxies up to date by re-checking each
+    proxy when it is due instead of sweeping the whole list at once.
+
+    The proxies wait in a priority queue ordered by the time they are due.
+    Reliable proxies are re-checked rarely and flaky ones often; dead
+    proxies are tried again after `max_interval` so the ones that come back
+    are noticed. The checks are started at a fixed rate, a few batches at a
+    time, and their results update the list in place:
+
+    >>> scheduler = RevalidationScheduler(proxies, rate=20)
+    >>> scheduler.start()
+    >>> ...
+    >>> with scheduler.lock:
+    ...     fastest = proxies.top(10)
+    >>> scheduler.stop()
+    """
+
+    def __init__(
+        self,
+        proxies: ProxyList,
+        rate: float = 10,
+        min_interval: float = 60,
+        max_interval: float = 1800,
+        remove_dead: bool = True,
+        checker: _Optional[ProxyChecker] = None,
+        threads_no: int = 21,
+        timeout: _Union[float, _Tuple[float, float]] = 10,
+        url: _Union[str, _List[str]] = 'http://icanhazip.com/',
+        max_batches: int = 4,
+        on_dead_callback: _Optional[_Callable] = None,
+        on_recovered_callback: _Optional[_Callable] = None,
+        on_error_callback: _Optional[_Callable] = None
+    ) -> None:
+        """
+        :param proxies: The list to keep up to date; it is changed in place.
+        :param rate: The maximum number of checks started per second.
+        :param min_interval: The seconds between the checks of a proxy that
+                never worked reliably.
+        :param max_interval: The seconds between the checks of a proxy that
+                always worked and of the dead proxies.
+        :param remove_dead: If True, the proxies that went dead are removed from
+                the list and put back once they recover.
+        :param checker: The ProxyChecker to check the proxies with; if not given,
+                one is created using `threads_no`, `timeout` and `url`.
+        :param threads_no: The number of threads of the created checker.
+        :param timeout: The timeout of the checks of the created checker.
+        :param url: The url, or the list of urls used in turn, the created checker
+                connects to through the proxies.
+        :param max_batches: The maximum number of batches checked at once; the due
+                proxies wait while all of them are being checked.
+        :param on_dead_callback: A callback function to be called with a proxy
+                that was alive or unknown and turned out to be dead.
+        :param on_recovered_callback: A callback function to be called with a
+                dead proxy that turned out to be alive again.
+        :param on_error_callback: A callback function to be called with a batch
+                and the exception raised while checking it; the proxies of the
+                batch are scheduled again.
+        """
+        if rate <= 0:
+            raise ValueError(f'The rate({rate}) must be positive.')
+        if max_batches < 1:
+            raise ValueError(f'The max_batches({max_batches}) must be at least 1.')
+        if not 0 <= min_interval <= max_interval:
+            raise ValueError(
+                f'The intervals(min_interval={min_interval}, '
+                f'max_interval={max_interval}) are not valid.'
+            )
+        if on_dead_callback is not None:
+            if not callable(on_dead_callback):
+                raise TypeError(
+                    "RevalidationScheduler() argument on_dead_callback must be a "
+                    "callable."
+                )
+        else:
+            on_dead_callback = lambda proxy: None
+        if on_recovered_callback is not None:
+            if not callable(on_recovered_callback):
+                raise TypeError(
+                    "RevalidationScheduler() argument on_recovered_callback must be "
+                    "a callable."
+                )
+        else:
+            on_recovered_callback = lambda proxy: None
+        if on_error_callback is not None:
+            if not callable(on_error_callback):
+                raise TypeError(
+                    "RevalidationScheduler() argument on_error_callback must be a "
+                    "callable."
+                )
+        else:
+            on_error_callback = lambda batch, error: None
+
+        self.proxies: ProxyList = proxies
+        self.rate: float = rate
+        self.min_interval: float = min_interval
+        self.max_interval: float = max_interval
+        self.remove_dead: bool = remove_dead
+        self.max_batches: int = max_batches
+        self._own_checker: bool = checker is None
+        if checker is None:
+            checker = ProxyChecker(threads_no=threads_no, timeout=timeout, url=url)
+        self.checker: ProxyChecker = checker
+        self.on_dead_callback: _Callable = on_dead_callback
+        self.on_recovered_callback: _Callable = on_recovered_callback
+        self.on_error_callback: _Callable = on_error_callback
+        self.checks: int = 0  # The number of checks finished so far
+        self.errors: int = 0  # The number of batches whose check failed
+        # Hold this lock while reading the list to see it in a consistent state
+        self.lock = threading.RLock()
+        # The queue of (due time, tie breaker, proxy)
+        self._heap: _List[_Tuple[float, int, Proxy]] = []
+        self._counter = itertools.count()
+        self._scheduled: set = set()
+        self._stop_event = threading.Event()
+        self._thread: _Optional[threading.Thread] = None
+        self._executor: _Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._batches: _List[concurrent.futures.Future] = []
+        self.add(proxies)
+
+    def interval(self, proxy: Proxy) -> float:
+        """Returns the number of seconds to wait before checking a proxy again.
+
+        :param proxy: The proxy.
+        :return: The interval in seconds.
+        """
+        ratio = proxy.success_ratio
+        if proxy.status == ProxyStatus.DEAD:
+            return self.max_interval
+        if ratio is None:
+            return self.min_interval
+        return self.min_interval + (self.max_interval - self.min_interval) * ratio
+
+    def add(self, proxies: _Iterable[Proxy]) -> None:
+        """Schedules the proxies that are not scheduled yet. The proxies that
+        were checked before are due `interval` seconds after their last check
+        and the others are due right away.
+
+        :param proxies: The proxies to schedule.
+        """
+        now = time.time()
+        with self.lock:
+            for proxy in proxies:
+                if proxy in self._scheduled:
+                    continue
+                if proxy.status != ProxyStatus.DEAD or not self.remove_dead:
+                    self.proxies.add(proxy)
+                last_check = max(
+                    (t for t in (proxy.last_success, proxy.last_failure) if t),
+                    default=None
+                )
+                due = now if last_check is None else last_check + self.interval(proxy)
+                self._push(proxy, due)
+
+    def _push(self, proxy: Proxy, due: float) -> None:
+        # A proxy stays in the set while it is being checked, so adding it again
+        # does not schedule it twice
+        self._scheduled.add(proxy)
+        heapq.heappush(self._heap, (due, next(self._counter), proxy))
+
+    @property
+    def due(self) -> int:
+        """The number of proxies that are due now."""
+        now = time.time()
+        with self.lock:
+            return sum(1 for due, _, _ in self._heap if due <= now)
+
+    @property
+    def next_due(self) -> _Optional[float]:
+        """The unix timestamp the next proxy is due at or None if there is
+        nothing scheduled."""
+        with self.lock:
+            return self._heap[0][0] if self._heap else None
+
+    def _check(self, batch: ProxyList) -> None:
+        previous = {proxy: proxy.status for proxy in batch}
+        try:
+            self.checker.check(batch, remove_dead=False)
+        except Exception as ex:
+            with self.lock:
+                self.errors += 1
+                # Keep the proxies scheduled; they are tried again later
+                now = time.time()
+                for proxy in batch:
+                    proxy.status = previous[proxy]
+                    self._push(proxy, now + self.min_interval)
+            self.on_error_callback(batch, ex)
+            return
+        dead, recovered = [], []
+        now = time.time()
+        with self.lock:
+            for proxy in batch:
+                self.checks += 1
+                if proxy.status == ProxyStatus.ALIVE:
+                    self.proxies.add(proxy)
+                    if previous[proxy] == ProxyStatus.DEAD:
+                        recovered.append(proxy)
+                elif proxy.status == ProxyStatus.DEAD:
+                    if self.remove_dead:
+                        self.proxies.discard(proxy)
+                    if previous[proxy] != ProxyStatus.DEAD:
+                        dead.append(proxy)
+                self._push(proxy, now + self.interval(proxy))
+        for proxy in dead:
+            self.on_dead_callback(proxy)
+        for proxy in recovered:
+            self.on_recovered_callback(proxy)
+
+    def _run(self) -> None:
+        allowance = 0.0  # The number of checks that may be started right now
+        last_time = time.monotonic()
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            allowance = min(allowance + (now - last_time) * self.rate,
+                            max(self.rate, 1))
+            last_time = now
+            self._batches = [future for future in self._batches if not future.done()]
+            if len(self._batches) >= self.max_batches:
+                # The due proxies wait for a batch to finish
+                self._stop_event.wait(0.05)
+                continue
+            batch = ProxyList()
+            wall_now = time.time()
+            with self.lock:
+                while self._heap and self._heap[0][0] <= wall_now and allowance >= 1:
+                    _, _, proxy = heapq.heappop(self._heap)
+                    batch.add(proxy)
+                    allowance -= 1
+                next_due = self._heap[0][0] if self._heap else None
+            if batch:
+                self._batches.append(self._executor.submit(self._check, batch))
+            if next_due is not None and next_due <= wall_now:
+                # Waiting for the rate limit
+                wait = (1 - allowance) / self.rate
+            elif next_due is not None:
+                wait = next_due - wall_now
+            else:
+                wait = 1
+            self._stop_event.wait(min(max(wait, 0.01), 1))
+
+    def start(self) -> None:
+        """Starts the scheduler in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self.checker.start()
+        self._executor = concurrent.futures.ThreadPoolExecutor(self.max_batches)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the scheduler after the running checks are finished."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._batches = []
+        if self._own_checker:
+            self.checker.close()
+
+    def run(self, duration: _Optional[float] = None) -> None:
+        """Runs the scheduler in the current thread until the duration passes
+        or a KeyboardInterrupt.
+
+        :param duration: The number of seconds to run for(default: forever).
+        """
+        self.start()
+        try:
+            if duration is None:
+                while True:
+                    time.sleep(1)
+            else:
+                time.sleep(duration)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def __enter__(self) -> RevalidationScheduler:
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __repr__(self) -> str:
+        return (
+            f'RevalidationScheduler(scheduled={len(self)}, rate={self.rate}, '
+            f'checks={self.checks}, errors={self.errors})'
+        )
@@ -3,22 +3,138 @@
 
 from __future__ import annotations
 
-from typing import Callable as _Callable, Optional as _Optional
+import io
+import re
+import time  # This module is used to time the requests and the parsing.
+import codecs  # This module is used to decode the pages as they are downloaded.
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import \
+    ThreadPoolExecutor  # This module is used to fetch the pages concurrently.
+from typing import (Any as _Any, Dict as _Dict, List as _List, Union as _Union,
+                    Mapping as _Mapping, Callable as _Callable, Iterator as _Iterator,
+                    Optional as _Optional)
 
-import pandas  # This module is used to parse the html table.
 import requests  # This module is used to send requests to the server.
+from requests.adapters import HTTPAdapter
 from random_user_agent.user_agent import \
     UserAgent  # This module is used for generating random user agents.
 
 from .Proxy import Proxy, ProxyList, ProxyType
+from .Spec import ParserSpec, compile_parser
+from .Cache import SourceCache
+from .Table import iter_table
+from .Metrics import observe, increment
 
-useragent_generator = UserAgent()
+# numpy and pandas are imported by `_import_pandas` when a source asks for the
+# pandas table engine; importing them takes longer than the rest of ProxyEater
+numpy = pandas = None
+_useragent_generator: _Optional[UserAgent] = None
+_useragent_lock = threading.Lock()
 
 __all__ = ['Scraper']
 
+# The text int() accepts as a whole number
+INTEGER_PATTERN = r'\s*[+-]?\d+\s*'
+# The number of bytes of a page read at a time
+CHUNK_SIZE = 64 * 1024
+# A line of a text source: ip:port, optionally after a scheme like socks5://
+TEXT_LINE_PATTERN = re.compile(
+    rb'^[ \t]*(?:(?P<scheme>[A-Za-z][A-Za-z0-9+.-]*)://)?'
+    rb'(?P<ip>[^\s:/]+)[ \t]*:[ \t]*(?P<port>\d+)[ \t\r]*$',
+    re.MULTILINE
+)
+# The proxy types of the schemes of the text sources
+SCHEME_TYPES = {
+    b'http': ProxyType.HTTP,
+    b'https': ProxyType.HTTPS,
+    b'socks4': ProxyType.SOCKS4,
+    b'socks4a': ProxyType.SOCKS4,
+    b'socks5': ProxyType.SOCKS5,
+    b'socks5h': ProxyType.SOCKS5
+}
+
+
+def _import_pandas() -> None:
+    """Imports numpy and pandas for the sources with "engine": "pandas"."""
+    global numpy, pandas
+    if pandas is not None:
+        return
+    try:
+        import numpy as numpy_
+        import pandas as pandas_  # This module is used to parse the html tables.
+    except ImportError as ex:
+        raise ImportError(
+            'The pandas table engine needs pandas and lxml; install them with '
+            '`pip install ProxyEater[pandas]`.'
+        ) from ex
+    numpy, pandas = numpy_, pandas_
+
+
+def _random_useragent() -> str:
+    """Returns a random useragent; the list of the useragents is loaded by the
+    first call, which takes a few seconds."""
+    global _useragent_generator
+    with _useragent_lock:
+        if _useragent_generator is None:
+            _useragent_generator = UserAgent()
+    return _useragent_generator.get_random_user_agent()
+
+
+def _iter_text(response: requests.Response) -> _Iterator[str]:
+    """Decodes the body of a streamed response piece by piece with the
+    encoding `response.text` would use."""
+    try:
+        if response.encoding is None:  # requests would guess it from the whole body
+            raise LookupError
+        decoder = codecs.getincrementaldecoder(response.encoding)(errors='replace')
+    except LookupError:
+        yield response.text
+        return
+    for chunk in response.iter_content(CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+def _column(dataframe: pandas.DataFrame, name) -> _Optional[pandas.Series]:
+    """Returns a column of a table, or None if it is missing or not unique."""
+    if name is None or name not in dataframe.columns:
+        return None
+    column = dataframe[name]
+    return column if isinstance(column, pandas.Series) else None
+
+
+def _text(column: pandas.Series) -> pandas.Series:
+    """Converts the cells of a column to text the way str() does."""
+    text = column.astype(str)
+    missing = text.isna()
+    if missing.any():  # Newer pandas versions keep the missing cells missing
+        text = text.astype(object)
+        text[missing] = column[missing].map(str)
+    return text
+
+
+def _ports(column: pandas.Series) -> pandas.Series:
+    """Converts the cells of a column to ports the way int() does; the cells
+    int() would reject become missing."""
+    if pandas.api.types.is_bool_dtype(column) or \
+            pandas.api.types.is_integer_dtype(column):
+        return column.astype('float64')
+    if pandas.api.types.is_float_dtype(column):
+        return numpy.trunc(column.where(numpy.isfinite(column)))
+    is_text = column.map(type) == str
+    numbers = pandas.to_numeric(column.where(~is_text), errors='coerce')
+    numbers = numpy.trunc(numbers.where(numpy.isfinite(numbers)))
+    text = column[is_text].astype(str)
+    text = text[text.str.fullmatch(INTEGER_PATTERN)]
+    numbers[text.index] = pandas.to_numeric(text.str.strip(), errors='coerce')
+    return numbers
+
 
 class Scraper:
     is_succeed: bool = False
+    is_stopped: bool = False  # Whether `stop` cut the last get_proxies short
 
     def __init__(
         self,
@@ -28,64 +144,123 @@ class Scraper:
         name: _Optional[str] = None,
         useragent: _Optional[str] = None,
         proxy: _Optional[Proxy] = None,
-        request_timeout: int = 10
+        request_timeout: int = 10,
+        timeout: _Optional[float] = None,
+        page_concurrency: int = 4,
+        cache: _Optional[SourceCache] = None,
+        min_refresh: float = 0,
+        stop_event: _Optional[threading.Event] = None
     ) -> None:
         self.session: requests.Session = requests.Session()
         if useragent:
             self.session.headers.update({'User-Agent': useragent})
         else:
-            self.session.headers.update(
-                {'User-Agent': useragent_generator.get_random_user_agent()}
-            )
+            self.session.headers.update({'User-Agent': _random_useragent()})
         self.url: str = url
         self.parser: dict = parser
         self.method: str = method
         self.name: str = name or ''
-        self.parser_type: str = list(self.parser.keys())[0]
-        self.parser_config: dict = list(self.parser.values())[0]
-        self.default_type = ProxyType.from_name(
-            self.parser_config.get('type', {}).get('default', 'HTTP')
-        )
-        self.is_https_header = self.parser_config.get('type',
-                                                      {}).get('is_https_header', None)
-        self.is_https_value = self.parser_config.get('type',
-                                                     {}).get('is_https_value', 'yes')
+        # The parser config is read once per config and shared by the scrapers
+        self.spec: ParserSpec = compile_parser(parser)
+        self.parser_type: str = self.spec.type
+        self.parser_config: _Mapping[str, _Any] = self.spec.config
+        self.table_engine: str = self.spec.table_engine
+        if self.parser_type == 'pandas' and self.table_engine == 'pandas':
+            _import_pandas()
+        self.default_type: ProxyType = self.spec.default_type
+        self.is_https_header: _Optional[str] = self.spec.is_https_header
+        self.is_https_value: str = self.spec.is_https_value
+        self.protocols_header: _Optional[str] = self.spec.protocols_header
         self.protocols = self.parser_config.get('type', {}).get('protocols', {})
-        self.protocols_header = self.protocols.get('header', None)
         self.protocols_http = self.protocols.get('http', 'HTTP')
         self.protocols_https = self.protocols.get('https', 'HTTPS')
         self.protocols_socks4 = self.protocols.get('socks4', 'SOCKS4')
         self.protocols_socks5 = self.protocols.get('socks5', 'SOCKS5')
         self.pages_config = self.parser_config.get('pages', {})
-        self.pages_start = self.pages_config.get('start', 1)
-        self.pages_end = self.pages_config.get('end', "no-proxy")
-        if (self.pages_end != "no-proxy") and (not isinstance(self.pages_end, int)):
-            raise ValueError("The end page must be a number or 'no-proxy'.")
-        if isinstance(self.pages_end, int):
-            if self.pages_end < self.pages_start:
-                raise ValueError("The end page must be greater than the start page.")
-        self.pages_step = self.pages_config.get('step', 1)
+        self.pages_start: int = self.spec.pages_start
+        self.pages_end: _Union[int, str] = self.spec.pages_end
+        self.pages_step: int = self.spec.pages_step
+        # The number of pages fetched at once; a source may lower it with
+        # "concurrency" in its pages config
+        self.page_concurrency: int = min(
+            page_concurrency, self.spec.page_concurrency or page_concurrency
+        )
+        if self.page_concurrency < 1:
+            raise ValueError(
+                f'The page concurrency({self.page_concurrency}) must be at least 1.'
+            )
+        if self.page_concurrency > 10:  # More than the default pool of requests
+            adapter = HTTPAdapter(pool_maxsize=self.page_concurrency)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
         self.pages_url_format_name = self.pages_config.get('format name', 'page')
         self.proxy: _Optional[Proxy] = proxy
         self.request_timeout: int = request_timeout
+        # The maximum number of seconds `get_proxies` may spend on the source
+        self.timeout: _Optional[float] = timeout
+        self._deadline: _Optional[float] = None
+        # The pages are requested conditionally and the ones fetched less than
+        # min_refresh seconds ago are not requested at all
+        self.cache: _Optional[SourceCache] = cache
+        if min_refresh < 0:
+            raise ValueError(
+                f'The minimum refresh({min_refresh}) must not be negative.'
+            )
+        self.min_refresh: float = min_refresh
+        # Once set, the pages are no longer requested; one event can stop
+        # several scrapers at once
+        self.stop_event: threading.Event = stop_event or threading.Event()
         self.proxies: ProxyList = ProxyList()
+        # The number of seconds the last `get_proxies` took
+        self.elapsed: _Optional[float] = None
 
-    def request(self, url: str) -> requests.Response:
-        return self.session.request(
-            method=self.method,
-            url=url,
-            timeout=self.request_timeout,
-            proxies=({
-                'http': str(self.proxy),
-                'https': str(self.proxy)
-            }) if self.proxy else None
-        )
+    def request(
+        self,
+        url: str,
+        stream: bool = False,
+        headers: _Optional[_Dict[str, str]] = None
+    ) -> requests.Response:
+        start_time = time.perf_counter()
+        if self.stop_event.is_set():
+            raise InterruptedError('The scraping was stopped.')
+        timeout = self.request_timeout
+        if self._deadline is not None:
+            remaining = self._deadline - start_time
+            if remaining <= 0:
+                raise TimeoutError(
+                    f'The source took longer than {self.timeout} seconds.'
+                )
+            timeout = min(timeout, remaining)
+        result = 'error'
+        try:
+            response = self.session.request(
+                method=self.method,
+                url=url,
+                timeout=timeout,
+                stream=stream,
+                headers=headers,
+                proxies=({
+                    'http': str(self.proxy),
+                    'https': str(self.proxy)
+                }) if self.proxy else None
+            )
+            if response.status_code == 304:
+                result = 'not_modified'
+            else:
+                result = 'ok' if response.ok else 'http_error'
+            return response
+        finally:
+            observe(
+                'scrape_request_seconds', time.perf_counter() - start_time,
+                source=self.name, result=result
+            )
 
     def get_proxies(
         self,
         on_progress_callback: _Optional[_Callable] = None,
         on_success_callback: _Optional[_Callable] = None,
-        on_failure_callback: _Optional[_Callable] = None
+        on_failure_callback: _Optional[_Callable] = None,
+        on_proxies_callback: _Optional[_Callable] = None
     ) -> ProxyList:
         """This method is used to get proxies from the server.
 
@@ -95,6 +270,9 @@ class Scraper:
                 called when the scraper is successful.
         :param on_failure_callback: This is a callback function that is
                 called when the scraper is failed.
+        :param on_proxies_callback: This is a callback function that is
+                called with the proxies of each page as soon as the page is
+                read, in page order.
         :return: A ProxyList object.
         """
         if on_progress_callback:
@@ -112,59 +290,55 @@ class Scraper:
                 raise TypeError('on_failure_callback must be a callable object.')
         else:
             on_failure_callback = lambda obj, exception: None
+        if on_proxies_callback:
+            if not isinstance(on_proxies_callback, _Callable):
+                raise TypeError('on_proxies_callback must be a callable object.')
+        else:
+            on_proxies_callback = lambda obj, proxies: None
 
         def _get_proxies(page: int = 1) -> ProxyList:
-            proxies_ = ProxyList()
             on_progress_callback(self, progress=0, page=page)
-            response = self.request(self.url.format(page=page))
+            url = self.url.format(page=page)
+            if self.cache is not None:
+                proxies_ = self.cache.get_fresh(url, self.min_refresh)
+                if proxies_ is not None:
+                    increment('scrape_cache_total', source=self.name, result='fresh')
+                    increment('scraped_proxies_total', proxies_.count, source=self.name)
+                    on_progress_callback(self, progress=100, page=page)
+                    return proxies_
+            builtin_table = self.parser_type == "pandas" and \
+                self.table_engine == 'builtin'
+            response = self.request(
+                url,
+                stream=builtin_table or self.parser_type == "text",
+                headers=self.cache.headers(url) if self.cache is not None else None
+            )
+            if response.status_code == 304 and self.cache is not None:
+                response.close()
+                proxies_ = self.cache.revalidate(url)
+                increment('scrape_cache_total', source=self.name, result='not_modified')
+                increment('scraped_proxies_total', proxies_.count, source=self.name)
+                on_progress_callback(self, progress=100, page=page)
+                return proxies_
+            proxies_ = ProxyList()
             on_progress_callback(self, progress=10, page=page)
-            if self.parser_type == "pandas":
-                dataframe = pandas.read_html(response.text
+            parse_start_time = time.perf_counter()
+            if builtin_table:
+                # The rest of the page is not downloaded once the table is read
+                with response:
+                    for row in iter_table(
+                        _iter_text(response),
+                        self.parser_config.get('table_index', 0),
+                        self.parser_config.get('table_selector', None)
+                    ):
+                        proxy = self._parse_row(row)
+                        if proxy is not None:
+                            proxies_.add(proxy)
+            elif self.parser_type == "pandas":
+                # Newer pandas versions only take the html as a file object
+                dataframe = pandas.read_html(io.StringIO(response.text)
                                       )[self.parser_config.get('table_index', 0)]
-                for i in range(0, len(dataframe)):
-                    on_progress_callback(
-                        self, progress=10 + (i / len(dataframe) * 90), page=page
-                    )
-                    try:
-                        if not self.parser_config.get('combined', None):
-                            ip = str(dataframe.loc[dataframe.index[i],
-                                            self.parser_config.get('ip')]).strip()
-                            port = int(
-                                dataframe.loc[dataframe.index[i],
-                                       self.parser_config.get('port')]
-                            )
-                            if self.is_https_header:
-                                if str(dataframe.loc[dataframe.index[i], self.is_https_header]
-                                       ).strip().lower() == self.is_https_value:
-                                    proxies_.add(Proxy(ip, port, ProxyType.HTTPS))
-                                else:
-                                    proxies_.add(Proxy(ip, port, self.default_type))
-                                continue
-                            if self.protocols_header:
-                                protocol = str(
-                                    dataframe.loc[dataframe.index[i], self.protocols_header]
-                                ).strip().lower()
-                                if protocol == self.protocols_http:
-                                    proxies_.add(Proxy(ip, port, ProxyType.HTTP))
-                                elif protocol == self.protocols_https:
-                                    proxies_.add(Proxy(ip, port, ProxyType.HTTPS))
-                                elif protocol == self.protocols_socks4:
-                                    proxies_.add(Proxy(ip, port, ProxyType.SOCKS4))
-                                elif protocol == self.protocols_socks5:
-                                    proxies_.add(Proxy(ip, port, ProxyType.SOCKS5))
-                                else:
-                                    proxies_.add(Proxy(ip, port, self.default_type))
-                                continue
-                            proxies_.add(Proxy(ip, port, self.default_type))
-                        else:
-                            combined: str = dataframe.loc[dataframe.index[i],
-                                                   self.parser_config.get('combined')]
-                            if len(combined.split(':')) == 2:
-                                ip = combined.split(':')[0].strip()
-                                port = int(combined.split(':')[1])
-                                proxies_.add(Proxy(ip, port, ProxyType.HTTP))
-                    except:
-                        continue
+                proxies_.update(self._parse_dataframe(dataframe))
 
             if self.parser_type == "json":
                 data = response.json()[self.parser_config.get('data')]
@@ -180,47 +354,271 @@ class Scraper:
                         )
                     )
 
+            if self.parser_type == "regex":
+                proxies_.update(self._parse_regex(response.content))
+
             if self.parser_type == "text":
-                data = str(response.content, encoding='utf-8')
-                for index, i in enumerate(data.split('\n')):
-                    on_progress_callback(
-                        self, progress=10 + (index / len(data) * 90), page=page
-                    )
-                    if len(i.split(':')) == 2:
-                        proxies_.add(
-                            Proxy(
-                                i.split(':')[0].strip(), int(i.split(':')[1]),
-                                self.default_type
-                            )
+                with response:
+                    proxies_.update(self._parse_text(
+                        response,
+                        lambda progress: on_progress_callback(
+                            self, progress=progress, page=page
                         )
+                    ))
 
+            observe(
+                'scrape_parse_seconds', time.perf_counter() - parse_start_time,
+                source=self.name, parser=self.parser_type
+            )
+            increment('scraped_proxies_total', proxies_.count, source=self.name)
+            if self.cache is not None and response.status_code == 200:
+                increment('scrape_cache_total', source=self.name, result='miss')
+                self.cache.store(url, response.headers, proxies_)
             on_progress_callback(self, progress=100, page=page)
 
             return proxies_
 
+        def _add_proxies(proxies_: ProxyList) -> None:
+            self.proxies.update(proxies_)
+            on_proxies_callback(self, proxies_)
+
+        start_time = time.perf_counter()
+        if self.timeout is not None:
+            self._deadline = start_time + self.timeout
         try:
             if self.pages_config:
-                page_index = self.pages_start
-                while True:
-                    if self.pages_end == "no-proxy":
-                        proxies = _get_proxies(page_index)
-                        if proxies.count < 1:
-                            break
-                    elif page_index <= self.pages_end:
-                        proxies = _get_proxies(page_index)
-                    else:
-                        raise ValueError(
-                            'The pages_end value must be "no-proxy" or a number.'
-                        )
-                    page_index += self.pages_step
-                    self.proxies.update(proxies)
+                self._get_pages(_get_proxies, _add_proxies)
             else:
-                self.proxies.update(_get_proxies())
+                _add_proxies(_get_proxies())
 
             self.is_succeed = True
+            self.is_stopped = False
             on_success_callback(self)
         except Exception as ex:
             self.is_succeed = False
-            on_failure_callback(self, ex)
+            self.is_stopped = self.stop_event.is_set()
+            if not self.is_stopped:  # A stopped scraper did not fail
+                increment('scrape_failures_total', source=self.name)
+                on_failure_callback(self, ex)
+        finally:
+            self._deadline = None
+            self.elapsed = time.perf_counter() - start_time
 
         return self.proxies
+
+    def stop(self) -> None:
+        """Stops `get_proxies` before its next request; the requests in flight
+        are finished and their proxies are kept."""
+        self.stop_event.set()
+
+    def _parse_text(self, response: requests.Response,
+                    on_progress: _Callable[[float], None]) -> _List[Proxy]:
+        """Reads the proxies of a plain text list as its body is downloaded.
+
+        The complete lines of each piece are matched at once, so the memory
+        used stays flat however long the list is; the lines that are not
+        ip:port are skipped.
+
+        :param response: A streamed response.
+        :param on_progress: Called with the progress(10-99) after each piece,
+                measured in the bytes received; not called if the server does not
+                tell the length of the body.
+        :return: The proxies.
+        """
+        try:
+            length = int(response.headers.get('Content-Length', 0))
+        except ValueError:
+            length = 0
+        raw = response.raw
+        proxies = []
+        received = 0
+        rest = b''
+        first = True
+        for chunk in itertools.chain(response.iter_content(CHUNK_SIZE), [None]):
+            if chunk is None:  # The end of the body
+                lines, rest = rest, b''
+            else:
+                received += len(chunk)
+                if first and chunk.startswith(codecs.BOM_UTF8):
+                    chunk = chunk[len(codecs.BOM_UTF8):]
+                first = False
+                end = chunk.rfind(b'\n') + 1
+                if not end:
+                    rest += chunk
+                    continue
+                lines, rest = rest + chunk[:end], chunk[end:]
+            for match in TEXT_LINE_PATTERN.finditer(lines):
+                scheme = match.group('scheme')
+                type_ = self.default_type if scheme is None else \
+                    SCHEME_TYPES.get(scheme.lower(), self.default_type)
+                proxies.append(
+                    Proxy(
+                        match.group('ip').decode('utf-8', 'replace'),
+                        int(match.group('port')), type_
+                    )
+                )
+            if length and chunk is not None:
+                # The bytes on the wire, which the length counts when compressed
+                done = raw.tell() if hasattr(raw, 'tell') else received
+                # 100 is left for the end of the page
+                on_progress(min(10 + done / length * 90, 99))
+        return proxies
+
+    def _parse_regex(self, body: bytes) -> _List[Proxy]:
+        """Finds the proxies in a body with the pattern of the regex parser.
+
+        :param body: The body of the page.
+        :return: The proxies; the scheme group, if the pattern has one and it
+                matched, picks the type of each proxy.
+        """
+        has_scheme = 'scheme' in self.spec.pattern.groupindex
+        proxies = []
+        for match in self.spec.pattern.finditer(body):
+            try:
+                port = int(match.group('port'))
+            except (TypeError, ValueError):  # A pattern of the source may allow it
+                continue
+            if not match.group('ip') or not 0 < port < 65536:
+                continue
+            scheme = match.group('scheme') if has_scheme else None
+            type_ = self.default_type if not scheme else \
+                SCHEME_TYPES.get(scheme.lower(), self.default_type)
+            proxies.append(
+                Proxy(match.group('ip').decode('utf-8', 'replace').strip(), port, type_)
+            )
+        return proxies
+
+    def _parse_row(self, row: _Dict[_Any, str]) -> _Optional[Proxy]:
+        """Builds the proxy of a table row read by the built-in table parser.
+
+        :param row: The {column name: text} dictionary of the row.
+        :return: The proxy or None if the row does not hold one.
+        """
+        try:
+            combined_name = self.parser_config.get('combined', None)
+            if combined_name:
+                parts = row[combined_name].split(':')
+                if len(parts) != 2:
+                    return None
+                return Proxy(parts[0].strip(), int(parts[1]), ProxyType.HTTP)
+            ip = row[self.parser_config.get('ip')].strip()
+            port = int(row[self.parser_config.get('port')])
+        except (KeyError, ValueError):
+            return None
+        if not ip:
+            return None
+        if self.is_https_header:
+            if self.is_https_header not in row:
+                return None
+            if row[self.is_https_header].strip().lower() == self.is_https_value:
+                return Proxy(ip, port, ProxyType.HTTPS)
+        elif self.protocols_header:
+            if self.protocols_header not in row:
+                return None
+            protocol = row[self.protocols_header].strip().lower()
+            type_ = self.spec.protocol_map.get(protocol)
+            if type_ is not None:
+                return Proxy(ip, port, type_)
+        return Proxy(ip, port, self.default_type)
+
+    def _parse_dataframe(self, dataframe: pandas.DataFrame) -> _List[Proxy]:
+        """Builds the proxies of a table with whole-column operations.
+
+        The rows are read the same way a row by row loop would: the cells
+        are compared as stripped lower case text and the rows whose port is
+        not a whole number are skipped.
+
+        :param dataframe: The table.
+        :return: The proxies.
+        """
+        _import_pandas()
+        combined_name = self.parser_config.get('combined', None)
+        if combined_name:
+            combined = _column(dataframe, combined_name)
+            if combined is None or not (pandas.api.types.is_object_dtype(combined) or
+                                        pandas.api.types.is_string_dtype(combined)):
+                return []
+            parts = combined.str.split(':')
+            parts = parts[parts.str.len() == 2]
+            ips = parts.str[0].str.strip()
+            ports = _ports(parts.str[1])
+            types = pandas.Series(ProxyType.HTTP, index=ips.index, dtype=object)
+        else:
+            ips = _column(dataframe, self.parser_config.get('ip'))
+            ports = _column(dataframe, self.parser_config.get('port'))
+            if ips is None or ports is None:
+                return []
+            ips = _text(ips).str.strip()
+            ports = _ports(ports)
+            types = pandas.Series(self.default_type, index=ips.index, dtype=object)
+            if self.is_https_header:
+                https = _column(dataframe, self.is_https_header)
+                if https is None:
+                    return []
+                types[_text(https).str.strip().str.lower() == self.is_https_value] = \
+                    ProxyType.HTTPS
+            elif self.protocols_header:
+                protocols = _column(dataframe, self.protocols_header)
+                if protocols is None:
+                    return []
+                mapped = _text(protocols).str.strip().str.lower().map(
+                    dict(self.spec.protocol_map)
+                )
+                types = mapped.where(mapped.notna(), self.default_type)
+        valid = ports.notna()
+        return [
+            Proxy(ip, port, type_) for ip, port, type_ in zip(
+                ips[valid].tolist(), ports[valid].astype('int64').tolist(),
+                types[valid].tolist()
+            )
+        ]
+
+    def _page_numbers(self) -> _Iterator[int]:
+        """Yields the numbers of the pages to fetch; endless for the sources
+        that end with an empty page."""
+        if self.pages_end == "no-proxy":
+            return itertools.count(self.pages_start, self.pages_step)
+        return iter(range(self.pages_start, self.pages_end + 1, self.pages_step))
+
+    def _get_pages(
+        self, get_page: _Callable[[int], ProxyList],
+        add_proxies: _Callable[[ProxyList], None]
+    ) -> None:
+        """Fetches the pages of the source concurrently and adds their proxies
+        in page order.
+
+        A numbered range is fetched `page_concurrency` pages at a time. For the
+        sources that end with an empty page, up to `page_concurrency` pages
+        are fetched ahead of the one being read; once an empty page is read
+        the pages after it are dropped, just as if they were fetched one by
+        one.
+
+        :param get_page: A function that fetches and parses one page.
+        :param add_proxies: A function that adds the proxies of a page.
+        """
+        pages = self._page_numbers()
+        # The whole range of a numbered source is queued at once and the pool
+        # caps the requests; the endless ones only get a window
+        window = self.page_concurrency if self.pages_end == "no-proxy" else None
+        in_flight: deque = deque()
+        with ThreadPoolExecutor(self.page_concurrency) as executor:
+
+            def fill() -> None:
+                while window is None or len(in_flight) < window:
+                    page = next(pages, None)
+                    if page is None:
+                        break
+                    in_flight.append(executor.submit(get_page, page))
+
+            try:
+                fill()
+                while in_flight:
+                    proxies = in_flight.popleft().result()
+                    if self.pages_end == "no-proxy" and proxies.count < 1:
+                        break
+                    add_proxies(proxies)
+                    fill()
+            finally:
+                # The requests already sent are waited for by the executor
+                for future in in_flight:
+                    future.cancel()
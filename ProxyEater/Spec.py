@@ -0,0 +1,131 @@
+# ProxyEater.Spec.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import re
+import json  # This module is used to build the keys of the compiled specs.
+import threading
+from types import MappingProxyType
+from typing import (Any as _Any, Dict as _Dict, Union as _Union, Mapping as _Mapping,
+                    Optional as _Optional, NamedTuple as _NamedTuple)
+
+from .Proxy import ProxyType
+
+__all__ = ['ParserSpec', 'compile_parser', 'PARSER_TYPES', 'DEFAULT_REGEX']
+
+# The parser types a source may use; html is another name of pandas
+PARSER_TYPES = ('pandas', 'html', 'json', 'text', 'regex')
+# The pattern of the regex parser when the source does not give one: ip:port
+# pairs anywhere in the body, optionally after a scheme like socks5://
+DEFAULT_REGEX = (
+    r'(?:(?P<scheme>[A-Za-z][A-Za-z0-9+.-]*)://)?'
+    r'(?<![\d.])(?P<ip>(?:\d{1,3}\.){3}\d{1,3})\s*:\s*(?P<port>\d{1,5})(?!\d)'
+)
+
+
+class ParserSpec(_NamedTuple):
+    """The parser config of a source, read and checked once.
+
+    The specs are immutable, so one spec is shared by every scraper of the
+    same config; see `compile_parser`.
+    """
+    type: str  # pandas, json, text or regex
+    config: _Mapping[str, _Any]  # The parser config as given
+    table_engine: str  # builtin or pandas; used by the pandas type
+    default_type: ProxyType
+    is_https_header: _Optional[str]
+    is_https_value: str
+    protocols_header: _Optional[str]
+    # The cell text of each protocol and its type; the first protocol given
+    # wins if two have the same text
+    protocol_map: _Mapping[str, ProxyType]
+    pages_start: int
+    pages_end: _Union[int, str]  # A number or "no-proxy"
+    pages_step: int
+    page_concurrency: _Optional[int]  # The limit set by the source, if any
+    pattern: _Optional[re.Pattern]  # The pattern of the regex type, on bytes
+
+
+def _compile(parser: _Mapping[str, _Any]) -> ParserSpec:
+    if not parser:
+        raise ValueError('The parser config is empty.')
+    type_, config = next(iter(parser.items()))
+    if type_ not in PARSER_TYPES:
+        raise ValueError(
+            f'The parser type({type_}) must be one of {", ".join(PARSER_TYPES)}.'
+        )
+    if type_ == 'html':  # The same tables as the pandas parser
+        type_ = 'pandas'
+    # The html tables are read with the built-in parser unless the source
+    # asks for pandas.read_html
+    table_engine = config.get('engine', 'builtin')
+    if table_engine not in ('builtin', 'pandas'):
+        raise ValueError(
+            f'The table engine({table_engine}) must be builtin or pandas.'
+        )
+
+    type_config = config.get('type', {})
+    protocols = type_config.get('protocols', {})
+    protocol_map: _Dict[str, ProxyType] = {}
+    # Added in reverse, so the first one wins
+    for name, proxy_type in (('socks5', ProxyType.SOCKS5),
+                             ('socks4', ProxyType.SOCKS4),
+                             ('https', ProxyType.HTTPS), ('http', ProxyType.HTTP)):
+        protocol_map[protocols.get(name, name.upper())] = proxy_type
+
+    pages = config.get('pages', {})
+    pages_start = pages.get('start', 1)
+    pages_end = pages.get('end', "no-proxy")
+    if (pages_end != "no-proxy") and (not isinstance(pages_end, int)):
+        raise ValueError("The end page must be a number or 'no-proxy'.")
+    if isinstance(pages_end, int):
+        if pages_end < pages_start:
+            raise ValueError("The end page must be greater than the start page.")
+
+    pattern = None
+    if type_ == 'regex':
+        try:
+            pattern = re.compile(config.get('pattern', DEFAULT_REGEX).encode())
+        except re.error as ex:
+            raise ValueError(f'The pattern of the regex parser is not valid: {ex}')
+        if not {'ip', 'port'} <= set(pattern.groupindex):
+            raise ValueError(
+                'The pattern of the regex parser needs ip and port groups.'
+            )
+
+    return ParserSpec(
+        type=type_,
+        config=MappingProxyType(dict(config)),
+        table_engine=table_engine,
+        default_type=ProxyType.from_name(type_config.get('default', 'HTTP')),
+        is_https_header=type_config.get('is_https_header', None),
+        is_https_value=type_config.get('is_https_value', 'yes'),
+        protocols_header=protocols.get('header', None),
+        protocol_map=MappingProxyType(protocol_map),
+        pages_start=pages_start,
+        pages_end=pages_end,
+        pages_step=pages.get('step', 1),
+        page_concurrency=pages.get('concurrency', None),
+        pattern=pattern
+    )
+
+
+_specs: _Dict[str, ParserSpec] = {}
+_specs_lock = threading.Lock()
+
+
+def compile_parser(parser: _Mapping[str, _Any]) -> ParserSpec:
+    """Reads and checks the parser config of a source; the spec of a config
+    is made once and reused by the next scrapers of the same config.
+
+    :param parser: The parser config, e.g. {"json": {"data": "data", ...}}.
+    :return: The ParserSpec.
+    """
+    key = json.dumps(parser, sort_keys=True)
+    spec = _specs.get(key)
+    if spec is None:
+        spec = _compile(parser)
+        with _specs_lock:
+            spec = _specs.setdefault(key, spec)
+    return spec
@@ -0,0 +1,222 @@
+# ProxyEater.Stats.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import os
+import math
+import time  # This module is used to timestamp the runs.
+import pathlib
+import functools  # This module is used to make a check order the processes can share.
+import threading
+from typing import (Any as _Any, Dict as _Dict, List as _List, Union as _Union,
+                    Mapping as _Mapping, Iterable as _Iterable, Optional as _Optional)
+
+from .Proxy import Proxy
+from .Cache import proxy_key, load_json, save_json
+
+__all__ = ['SourceStats']
+
+
+def _rank(ranks: _Mapping[str, float], proxy: Proxy) -> float:
+    return ranks.get(proxy_key(proxy), 0.0)
+
+
+class SourceStats:
+    """This class remembers how many proxies each source listed, how many of
+    them were new and alive and how long the source took, averaged over the
+    runs with the recent runs weighing more.
+
+    The alive proxies found per second of scraping, the yield, tells the
+    sources that are worth their time from the ones that list thousands of
+    dead proxies, so the scrape can start with the best sources, check
+    their proxies first and skip the worst ones:
+
+    >>> stats = SourceStats('source-stats.json')
+    >>> sources = stats.order(sources)
+    >>> stats.record('free-proxy-list', fetched=300, unique=120, seconds=2.5,
+    ...              failed=False, checked=120, alive=14)
+    >>> stats.save()
+    >>> print(stats.report())
+    """
+
+    def __init__(
+        self,
+        path: _Union[str, os.PathLike],
+        decay: float = 0.7,
+        retry_after: int = 5
+    ) -> None:
+        """
+        :param path: The path of the statistics file; it is created on the first
+                save.
+        :param decay: The weight of the previous runs in the averages(0-1); 0
+                only keeps the last run.
+        :param retry_after: A source skipped for its low yield is scraped again
+                after this many skipped runs, in case it got better.
+        """
+        if not 0 <= decay < 1:
+            raise ValueError(f'The decay({decay}) must be at least 0 and less than 1.')
+        if retry_after < 1:
+            raise ValueError(f'The retry_after({retry_after}) must be at least 1.')
+        self.path: pathlib.Path = pathlib.Path(path)
+        self.decay: float = decay
+        self.retry_after: int = retry_after
+        self._entries: _Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Loads the statistics file if it exists. A damaged file is ignored."""
+        entries = load_json(self.path)
+        if entries is not None:
+            self._entries = entries
+
+    def save(self) -> None:
+        """Writes the statistics to the disk."""
+        save_json(self.path, self._entries, self._lock)
+
+    def record(
+        self,
+        source: str,
+        fetched: int,
+        unique: int,
+        seconds: float,
+        failed: bool,
+        checked: _Optional[int] = None,
+        alive: _Optional[int] = None
+    ) -> None:
+        """Adds a run of a source to its averages.
+
+        :param source: The name of the source.
+        :param fetched: The number of proxies the source listed.
+        :param unique: The number of them no other source listed before.
+        :param seconds: The number of seconds scraping the source took.
+        :param failed: Whether the scraping failed.
+        :param checked: The number of the listed proxies that were checked; None if
+                the proxies were not checked.
+        :param alive: The number of the listed proxies found alive.
+        """
+        values = {
+            'fetched': fetched, 'unique': unique, 'seconds': seconds,
+            'errors': 1.0 if failed else 0.0
+        }
+        was_checked = checked is not None
+        # A source that listed nothing gave no alive proxies either
+        listed_nothing = was_checked and not fetched
+        if (was_checked and checked > 0) or listed_nothing:
+            values.update(checked=checked, alive=alive or 0)
+        with self._lock:
+            entry = self._entries.setdefault(source, {'runs': 0})
+            entry['runs'] += 1
+            entry['last_run'] = time.time()
+            entry['skipped'] = 0
+            for name, value in values.items():
+                previous = entry.get(name)
+                entry[name] = value if previous is None else \
+                    self.decay * previous + (1 - self.decay) * value
+
+    def get(self, source: str) -> _Optional[_Dict[str, _Any]]:
+        """Returns the averages of a source or None if it was never scraped.
+
+        :param source: The name of the source.
+        :return: A dict with the runs, last_run, fetched, unique, checked, alive,
+                seconds and errors(the share of the failed runs) keys; checked and
+                alive are missing if its proxies were never checked.
+        """
+        entry = self._entries.get(source)
+        return dict(entry) if entry is not None else None
+
+    def yield_of(self, source: str) -> _Optional[float]:
+        """Returns the average number of alive proxies a source gives per second
+        of scraping.
+
+        :param source: The name of the source.
+        :return: The yield or None if the proxies of the source were never
+                checked.
+        """
+        entry = self._entries.get(source)
+        if entry is None or entry.get('alive') is None:
+            return None
+        # The pages reused from the source cache take no time at all
+        return entry['alive'] / max(entry['seconds'], 0.01)
+
+    def order(self, sources: _Iterable[dict]) -> _List[dict]:
+        """Sorts the source configs from the highest yield to the lowest; the
+        sources without a yield come first, so they get one.
+
+        :param sources: The source configs, each with an id.
+        :return: The sorted configs.
+        """
+        def key(config: dict) -> float:
+            yield_ = self.yield_of(config.get('id'))
+            return -math.inf if yield_ is None else -yield_
+
+        return sorted(sources, key=key)
+
+    def skip(self, source: str, min_yield: float) -> bool:
+        """Tells whether a source should be skipped for its low yield; every
+        `retry_after` runs it is given another chance.
+
+        :param source: The name of the source.
+        :param min_yield: The lowest yield worth scraping.
+        :return: True if the source should be skipped this run.
+        """
+        yield_ = self.yield_of(source)
+        if yield_ is None or yield_ >= min_yield:
+            return False
+        with self._lock:
+            entry = self._entries[source]
+            if entry.get('skipped', 0) >= self.retry_after:
+                return False
+            entry['skipped'] = entry.get('skipped', 0) + 1
+        return True
+
+    def check_order(self, origins: _Mapping[Proxy, str]) -> functools.partial:
+        """Returns a key for the `order` of the checkers that checks the
+        proxies of the sources with the highest yield first.
+
+        :param origins: The source each proxy was taken from.
+        :return: A key function that can be passed to other processes.
+        """
+        ranks = {}
+        for proxy, source in list(origins.items()):
+            yield_ = self.yield_of(source)
+            ranks[proxy_key(proxy)] = -math.inf if yield_ is None else -yield_
+        return functools.partial(_rank, ranks)
+
+    def report(self) -> str:
+        """Returns the statistics of the sources as a table, the sources with
+        the highest yield first."""
+        rows = [('Source', 'Runs', 'Fetched', 'Unique', 'Alive', 'Alive/s',
+                 'Seconds', 'Errors')]
+        for source in sorted(self._entries, key=lambda name: (
+                self.yield_of(name) is None, -(self.yield_of(name) or 0), name)):
+            entry = self._entries[source]
+            yield_ = self.yield_of(source)
+            rows.append((
+                source,
+                str(entry['runs']),
+                f'{entry["fetched"]:.0f}',
+                f'{entry["unique"]:.0f}',
+                '-' if entry.get('alive') is None else f'{entry["alive"]:.1f}',
+                '-' if yield_ is None else f'{yield_:.2f}',
+                f'{entry["seconds"]:.2f}',
+                f'{entry["errors"]:.0%}'
+            ))
+        widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]))]
+        return '\n'.join(
+            '  '.join(
+                cell.ljust(width) if index == 0 else cell.rjust(width)
+                for index, (cell, width) in enumerate(zip(row, widths))
+            ).rstrip()
+            for row in rows
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f'SourceStats(path={str(self.path)!r}, decay={self.decay}, '
+            f'retry_after={self.retry_after}, sources={len(self)})'
+        )
@@ -0,0 +1,173 @@
+# ProxyEater.Store.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import os
+import time  # This module is used to timestamp the sightings and the results.
+import threading  # This module is used to share the store between the scrapers.
+from typing import (Dict as _Dict, Union as _Union, Iterable as _Iterable,
+                    Optional as _Optional)
+
+from .Proxy import Proxy, ProxyList, ProxyStatus
+from .Cache import CheckCache, proxy_key
+
+__all__ = ['ProxyStore']
+
+
+class ProxyStore(CheckCache):
+    """This class remembers every proxy the sources listed: when it was first
+    and last seen, the sources that listed it and the result of its last
+    check.
+
+    It works as a `CheckCache` whose results are kept after they expire, so
+    a scrape only checks the proxies that are new or whose result is stale
+    and the alive proxies can be listed from the store alone:
+
+    >>> store = ProxyStore('state.json')
+    >>> store.record_seen(scraper.proxies, scraper.name)
+    >>> proxies.check_all(cache=store)
+    >>> store.alive_proxies().to_text_file('proxies.txt')
+    """
+
+    def __init__(
+        self,
+        path: _Union[str, os.PathLike],
+        alive_ttl: float = 900,
+        dead_ttl: float = 3600,
+        forget_after: float = 7 * 86400
+    ) -> None:
+        """
+        :param path: The path of the store file; it is created on the first save.
+        :param alive_ttl: The number of seconds the result of an alive proxy is
+                reused.
+        :param dead_ttl: The number of seconds a dead proxy is not checked again.
+        :param forget_after: The number of seconds after which a proxy no source
+                listed any more is forgotten.
+        """
+        if forget_after < 0:
+            raise ValueError(f'The forget_after({forget_after}) must not be negative.')
+        self.forget_after: float = forget_after
+        self.new: int = 0  # The number of proxies seen for the first time
+        self._lock = threading.RLock()
+        super().__init__(path, alive_ttl, dead_ttl)
+
+    def save(self) -> None:
+        """Writes the store to the disk, leaving the forgotten proxies out."""
+        with self._lock:
+            super().save()
+
+    def prune(self) -> None:
+        """Forgets the proxies that were not seen for `forget_after` seconds."""
+        now = time.time()
+        with self._lock:
+            self._entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if now - entry.get('last_seen', 0) < self.forget_after
+            }
+
+    def get(self, proxy: Proxy) -> _Optional[dict]:
+        """Returns the fresh result of a proxy or None.
+
+        :param proxy: The proxy.
+        :return: The entry of the proxy or None if it was never checked or its
+                result is stale.
+        """
+        entry = self._entries.get(proxy_key(proxy))
+        if entry is None or entry.get('checked_at') is None or \
+                time.time() - entry['checked_at'] >= self._ttl(entry['status']):
+            return None
+        return entry
+
+    def record_seen(self, proxies: _Iterable[Proxy], source: str) -> None:
+        """Records that a source listed the proxies.
+
+        :param proxies: The proxies.
+        :param source: The name of the source.
+        """
+        now = time.time()
+        with self._lock:
+            for proxy in proxies:
+                entry = self._entries.get(proxy_key(proxy))
+                if entry is None:
+                    entry = self._entries[proxy_key(proxy)] = {
+                        'type': proxy.type.name.lower(),
+                        'first_seen': now,
+                        'sources': [],
+                        'status': ProxyStatus.UNKNOWN.name.lower(),
+                        'checked_at': None
+                    }
+                    self.new += 1
+                entry['last_seen'] = now
+                if source not in entry['sources']:
+                    entry['sources'].append(source)
+
+    def store(self, proxies: _Iterable[Proxy]) -> None:
+        """Records the results of the checked proxies and keeps what is known
+        about their sightings. Proxies whose status is UNKNOWN are not
+        recorded.
+
+        :param proxies: The checked proxies.
+        """
+        now = time.time()
+        with self._lock:
+            for proxy in proxies:
+                if proxy.status == ProxyStatus.UNKNOWN:
+                    continue
+                entry = self._entries.setdefault(
+                    proxy_key(proxy),
+                    {'first_seen': now, 'last_seen': now, 'sources': []}
+                )
+                entry.update({
+                    'type': proxy.type.name.lower(),
+                    'status': proxy.status.name.lower(),
+                    'checked_at': now,
+                    'latency': proxy.latency,
+                    'connect_time': proxy.connect_time,
+                    'ttfb': proxy.ttfb,
+                    'anonymity': proxy.anonymity.name.lower(),
+                    'supports_https': proxy.supports_https
+                })
+
+    def alive_proxies(self) -> ProxyList:
+        """Returns the proxies whose last check found them alive and is still
+        fresh, with their results set.
+
+        :return: The proxies.
+        """
+        proxies = ProxyList()
+        with self._lock:
+            addresses = [f'{entry["type"]}://{key}'
+                         for key, entry in self._entries.items()
+                         if entry.get('status') == 'alive']
+        for address in addresses:
+            proxy = Proxy.from_text(address)
+            entry = self.get(proxy)
+            if entry is not None:  # The stale ones need a new check first
+                self._set_result(proxy, entry)
+                proxies.add(proxy)
+        return proxies
+
+    def sightings(self, proxy: Proxy) -> _Optional[_Dict[str, object]]:
+        """Returns when a proxy was first and last seen and by which sources.
+
+        :param proxy: The proxy.
+        :return: A dict with the first_seen, last_seen and sources keys or None if
+                the proxy is not in the store.
+        """
+        entry = self._entries.get(proxy_key(proxy))
+        if entry is None:
+            return None
+        return {
+            'first_seen': entry.get('first_seen'),
+            'last_seen': entry.get('last_seen'),
+            'sources': list(entry.get('sources', []))
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f'ProxyStore(path={str(self.path)!r}, alive_ttl={self.alive_ttl}, '
+            f'dead_ttl={self.dead_ttl}, forget_after={self.forget_after}, '
+            f'entries={len(self)})'
+        )
@@ -0,0 +1,327 @@
+# ProxyEater.Table.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser  # This module is used to read the pages in pieces.
+from typing import (Any as _Any, Dict as _Dict, List as _List, Tuple as _Tuple,
+                    Union as _Union, Iterable as _Iterable, Iterator as _Iterator,
+                    Optional as _Optional)
+
+__all__ = ['TableParser', 'iter_table']
+
+# The same clean up pandas.read_html does on the text of the cells
+_WHITESPACE = re.compile(r'[\r\n]+|\s{2,}')
+# tag#id.class.class, every part optional
+_SELECTOR = re.compile(
+    r'^(?P<tag>[\w-]*)(?:#(?P<id>[\w-]+))?(?P<classes>(?:\.[\w-]+)*)$'
+)
+
+
+def _parse_selector(selector: str) -> _Tuple[_Optional[str], _List[str]]:
+    match = _SELECTOR.match(selector.strip())
+    if match is None or match.group('tag') not in ('', 'table'):
+        raise ValueError(
+            f'The table selector({selector}) must look like table#id.class.'
+        )
+    return match.group('id'), [name for name in match.group('classes').split('.')
+                               if name]
+
+
+class _Table:
+    """The state of a table that is being read."""
+
+    def __init__(self, matches: bool) -> None:
+        self.matches: bool = matches  # Whether the table fits the selector
+        self.has_text: bool = False
+        self.ordinal: _Optional[int] = None  # The index among the tables with text
+        self.section: str = 'tbody'
+        self.row: _Optional[_List[_Tuple[str, int, int]]] = None
+        self.row_section: str = 'tbody'
+        self.row_all_th: bool = True
+        self.cell: _Optional[_List[str]] = None
+        self.cell_spans: _Tuple[int, int] = (1, 1)
+        self.cell_is_th: bool = False
+        self.header_rows: _List[_List[str]] = []
+        self.has_thead: bool = False
+        self.columns: _Optional[_List[_Any]] = None
+        # The cells of the rows above that span into the next rows:
+        # (column, text, rows left)
+        self.remainders: _Dict[str, _List[_Tuple[int, str, int]]] = {
+            'thead': [], 'tbody': []
+        }
+
+
+class TableParser(HTMLParser):
+    """This class reads one table of an HTML page and hands out its rows as
+    soon as they are read, without building the whole page in memory.
+
+    The tables are counted, the header is found and the cells are cleaned
+    up the same way `pandas.read_html` does it, so the index and the column
+    names of a pandas parser config pick the same table and cells:
+
+    >>> parser = TableParser(index=1)
+    >>> for chunk in chunks:
+    ...     parser.feed(chunk)
+    ...     for row in parser.pop_rows():
+    ...         print(row['IP Address'], row['Port'])
+    ...     if parser.done:
+    ...         break
+    """
+
+    def __init__(self, index: int = 0, selector: _Optional[str] = None) -> None:
+        """
+        :param index: The index of the table among the tables that have some text
+                (and fit the selector, if one is given).
+        :param selector: A simple CSS selector of the table, e.g. #proxylisttable
+                or table.table-striped.
+        """
+        super().__init__(convert_charrefs=True)
+        if index < 0:
+            raise ValueError(f'The table index({index}) must not be negative.')
+        self.index: int = index
+        self.selector: _Optional[str] = selector
+        self._selector = _parse_selector(selector) if selector else None
+        self._tables: _List[_Table] = []  # The open tables, the innermost last
+        self._counted: int = 0
+        self._rows: _List[_Dict[_Any, str]] = []
+        self.found: bool = False  # Whether the table was reached
+        self.done: bool = False  # Whether the whole table was read
+
+    def _matches(self, attrs: _List[_Tuple[str, _Optional[str]]]) -> bool:
+        if self._selector is None:
+            return True
+        id_, classes = self._selector
+        attributes = dict(attrs)
+        if id_ is not None and attributes.get('id') != id_:
+            return False
+        return set(classes) <= set((attributes.get('class') or '').split())
+
+    @property
+    def _target(self) -> _Optional[_Table]:
+        for table in self._tables:
+            if table.ordinal == self.index:
+                return table
+        return None
+
+    def handle_starttag(self, tag: str, attrs: _List[_Tuple[str, _Optional[str]]]
+                        ) -> None:
+        if self.done:
+            return
+        if tag == 'table':
+            self._tables.append(_Table(self._matches(attrs)))
+            return
+        if not self._tables:
+            return
+        table = self._tables[-1]
+        if tag in ('thead', 'tbody', 'tfoot'):
+            self._end_row(table)
+            table.section = 'thead' if tag == 'thead' else 'tbody'
+            table.has_thead = table.has_thead or tag == 'thead'
+        elif tag == 'tr':
+            self._end_row(table)
+            table.row = []
+            table.row_section = table.section
+            table.row_all_th = True
+        elif tag in ('td', 'th'):
+            self._end_cell(table)
+            if table.row is None:  # A cell without a <tr>
+                table.row = []
+                table.row_section = table.section
+                table.row_all_th = True
+            attributes = dict(attrs)
+            table.cell = []
+            table.cell_spans = (_span(attributes.get('rowspan')),
+                                _span(attributes.get('colspan')))
+            table.cell_is_th = tag == 'th'
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.done or not self._tables:
+            return
+        table = self._tables[-1]
+        if tag == 'table':
+            self._end_row(table)
+            self._end_section(table, 'thead')
+            self._end_section(table, 'tbody')
+            self._tables.pop()
+            if table.ordinal == self.index:
+                self.done = True
+        elif tag in ('td', 'th'):
+            self._end_cell(table)
+        elif tag == 'tr':
+            self._end_row(table)
+        elif tag in ('thead', 'tbody', 'tfoot'):
+            self._end_row(table)
+            if tag == 'thead':
+                self._end_section(table, 'thead')
+            table.section = 'tbody'
+
+    def handle_data(self, data: str) -> None:
+        if self.done or not self._tables:
+            return
+        if not self._tables[-1].has_text and data.strip():
+            # Like pandas, only the tables with some text count; give the
+            # outer tables their numbers first as they started first
+            for table in self._tables:
+                if not table.has_text:
+                    table.has_text = True
+                    if table.matches:
+                        table.ordinal = self._counted
+                        self._counted += 1
+                        if table.ordinal == self.index:
+                            self.found = True
+        for table in self._tables:
+            if table.cell is not None:
+                table.cell.append(data)
+
+    def _end_cell(self, table: _Table) -> None:
+        if table.cell is None:
+            return
+        text = _WHITESPACE.sub(' ', ''.join(table.cell).strip())
+        table.row.append((text, *table.cell_spans))
+        table.row_all_th = table.row_all_th and table.cell_is_th
+        table.cell = None
+
+    def _end_row(self, table: _Table) -> None:
+        self._end_cell(table)
+        if table.row is None:
+            return
+        row, table.row = table.row, None
+        if table is not self._target:
+            return
+        if table.row_section == 'thead' or \
+                (not table.has_thead and table.columns is None and table.row_all_th):
+            table.header_rows.append(self._expand(table, 'thead', row))
+            return
+        self._end_section(table, 'thead')
+        self._add_row(table, self._expand(table, 'tbody', row))
+
+    def _end_section(self, table: _Table, section: str) -> None:
+        """Emits the rows that exist only because of the rowspans above them
+        and, at the end of the header, names the columns."""
+        if table is not self._target:
+            return
+        while table.remainders[section]:
+            row = self._expand(table, section, [])
+            if section == 'thead':
+                table.header_rows.append(row)
+            else:
+                self._add_row(table, row)
+        if section == 'thead' and table.columns is None:
+            table.columns = _column_names(table.header_rows)
+
+    @staticmethod
+    def _expand(table: _Table, section: str, cells: _List[_Tuple[str, int, int]]
+                ) -> _List[str]:
+        """Spreads the cells over the columns they span, like pandas does."""
+        remainder = table.remainders[section]
+        texts: _List[str] = []
+        next_remainder: _List[_Tuple[int, str, int]] = []
+        index = 0
+        for text, rowspan, colspan in cells:
+            while remainder and remainder[0][0] <= index:
+                previous_index, previous_text, previous_rowspan = remainder.pop(0)
+                texts.append(previous_text)
+                if previous_rowspan > 1:
+                    next_remainder.append(
+                        (previous_index, previous_text, previous_rowspan - 1)
+                    )
+                index += 1
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for previous_index, previous_text, previous_rowspan in remainder:
+            texts.append(previous_text)
+            if previous_rowspan > 1:
+                next_remainder.append(
+                    (previous_index, previous_text, previous_rowspan - 1)
+                )
+        table.remainders[section] = next_remainder
+        return texts
+
+    def _add_row(self, table: _Table, texts: _List[str]) -> None:
+        if table.columns is None:
+            table.columns = _column_names(table.header_rows)
+        # Like pandas, the rows are padded to the widest row and the columns
+        # missing from the header are unnamed; only the rows read after a
+        # wider one get its extra columns, as the earlier ones are handed out
+        has_header = any(any(row) for row in table.header_rows)
+        for index in range(len(table.columns), len(texts)):
+            table.columns.append(f'Unnamed: {index}' if has_header else index)
+        texts = texts + [''] * (len(table.columns) - len(texts))
+        # pandas skips the rows that end up with no cell or one blank cell
+        if len(texts) == 0 or (len(texts) == 1 and not texts[0].strip()):
+            return
+        self._rows.append(dict(zip(table.columns, texts)))
+
+    def pop_rows(self) -> _List[_Dict[_Any, str]]:
+        """Returns the rows read since the last call.
+
+        :return: The rows as {column name: text} dictionaries; the columns of a
+                table without a header are named 0, 1, 2 and so on.
+        """
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self) -> None:
+        super().close()
+        # Close the tables the page left open
+        while self._tables and not self.done:
+            self.handle_endtag('table')
+
+
+def _span(value: _Optional[str]) -> int:
+    try:
+        return max(int(value or 1), 1)
+    except ValueError:
+        return 1
+
+
+def _column_names(header_rows: _List[_List[str]]) -> _List[_Union[str, int]]:
+    """Names the columns after the last header row with some text the way
+    pandas names them: empty names become 'Unnamed: N' and repeated ones
+    get .1, .2 and so on."""
+    header_rows = [row for row in header_rows if any(row)]
+    if not header_rows:
+        return []
+    names: _List[_Union[str, int]] = []
+    seen: _Dict[str, int] = {}
+    for index, name in enumerate(header_rows[-1]):
+        if not name:
+            name = f'Unnamed: {index}'
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_table(
+    chunks: _Iterable[str], index: int = 0, selector: _Optional[str] = None
+) -> _Iterator[_Dict[_Any, str]]:
+    """Reads a table from the pieces of an HTML page and yields its rows as
+    they are read; the pieces after the end of the table are not read.
+
+    :param chunks: The text of the page, in one or more pieces.
+    :param index: The index of the table; see `TableParser`.
+    :param selector: A simple CSS selector of the table; see `TableParser`.
+    :return: An iterator of {column name: text} dictionaries.
+    """
+    parser = TableParser(index, selector)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_rows()
+        if parser.done:
+            return
+    parser.close()
+    yield from parser.pop_rows()
+    if not parser.found:
+        raise ValueError(
+            f'The page has no table at index {index}' +
+            (f' matching {selector}.' if selector else '.')
+        )
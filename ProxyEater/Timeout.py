@@ -0,0 +1,90 @@
+# ProxyEater.Timeout.py
+# CodeWriter21
+
+from __future__ import annotations
+
+import bisect  # This module is used to keep the latencies sorted.
+import threading
+from typing import (List as _List, Tuple as _Tuple, Union as _Union,
+                    Optional as _Optional)
+
+__all__ = ['TimeoutPolicy']
+
+
+class TimeoutPolicy:
+    """This class decides the connect and read timeouts of the checks.
+
+    In adaptive mode it records the latency of the proxies that turned
+    out to be alive and, once it has enough of them, lowers the timeouts
+    to the given percentile of those latencies: a proxy slower than that
+    is not worth waiting for. The timeouts never go above the configured
+    ones.
+    """
+
+    def __init__(
+        self,
+        timeout: _Union[float, _Tuple[float, float]] = 10,
+        adaptive_percentile: _Optional[float] = None,
+        min_samples: int = 20,
+        minimum: float = 0.5
+    ) -> None:
+        """
+        :param timeout: The timeout of the checks; either one number used for
+                both the connect and the read timeout or a (connect, read) tuple.
+        :param adaptive_percentile: If set (0-100), the timeouts are lowered to
+                this percentile of the latencies of the alive proxies.
+        :param min_samples: The number of alive proxies needed before the
+                timeouts are lowered.
+        :param minimum: The adaptive timeouts never go below this many seconds.
+        """
+        if isinstance(timeout, (tuple, list)):
+            self.connect_timeout, self.read_timeout = (float(x) for x in timeout)
+        else:
+            self.connect_timeout = self.read_timeout = float(timeout)
+        if self.connect_timeout <= 0 or self.read_timeout <= 0:
+            raise ValueError(f'The timeout({timeout}) must be positive.')
+        if adaptive_percentile is not None and not 0 < adaptive_percentile <= 100:
+            raise ValueError(
+                f'The adaptive percentile({adaptive_percentile}) must be in (0, 100].'
+            )
+        self.adaptive_percentile: _Optional[float] = adaptive_percentile
+        self.min_samples: int = min_samples
+        self.minimum: float = minimum
+        self._latencies: _List[float] = []
+        self._limit: _Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        """Records the latency of a proxy that turned out to be alive.
+
+        :param latency: The latency in seconds.
+        """
+        if self.adaptive_percentile is None:
+            return
+        with self._lock:
+            bisect.insort(self._latencies, latency)
+            if len(self._latencies) >= self.min_samples:
+                index = self.adaptive_percentile / 100 * (len(self._latencies) - 1)
+                self._limit = max(self._latencies[round(index)], self.minimum)
+
+    def get(self, remaining: _Optional[float] = None) -> _Tuple[float, float]:
+        """Returns the (connect, read) timeouts for the next check.
+
+        :param remaining: The seconds left of the budget of the run, if any.
+        :return: The (connect, read) timeouts.
+        """
+        connect_timeout, read_timeout = self.connect_timeout, self.read_timeout
+        if self._limit is not None:
+            connect_timeout = min(connect_timeout, self._limit)
+            read_timeout = min(read_timeout, self._limit)
+        if remaining is not None:
+            connect_timeout = max(min(connect_timeout, remaining), 0.001)
+            read_timeout = max(min(read_timeout, remaining), 0.001)
+        return connect_timeout, read_timeout
+
+    def __repr__(self) -> str:
+        return (
+            f'TimeoutPolicy(connect_timeout={self.connect_timeout}, '
+            f'read_timeout={self.read_timeout}, '
+            f'adaptive_percentile={self.adaptive_percentile})'
+        )
@@ -9,8 +9,42 @@ __copyright__ = "Copyright 2022-2023 CodeWriter21"
 __github__ = "https://github.com/MPCodeWriter21/ProxyEater"
 __url__ = "https://github.com/MPCodeWriter21/ProxyEater"
 
-from .Proxy import Proxy, ProxyList, ProxyType, ProxyStatus
+import importlib
+
+from .Proxy import Proxy, ProxyList, ProxyType, ProxyStatus, ProxyAnonymity
 from .Scraper import Scraper
+from .Spec import ParserSpec, compile_parser
+from .Cache import CheckCache, SourceCache
+from .Store import ProxyStore
+from .Stats import SourceStats
+from .Timeout import TimeoutPolicy
+from .Checker import ProxyChecker, ShardedProxyChecker
+from .AsyncChecker import AsyncProxyChecker
+from .Scheduler import RevalidationScheduler
+from .Collector import ProxyCollector
+from .Classifier import UrlRotation
+from .Metrics import Metrics, enable_metrics, disable_metrics, get_metrics
 from .__main__ import main
 
-__all__ = ['main', 'Scraper', 'Proxy', 'ProxyType', 'ProxyList', 'ProxyStatus']
+__all__ = [
+    'main', 'Scraper', 'ParserSpec', 'compile_parser', 'Proxy', 'ProxyType',
+    'ProxyList', 'ProxyStatus', 'ProxyAnonymity', 'ProxyChecker',
+    'ShardedProxyChecker', 'AsyncProxyChecker', 'TimeoutPolicy', 'CheckCache',
+    'SourceCache', 'ProxyStore', 'SourceStats', 'RevalidationScheduler',
+    'ProxyCollector', 'JudgeServer', 'UrlRotation', 'FakeProxyFarm', 'BenchmarkResult',
+    'run_benchmark', 'Metrics', 'enable_metrics', 'disable_metrics', 'get_metrics'
+]
+
+# The judge server and the benchmark suite are only imported when they are used
+_LAZY = {
+    'JudgeServer': 'Judge',
+    'FakeProxyFarm': 'Benchmark',
+    'BenchmarkResult': 'Benchmark',
+    'run_benchmark': 'Benchmark'
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
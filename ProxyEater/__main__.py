@@ -3,22 +3,183 @@
 import sys
 import json
 import shutil
+import asyncio
 import pathlib
 import argparse
+from typing import Union, Optional
 
 import log21
 import importlib_resources
 
 import ProxyEater
 
-from .Proxy import Proxy, ProxyList, ProxyType
+from .Proxy import Proxy, ProxyList, ProxyType, ProxyStatus, ProxyAnonymity
+from .Cache import CheckCache, SourceCache
+from .Store import ProxyStore
+from .Stats import SourceStats
 from .Scraper import Scraper
+from .Checker import ProxyChecker, ShardedProxyChecker
+from .AsyncChecker import AsyncProxyChecker
+from .Collector import ProxyCollector, meets_classification
+from .Metrics import enable_metrics
 
 path = importlib_resources.files('ProxyEater')
 
 logger = log21.get_logger("ProxyEater")
 
 
+def create_checker(
+    args: argparse.Namespace
+) -> Union[ProxyChecker, AsyncProxyChecker, ShardedProxyChecker]:
+    """Creates the checker of the engine selected in the arguments.
+
+    :param args: A Namespace containing needed arguments.
+    :return: The checker.
+    """
+    if args.connect_timeout is not None:
+        timeout = (args.connect_timeout, args.timeout)
+    else:
+        timeout = args.timeout
+    options = dict(
+        timeout=timeout,
+        url=args.url if len(args.url) > 1 else args.url[0],
+        prefilter_timeout=args.prefilter,
+        prefilter_concurrency=args.concurrency,
+        adaptive_percentile=args.adaptive_timeout,
+        budget=args.budget,
+        max_per_host=args.max_per_host,
+        max_per_subnet=args.max_per_subnet,
+        host_probe_timeout=args.probe_hosts,
+        stop_after_alive=args.want,
+        order=args.order,
+        classify=args.classify
+    )
+    if args.engine == 'async':
+        options['concurrency'] = args.concurrency
+    else:
+        options.update(
+            threads_no=args.threads,
+            pool_connections=args.pool_connections,
+            pool_maxsize=args.pool_maxsize,
+            proxy_pools=args.proxy_pools
+        )
+    if args.processes > 1:
+        return ShardedProxyChecker(
+            processes=args.processes, engine=args.engine, **options
+        )
+    if args.engine == 'async':
+        return AsyncProxyChecker(**options)
+    return ProxyChecker(**options)
+
+
+def create_cache(args: argparse.Namespace) -> Optional[CheckCache]:
+    """Creates the CheckCache selected in the arguments; with --state, the
+    ProxyStore plays its part.
+
+    :param args: A Namespace containing needed arguments.
+    :return: The cache or None if no cache is used.
+    """
+    if args.state is not None:
+        return ProxyStore(
+            pathlib.Path(args.state).expanduser(),
+            alive_ttl=args.alive_ttl,
+            dead_ttl=args.dead_ttl
+        )
+    if args.cache is None:
+        return None
+    return CheckCache(
+        pathlib.Path(args.cache).expanduser(),
+        alive_ttl=args.alive_ttl,
+        dead_ttl=args.dead_ttl
+    )
+
+
+def create_source_cache(args: argparse.Namespace) -> Optional[SourceCache]:
+    """Creates the SourceCache selected in the arguments.
+
+    :param args: A Namespace containing needed arguments.
+    :return: The cache or None if no cache is used.
+    """
+    if args.source_cache is None:
+        return None
+    return SourceCache(pathlib.Path(args.source_cache).expanduser())
+
+
+def create_source_stats(args: argparse.Namespace) -> Optional[SourceStats]:
+    """Creates the SourceStats selected in the arguments.
+
+    :param args: A Namespace containing needed arguments.
+    :return: The statistics or None if they are not kept.
+    """
+    if args.source_stats is None:
+        return None
+    return SourceStats(pathlib.Path(args.source_stats).expanduser())
+
+
+def check_proxies(
+    proxies: ProxyList,
+    checker: Union[ProxyChecker, AsyncProxyChecker, ShardedProxyChecker],
+    on_progress_callback=None,
+    cache: Optional[CheckCache] = None,
+    min_anonymity: Optional[ProxyAnonymity] = None,
+    https_only: bool = False
+) -> None:
+    """Checks the proxies using the given checker.
+
+    :param proxies: The proxies to check.
+    :param checker: The checker created by `create_checker`.
+    :param on_progress_callback: A callback function to be called on each progress.
+    :param cache: The CheckCache to consult and update, if any.
+    :param min_anonymity: If set, the proxies less anonymous than this are removed.
+    :param https_only: If True, the proxies that cannot CONNECT are removed.
+    """
+    to_check = proxies
+    if cache is not None:
+        hits = cache.hits
+        to_check = cache.apply(proxies)
+        logger.info(
+            f'Cache: Reused the results of {cache.hits - hits} proxies; checking '
+            f'{to_check.count} proxies.'
+        )
+        if on_progress_callback is not None:
+            callback = on_progress_callback
+            on_progress_callback = lambda _, progress: callback(proxies, progress)
+    remove_dead = cache is None
+    if isinstance(checker, AsyncProxyChecker):
+        asyncio.run(checker.check(to_check, remove_dead, on_progress_callback))
+    else:
+        checker.check(to_check, remove_dead, on_progress_callback)
+    if cache is not None:
+        cache.merge(proxies, to_check)
+    if checker.stop_after_alive is not None:
+        # Only the proxies known to work are wanted, not the unchecked ones
+        for proxy in [proxy for proxy in proxies if proxy.status != ProxyStatus.ALIVE]:
+            proxies.discard(proxy)
+    if min_anonymity is not None or https_only:
+        count = proxies.count
+        for proxy in [proxy for proxy in proxies
+                      if not meets_classification(proxy, min_anonymity, https_only)]:
+            proxies.discard(proxy)
+        logger.info(
+            f'Classifier: Removed {count - proxies.count} proxies that are not '
+            'anonymous enough or cannot CONNECT.'
+        )
+    report = checker.host_probe_report
+    if report is not None:
+        logger.info(
+            f'Host probe: Removed {report.removed} proxies after probing '
+            f'{report.checked} IPs in {report.elapsed:.2f}s, saving about '
+            f'{report.saved:.2f}s.'
+        )
+    report = checker.prefilter_report
+    if report is not None:
+        logger.info(
+            f'Pre-filter: Removed {report.removed} unreachable proxies out of '
+            f'{report.checked} in {report.elapsed:.2f}s, saving about '
+            f'{report.saved:.2f}s.'
+        )
+
+
 def scrape(args: argparse.Namespace) -> None:
     """Scrapes different websites and collects proxies.
 
@@ -45,117 +206,163 @@ def scrape(args: argparse.Namespace) -> None:
     else:
         proxy = None
 
-    useragent = args.useragent
+    checker = create_checker(args)
+    cache = create_cache(args)
+    store = cache if isinstance(cache, ProxyStore) else None
+    source_cache = create_source_cache(args)
+    stats = create_source_stats(args)
+
+    def progress_callback(scraper_: Scraper, progress: float, page: int):
+        logger.info(
+            f'{scraper_.name}: Collected: {scraper_.proxies.count}; Page: {page}, '
+            f'{progress:.2f}%',
+            end='\r'
+        )
+
+    def finish_callback(scraper_: Scraper):
+        logger.info(f'{scraper_.name}: Collected: {scraper_.proxies.count}, 100.0%')
+        logger.info(f'{scraper_.name}: Done.')
+
+    def failure_callback(scraper_: Scraper, error: Exception):
+        logger.error(f'{scraper_.name}: {error.__class__.__name__}: {error}')
+
+    def error_callback(config: Optional[dict], error: Exception):
+        name = 'Checker' if config is None else config.get('id')
+        logger.error(f'{name}: {error.__class__.__name__}: {error}')
+
+    def checking_callback(proxy_list: ProxyList, progress: float):
+        logger.progress_bar(progress, 100, count=proxy_list.count)
+
+    def geolocation_callback(proxy_list: ProxyList, progress: float):
+        logger.progress_bar(progress, 100)
+
+    def geolocation_error_callback(proxy_list: ProxyList, error: Exception):
+        logger.error(f'{error.__class__.__name__}: {error}')
 
-    proxies = ProxyList()
-    # Scrape
-    for config in source_data:
-        progress_callback = finish_callback = error_callback = checking_callback = None
+    def check_new_proxies(proxies_: ProxyList, name: str) -> None:
         if args.verbose:
             logger.progress_bar = log21.ProgressBar(
                 format_='Proxies: {count} {prefix}{bar}{suffix} {percentage}%',
                 style='{',
                 additional_variables={'count': 0}
             )
+        collected_proxies_count = proxies_.count
+        logger.info('Checking if the proxies are alive...')
+        check_proxies(
+            proxies_, checker, checking_callback if args.verbose else None, cache,
+            args.anonymity, args.https_only
+        )
+        if args.verbose:
+            logger.info(
+                f'{name}: Removed {collected_proxies_count - proxies_.count} dead '
+                'proxies.'
+            )
 
-            def progress_callback(scraper_: Scraper, progress: float, page: int):
-                logger.info(
-                    f'{scraper_.name}: Collected: {scraper_.proxies.count}; Page: {page}, {progress:.2f}%',
-                    end='\r'
-                )
-
-            def finish_callback(scraper_: Scraper):
-                logger.info(
-                    f'{scraper_.name}: Collected: {scraper_.proxies.count}, 100.0%'
-                )
-                logger.info(f'{scraper_.name}: Done.')
-
-            def error_callback(scraper_: Scraper, error: Exception):
-                logger.error(f'{scraper_.name}: {error.__class__.__name__}: {error}')
-
-            def checking_callback(proxy_list: ProxyList, progress: float):
-                logger.progress_bar(progress, 100, count=proxy_list.count)
+    def write_proxies(new_proxies: ProxyList) -> None:
+        if args.include_geolocation:
+            if args.verbose:
+                logger.progress_bar = log21.ProgressBar()
+            logger.info('Getting the geolocation info of the proxies...')
+            new_proxies.batch_collect_geolocations(
+                on_progress_callback=geolocation_callback if args.verbose else None,
+                on_error_callback=geolocation_error_callback if args.verbose else None
+            )
+        logger.info(f'Scraped {collector.proxies.count} proxies.')
+        if args.verbose:
+            logger.info(f'Writing {new_proxies.count} proxies to {args.output}...')
+        # The first write of the run replaces the file and the next ones only
+        # add the new proxies to it
+        append = new_proxies.count < collector.proxies.count
+        if args.file_format == 'text':
+            new_proxies.to_text_file(
+                args.output, '\n', format_=args.format, append=append
+            )
+        elif args.file_format == 'json':
+            new_proxies.to_json_file(
+                args.output,
+                include_status=args.include_status,
+                include_geolocation=args.include_geolocation,
+                include_metrics=args.include_metrics,
+                include_classification=args.include_classification,
+                append=append
+            )
+        elif args.file_format == 'csv':
+            new_proxies.to_csv_file(
+                args.output,
+                include_status=args.include_status,
+                include_geolocation=args.include_geolocation,
+                include_metrics=args.include_metrics,
+                include_classification=args.include_classification,
+                append=append
+            )
 
-        logger.info(f'Scraping {config.get("id")}...')
-        scraper = Scraper(
-            config.get('url'),
-            config.get('parser'),
-            method=config.get('method'),
-            name=config.get('id'),
-            useragent=useragent,
+    collector = ProxyCollector(
+        source_data,
+        scraper_options=dict(
+            useragent=args.useragent,
             proxy=proxy,
-            request_timeout=args.timeout
+            request_timeout=args.timeout,
+            timeout=args.source_timeout,
+            page_concurrency=args.page_concurrency,
+            cache=source_cache,
+            min_refresh=args.min_refresh
+        ),
+        source_concurrency=args.source_concurrency,
+        proxy_types=args.proxy_types,
+        check_callback=None if args.no_check else check_new_proxies,
+        checker=checker,
+        cache=cache,
+        stats=stats,
+        min_yield=args.min_yield,
+        want=args.want,
+        pipeline=args.pipeline,
+        min_anonymity=args.anonymity,
+        https_only=args.https_only,
+        on_source_callback=lambda config: logger.info(
+            f'Scraping {config.get("id")}...'
+        ),
+        on_progress_callback=progress_callback if args.verbose else None,
+        on_success_callback=finish_callback if args.verbose else None,
+        on_failure_callback=failure_callback if args.verbose else None,
+        on_error_callback=error_callback,
+        on_proxies_callback=write_proxies
+    )
+    if collector.skipped:
+        logger.info(
+            f'Source stats: Skipping {len(collector.skipped)} sources yielding less '
+            f'than {args.min_yield} alive proxies per second: '
+            f'{", ".join(collector.skipped)}'
         )
-        proxies_ = scraper.get_proxies(
-            on_progress_callback=progress_callback,
-            on_success_callback=finish_callback,
-            on_failure_callback=error_callback
+    if store is not None:
+        # Start from the proxies known to be alive; only the new and the stale
+        # proxies the sources list are checked
+        collector.add(store.alive_proxies())
+        logger.info(
+            f'State: {len(store)} known proxies, {collector.proxies.count} of them '
+            'alive.'
         )
-
-        collected_proxies_count = proxies_.count
-        # Filter the proxies
-        logger.info('Filtering the proxies...')
-        proxies_ = proxies_.filter(type_=args.proxy_types)
-        if args.verbose:
+    if args.pipeline and not args.no_check:
+        logger.info('Checking the proxies as they are scraped...')
+    try:
+        collector.run()
+    finally:
+        if source_cache is not None:
+            source_cache.save()
             logger.info(
-                f'{scraper.name}: Removed {collected_proxies_count - proxies_.count} '
-                'proxies of wrong type.'
+                f'Source cache: Reused {source_cache.hits} fresh and '
+                f'{source_cache.revalidations} unchanged pages.'
             )
-        collected_proxies_count = proxies_.count
-        # Check the proxies
-        if collected_proxies_count > 0 and not args.no_check:
-            logger.info('Checking if the proxies are alive...')
-            proxies_.check_all(
-                timeout=args.timeout,
-                threads_no=args.threads,
-                on_progress_callback=checking_callback,
-                url=args.url
-            )
-            if args.verbose:
-                logger.info(
-                    f'{scraper.name}: Removed '
-                    f'{collected_proxies_count - proxies_.count} dead proxies.'
-                )
-
-        proxies.update(proxies_)
-        logger.info(f'Scraped {len(proxies)} proxies.')
-
-        if proxies.count > 0:
-            if args.include_geolocation:
-                on_progress_callback = on_error_callback = None
-                if args.verbose:
-                    logger.progress_bar = log21.ProgressBar()
-
-                    def on_progress_callback(proxy_list: ProxyList, progress: float):
-                        logger.progress_bar(progress, 100)
-
-                    def on_error_callback(proxy_list: ProxyList, error: Exception):
-                        logger.error(f'{error.__class__.__name__}: {error}')
-
-                logger.info('Getting the geolocation info of the proxies...')
-                proxies.batch_collect_geolocations(
-                    on_progress_callback=on_progress_callback,
-                    on_error_callback=on_error_callback
-                )
-            if args.verbose:
-                logger.info(f'Writing {proxies.count} proxies to {args.output}...')
-            # Write to file
-            if args.file_format == 'text':
-                proxies.to_text_file(args.output, '\n', format_=args.format)
-            elif args.file_format == 'json':
-                proxies.to_json_file(
-                    args.output,
-                    include_status=args.include_status,
-                    include_geolocation=args.include_geolocation
-                )
-            elif args.file_format == 'csv':
-                proxies.to_csv_file(
-                    args.output,
-                    include_status=args.include_status,
-                    include_geolocation=args.include_geolocation
-                )
-    if proxies.count > 0:
-        logger.info(f'Wrote {proxies.count} proxies to {args.output}.')
+        if store is not None:
+            store.save()
+            logger.info(f'State: {store.new} new proxies; {len(store)} known proxies.')
+        if stats is not None and args.source_report:
+            logger.info(f'Source stats:\n{stats.report()}')
+    if collector.has_enough():
+        logger.info(f'Found {collector.proxies.count} alive proxies; skipped the rest.')
+    if isinstance(checker, ProxyChecker):
+        checker.close(wait=args.want is None)
+    if collector.proxies.count > 0:
+        logger.info(f'Wrote {collector.proxies.count} proxies to {args.output}.')
 
 
 def check(args):
@@ -206,32 +413,32 @@ def check(args):
     if args.verbose:
         logger.info('Checking if the proxies are alive...')
         logger.info('Number of proxies:', proxies.count)
-    proxies.check_all(
-        timeout=args.timeout,
-        threads_no=args.threads,
-        on_progress_callback=checking_callback,
-        url=args.url
+    checker = create_checker(args)
+    check_proxies(
+        proxies, checker, checking_callback, create_cache(args), args.anonymity,
+        args.https_only
     )
+    if isinstance(checker, ProxyChecker):
+        checker.close(wait=args.want is None)
     if args.verbose:
         logger.info(f'Removed {count - proxies.count} dead proxies.')
     logger.info(f'Alive proxies: {proxies.count}')
 
     if proxies.count > 0:
         if args.include_geolocation:
-            on_progress_callback = on_error_callback = None
             if args.verbose:
                 logger.progress_bar = log21.ProgressBar()
 
-                def on_progress_callback(proxy_list: ProxyList, progress: float):
-                    logger.progress_bar(progress, 100)
+            def on_progress_callback(proxy_list: ProxyList, progress: float):
+                logger.progress_bar(progress, 100)
 
-                def on_error_callback(proxy_list: ProxyList, error: Exception):
-                    logger.error(f'{error.__class__.__name__}: {error}')
+            def on_error_callback(proxy_list: ProxyList, error: Exception):
+                logger.error(f'{error.__class__.__name__}: {error}')
 
             logger.info('Getting the geolocation info of the proxies...')
             proxies.batch_collect_geolocations(
-                on_progress_callback=on_progress_callback,
-                on_error_callback=on_error_callback
+                on_progress_callback=on_progress_callback if args.verbose else None,
+                on_error_callback=on_error_callback if args.verbose else None
             )
         # Write to file
         if args.file_format == 'text':
@@ -240,21 +447,69 @@ def check(args):
             proxies.to_json_file(
                 args.output,
                 include_status=args.include_status,
-                include_geolocation=args.include_geolocation
+                include_geolocation=args.include_geolocation,
+                include_metrics=args.include_metrics,
+                include_classification=args.include_classification
             )
         elif args.file_format == 'csv':
             proxies.to_csv_file(
                 args.output,
                 include_status=args.include_status,
-                include_geolocation=args.include_geolocation
+                include_geolocation=args.include_geolocation,
+                include_metrics=args.include_metrics,
+                include_classification=args.include_classification
             )
         logger.info(f'Wrote {proxies.count} proxies to {args.output}.')
 
 
+def judge(args: argparse.Namespace) -> None:
+    from .Judge import JudgeServer  # Only the judge mode needs the server
+
+    server = JudgeServer(args.host, args.port)
+    logger.info(
+        f'Serving the judge on {args.host}:{args.port} with {args.judge_processes} '
+        f'process(es); check the proxies with --url {server.url}'
+    )
+    try:
+        server.run(args.judge_processes)
+    except (OSError, ValueError) as ex:
+        logger.error(f'{ex.__class__.__name__}: {ex}')
+        return
+    logger.info('The judge was stopped.')
+
+
+def benchmark(args: argparse.Namespace) -> None:
+    from .Benchmark import run_benchmark  # Only the benchmark mode needs the suite
+
+    logger.info(
+        f'Benchmarking the {args.engine} engine with {args.sizes} proxies and '
+        f'{args.levels} concurrency levels...'
+    )
+    results = run_benchmark(
+        sizes=args.sizes,
+        concurrency_levels=args.levels,
+        engine=args.engine,
+        processes=args.processes if args.processes > 1 else None,
+        timeout=args.timeout,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        blackhole_rate=args.blackhole_rate,
+        dead_rate=args.dead_rate,
+        seed=args.seed,
+        scrape=not args.no_scrape,
+        on_result_callback=lambda result: logger.info(str(result))
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump([result._asdict() for result in results], file, indent=4)
+        logger.info(f'Wrote {len(results)} results to {args.output}.')
+
+
 def main():
     try:
         parser = log21.ColorizingArgumentParser()
-        parser.add_argument('mode', help='Modes: Scrape, Check')
+        parser.add_argument('mode', help='Modes: Scrape, Check, Judge, Benchmark')
         parser.add_argument(
             '--source',
             '-s',
@@ -271,7 +526,10 @@ def main():
         parser.add_argument(
             '--format',
             '-f',
-            help='The format for saving the proxies in text file(default:'
+            help='The format for saving the proxies in text file; the keys are ip, '
+            'port, type, scheme, status, anonymity, supports_https, connect_time_ms, '
+            'ttfb_ms, latency_ms, last_success, last_failure and success_ratio'
+            '(default:'
             '"{scheme}://{ip}:{port}").',
             default='{scheme}://{ip}:{port}'
         )
@@ -287,6 +545,20 @@ def main():
             help='Include the status of the proxies in the output file.',
             action='store_true'
         )
+        parser.add_argument(
+            '--include-metrics',
+            '-im',
+            help='Include the latency and health metrics of the proxies in the output '
+            'file.',
+            action='store_true'
+        )
+        parser.add_argument(
+            '--include-classification',
+            '-ic',
+            help='Include the anonymity and the HTTPS support of the proxies in the '
+            'output file; see --classify.',
+            action='store_true'
+        )
         parser.add_argument(
             '--threads',
             '-t',
@@ -294,19 +566,209 @@ def main():
             type=int,
             default=25
         )
+        parser.add_argument(
+            '--engine',
+            '-e',
+            help='The engine to use for checking the proxies(default:threads).',
+            default='threads',
+            choices=['threads', 'async']
+        )
+        parser.add_argument(
+            '--processes',
+            '-P',
+            help='Split the proxies into this many shards and check each shard in '
+            'its own process(default:1).',
+            type=int,
+            default=1
+        )
+        parser.add_argument(
+            '--concurrency',
+            '-c',
+            help='The maximum number of checks in flight when using the async '
+            'engine and of connections opened by the pre-filter(default:500).',
+            type=int,
+            default=500
+        )
+        parser.add_argument(
+            '--pool-connections',
+            '-pC',
+            help='The number of connection pools, one per host, each thread of the '
+            'threads engine keeps for each proxy(default:10).',
+            type=int,
+            default=10
+        )
+        parser.add_argument(
+            '--pool-maxsize',
+            '-pM',
+            help='The maximum number of connections kept in each pool of the threads '
+            'engine(default:10).',
+            type=int,
+            default=10
+        )
+        parser.add_argument(
+            '--proxy-pools',
+            '-pP',
+            help='The number of proxies whose connections each thread of the threads '
+            'engine keeps open for their next checks(default:8).',
+            type=int,
+            default=8
+        )
+        parser.add_argument(
+            '--prefilter',
+            '-pf',
+            help='Drop the proxies whose port does not accept a TCP connection within '
+            'the given seconds before checking them(default timeout:1.5).',
+            nargs='?',
+            const=1.5,
+            default=None,
+            type=float
+        )
+        parser.add_argument(
+            '--probe-hosts',
+            '-ph',
+            help='Probe one port of every IP first and drop all the proxies of the IPs '
+            'that do not answer within the given seconds(default timeout:1.5).',
+            nargs='?',
+            const=1.5,
+            default=None,
+            type=float
+        )
+        parser.add_argument(
+            '--max-per-host',
+            '-mh',
+            help='The maximum number of checks in flight per IP(default:no limit).',
+            default=None,
+            type=int
+        )
+        parser.add_argument(
+            '--max-per-subnet',
+            '-ms',
+            help='The maximum number of checks in flight per /24 subnet'
+            '(default:no limit).',
+            default=None,
+            type=int
+        )
         parser.add_argument(
             '--timeout',
             '-to',
-            help='The timeout of the requests(default:15).',
+            help='The timeout of the requests in seconds(default:15).',
             default=15,
+            type=float
+        )
+        parser.add_argument(
+            '--connect-timeout',
+            '-cto',
+            help='The timeout of connecting to the proxies when checking them'
+            '(default:same as --timeout).',
+            default=None,
+            type=float
+        )
+        parser.add_argument(
+            '--adaptive-timeout',
+            '-at',
+            help='Lower the checking timeouts to this percentile of the latencies of '
+            'the proxies found alive so far(example:95).',
+            default=None,
+            type=float
+        )
+        parser.add_argument(
+            '--budget',
+            '-b',
+            help='The maximum number of seconds to spend on checking a list; the '
+            'proxies left unchecked are marked as UNKNOWN.',
+            default=None,
+            type=float
+        )
+        parser.add_argument(
+            '--want',
+            '-w',
+            help='Stop checking as soon as this many alive proxies are found and only '
+            'keep the alive proxies.',
+            default=None,
             type=int
         )
+        parser.add_argument(
+            '--order',
+            '-O',
+            help='Check the proxies with the best results in the previous checks, e.g. '
+            'from a json source or the cache, first(default:no order).',
+            default=None,
+            choices=['latency', 'connect_time', 'ttfb', 'success_ratio']
+        )
+        parser.add_argument(
+            '--classify',
+            '-cl',
+            action='store_true',
+            help='Find the anonymity and the HTTPS support of the alive proxies while '
+            'checking them.'
+        )
+        parser.add_argument(
+            '--anonymity',
+            '-an',
+            help='Only keep the proxies at least this anonymous; implies --classify. '
+            'Elite needs an url that echoes the request headers, e.g. a judge.',
+            default=None,
+            choices=['transparent', 'anonymous', 'elite']
+        )
+        parser.add_argument(
+            '--https-only',
+            '-hs',
+            action='store_true',
+            help='Only keep the proxies that can CONNECT to HTTPS sites; implies '
+            '--classify.'
+        )
+        parser.add_argument(
+            '--cache',
+            '-C',
+            help='Keep the results of the checks in this file and do not check the '
+            'proxies with a fresh result again(default path:'
+            '~/.cache/ProxyEater/checks.json).',
+            nargs='?',
+            const='~/.cache/ProxyEater/checks.json',
+            default=None
+        )
+        parser.add_argument(
+            '--alive-ttl',
+            '-aT',
+            help='The number of seconds the cached result of an alive proxy is reused'
+            '(default:900).',
+            default=900,
+            type=float
+        )
+        parser.add_argument(
+            '--dead-ttl',
+            '-dT',
+            help='The number of seconds a proxy found dead is not checked again'
+            '(default:3600).',
+            default=3600,
+            type=float
+        )
+        parser.add_argument(
+            '--state',
+            '-S',
+            help='Remember every proxy scraped, when it was first and last seen, its '
+            'sources and its last result in this file; only the new and the stale '
+            'proxies are checked and the output also lists the known alive ones'
+            '(default path:~/.cache/ProxyEater/state.json).',
+            nargs='?',
+            const='~/.cache/ProxyEater/state.json',
+            default=None
+        )
         parser.add_argument(
             '--url',
             '-u',
-            help='The url to use for checking the proxies'
-            '(default:http://icanhazip.com).',
-            default='http://icanhazip.com'
+            help='The url to use for checking the proxies; repeat it to use several '
+            'urls, e.g. judges, in turn(default:http://icanhazip.com).',
+            action='append',
+            default=None
+        )
+        parser.add_argument(
+            '--metrics-file',
+            '-mf',
+            help='Write the timings of the requests, the parsing and the checking '
+            'phases to this file; as json if it ends in .json and in the Prometheus '
+            'text format otherwise.',
+            default=None
         )
         parser.add_argument(
             '--verbose',
@@ -336,6 +798,83 @@ def main():
             '-ua',
             help='The useragent of the requests(default:random).'
         )
+        scrap_arguments.add_argument(
+            '--source-concurrency',
+            '-sc',
+            help='The number of sources to scrape at once(default:8).',
+            default=8,
+            type=int
+        )
+        scrap_arguments.add_argument(
+            '--page-concurrency',
+            '-pc',
+            help='The number of pages of each source to fetch at once(default:4).',
+            default=4,
+            type=int
+        )
+        scrap_arguments.add_argument(
+            '--source-timeout',
+            '-st',
+            help='The maximum number of seconds to spend on each source; the pages '
+            'left are skipped(default:no limit).',
+            default=None,
+            type=float
+        )
+        scrap_arguments.add_argument(
+            '--source-cache',
+            '-SC',
+            help='Keep the proxies found in the pages of the sources in this file and '
+            'request the pages conditionally with their ETag and Last-Modified '
+            'headers(default path:~/.cache/ProxyEater/sources.json).',
+            nargs='?',
+            const='~/.cache/ProxyEater/sources.json',
+            default=None
+        )
+        scrap_arguments.add_argument(
+            '--min-refresh',
+            '-mr',
+            help='The minimum number of seconds between two requests of a page with '
+            'the source cache; a source may set its own with "min_refresh"'
+            '(default:0).',
+            default=0,
+            type=float
+        )
+        scrap_arguments.add_argument(
+            '--pipeline',
+            '-pl',
+            help='Check the proxies of each page as soon as it is read instead of '
+            'waiting for the whole source, and add the alive ones to the output as '
+            'they are found. The threads engine checks each proxy as it comes and '
+            'the other engines check them in rounds.',
+            action='store_true'
+        )
+        scrap_arguments.add_argument(
+            '--source-stats',
+            '-ss',
+            help='Keep the number of proxies each source lists, how many of them are '
+            'new and alive and how long it takes in this file, scrape the sources '
+            'and check their proxies from the most alive proxies per second to the '
+            'least(default path:~/.cache/ProxyEater/source-stats.json).',
+            nargs='?',
+            const='~/.cache/ProxyEater/source-stats.json',
+            default=None
+        )
+        scrap_arguments.add_argument(
+            '--min-yield',
+            '-my',
+            help='Skip the sources that gave less than this many alive proxies per '
+            'second in the previous runs; they are tried again after 5 skipped runs. '
+            'Implies --source-stats.',
+            default=None,
+            type=float
+        )
+        scrap_arguments.add_argument(
+            '--source-report',
+            '-sr',
+            help='Print the statistics of the sources after scraping. Implies '
+            '--source-stats.',
+            action='store_true'
+        )
         scrap_arguments.add_argument(
             '--include-geolocation',
             '-ig',
@@ -365,7 +904,97 @@ def main():
             default='http',
             choices=['http', 'https', 'socks4', 'socks5']
         )
+        judge_arguments = parser.add_argument_group('Judge', 'Judge mode arguments')
+        judge_arguments.add_argument(
+            '--host',
+            '-jh',
+            help='The address the judge listens on; use 0.0.0.0 to let the proxies '
+            'reach it(default:0.0.0.0).',
+            default='0.0.0.0'
+        )
+        judge_arguments.add_argument(
+            '--port',
+            '-jp',
+            help='The port the judge listens on(default:8080).',
+            default=8080,
+            type=int
+        )
+        judge_arguments.add_argument(
+            '--judge-processes',
+            '-jP',
+            help='The number of processes serving the judge(default:1).',
+            default=1,
+            type=int
+        )
+        benchmark_arguments = parser.add_argument_group(
+            'Benchmark', 'Benchmark mode arguments'
+        )
+        benchmark_arguments.add_argument(
+            '--sizes',
+            '-bs',
+            help='The comma separated numbers of fake proxies to check and scrape'
+            '(default:100,1000).',
+            default='100,1000'
+        )
+        benchmark_arguments.add_argument(
+            '--levels',
+            '-bl',
+            help='The comma separated numbers of threads, or of checks in flight for '
+            'the async engine(default:50,200).',
+            default='50,200'
+        )
+        benchmark_arguments.add_argument(
+            '--latency',
+            '-bL',
+            help='The seconds every fake proxy waits before answering(default:0.05).',
+            default=0.05,
+            type=float
+        )
+        benchmark_arguments.add_argument(
+            '--jitter',
+            '-bj',
+            help='Up to this many seconds are added to the latency at '
+            'random(default:0.05).',
+            default=0.05,
+            type=float
+        )
+        benchmark_arguments.add_argument(
+            '--drop-rate',
+            '-bd',
+            help='The share of the requests the fake proxies drop(default:0).',
+            default=0.0,
+            type=float
+        )
+        benchmark_arguments.add_argument(
+            '--blackhole-rate',
+            '-bb',
+            help='The share of the fake proxies that never answer(default:0).',
+            default=0.0,
+            type=float
+        )
+        benchmark_arguments.add_argument(
+            '--dead-rate',
+            '-bD',
+            help='The share of the fake proxies that refuse connections(default:0).',
+            default=0.0,
+            type=float
+        )
+        benchmark_arguments.add_argument(
+            '--seed',
+            '-bS',
+            help='The seed of the behavior of the fake proxies(default:0).',
+            default=0,
+            type=int
+        )
+        benchmark_arguments.add_argument(
+            '--no-scrape',
+            '-bn',
+            help='Only benchmark the checker.',
+            action='store_true'
+        )
         args = parser.parse_args()
+        if args.url is None:
+            args.url = ['http://icanhazip.com']
 
         if args.verbose and args.quiet:
             parser.error('The verbose and quiet are both set.')
@@ -373,15 +1002,141 @@ def main():
 
         logger.setLevel(log21.ERROR if args.quiet else log21.INFO)
 
-        args.timeout = int(args.timeout)
         if args.timeout < 0.1:
             parser.error(f'The timeout({args.timeout}) is not valid.')
             return
 
+        if args.connect_timeout is not None and args.connect_timeout <= 0:
+            parser.error(f'The connect timeout({args.connect_timeout}) is not valid.')
+            return
+
+        if args.adaptive_timeout is not None and not 0 < args.adaptive_timeout <= 100:
+            parser.error(
+                f'The adaptive timeout percentile({args.adaptive_timeout}) is not valid.'
+            )
+            return
+
+        if args.budget is not None and args.budget <= 0:
+            parser.error(f'The budget({args.budget}) is not valid.')
+            return
+
         if args.threads < 1:
             parser.error(f'The number of threads({args.threads}) is not valid.')
             return
 
+        for name in ('pool_connections', 'pool_maxsize', 'proxy_pools'):
+            if getattr(args, name) < 1:
+                parser.error(
+                    f'The {name.replace("_", " ")}({getattr(args, name)}) is not valid.'
+                )
+                return
+
+        if args.want is not None and args.want < 1:
+            parser.error(f'The number of wanted proxies({args.want}) is not valid.')
+            return
+
+        if args.anonymity is not None:
+            args.anonymity = ProxyAnonymity.from_name(args.anonymity)
+        args.classify = args.classify or args.anonymity is not None or args.https_only
+
+        if args.alive_ttl < 0:
+            parser.error(f'The alive TTL({args.alive_ttl}) is not valid.')
+            return
+
+        if args.state is not None and args.cache is not None:
+            parser.error('The --state and --cache options cannot be used together.')
+            return
+
+        if args.dead_ttl < 0:
+            parser.error(f'The dead TTL({args.dead_ttl}) is not valid.')
+            return
+
+        if args.processes < 1:
+            parser.error(f'The number of processes({args.processes}) is not valid.')
+            return
+
+        if args.source_concurrency < 1:
+            parser.error(
+                f'The source concurrency({args.source_concurrency}) is not valid.'
+            )
+            return
+
+        if args.page_concurrency < 1:
+            parser.error(f'The page concurrency({args.page_concurrency}) is not valid.')
+            return
+
+        if args.source_timeout is not None and args.source_timeout <= 0:
+            parser.error(f'The source timeout({args.source_timeout}) is not valid.')
+            return
+
+        if args.min_refresh < 0:
+            parser.error(f'The minimum refresh({args.min_refresh}) is not valid.')
+            return
+
+        if args.min_yield is not None and args.min_yield < 0:
+            parser.error(f'The minimum yield({args.min_yield}) is not valid.')
+            return
+        if (args.min_yield is not None or args.source_report) and \
+                args.source_stats is None:
+            args.source_stats = '~/.cache/ProxyEater/source-stats.json'
+
+        if args.concurrency < 1:
+            parser.error(f'The concurrency({args.concurrency}) is not valid.')
+            return
+
+        if args.prefilter is not None and args.prefilter <= 0:
+            parser.error(f'The pre-filter timeout({args.prefilter}) is not valid.')
+            return
+
+        if args.probe_hosts is not None and args.probe_hosts <= 0:
+            parser.error(f'The host probe timeout({args.probe_hosts}) is not valid.')
+            return
+
+        if args.max_per_host is not None and args.max_per_host < 1:
+            parser.error(f'The maximum per host({args.max_per_host}) is not valid.')
+            return
+
+        if args.max_per_subnet is not None and args.max_per_subnet < 1:
+            parser.error(
+                f'The maximum per subnet({args.max_per_subnet}) is not valid.'
+            )
+            return
+
+        if args.mode.lower() == 'judge':
+            if not 0 < args.port < 65536:
+                parser.error(f'The port({args.port}) is not valid.')
+                return
+            if args.judge_processes < 1:
+                parser.error(
+                    f'The number of judge processes({args.judge_processes}) is not '
+                    'valid.'
+                )
+                return
+            judge(args)
+            return
+
+        if args.mode.lower() == 'benchmark':
+            try:
+                args.sizes = [int(size) for size in args.sizes.split(',')]
+                args.levels = [int(level) for level in args.levels.split(',')]
+            except ValueError:
+                parser.error(
+                    'The sizes and the levels must be comma separated numbers.'
+                )
+                return
+            for name in ('drop_rate', 'blackhole_rate', 'dead_rate'):
+                if not 0 <= getattr(args, name) <= 1:
+                    parser.error(
+                        f'The {name.replace("_", " ")}({getattr(args, name)}) is not '
+                        'valid.'
+                    )
+                    return
+            try:
+                benchmark(args)
+            except ValueError as ex:
+                parser.error(str(ex))
+            return
+
         # Output Path
         if args.output:
             args.output = pathlib.Path(args.output)
@@ -417,11 +1172,20 @@ def main():
         )
         args.proxy_types = proxy_types
 
+        metrics = enable_metrics() if args.metrics_file else None
         args.mode = args.mode.lower()
-        if args.mode == 'scrape':
-            scrape(args)
-        elif args.mode == 'check':
-            check(args)
+        try:
+            if args.mode == 'scrape':
+                scrape(args)
+            elif args.mode == 'check':
+                check(args)
+        finally:
+            if metrics is not None:
+                try:
+                    metrics.write(args.metrics_file)
+                    logger.info(f'Wrote the metrics to {args.metrics_file}.')
+                except OSError as ex:
+                    logger.error(f'{ex.__class__.__name__}: {ex}')
     except KeyboardInterrupt:
         try:
             terminal_size = shutil.get_terminal_size().columns
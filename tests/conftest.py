@@ -0,0 +1,121 @@
+# tests/conftest.py
+# CodeWriter21
+
+import time
+import socket
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+# The body the fake proxies send back, like a judge that echoes the caller's IP.
+BODY = b'127.0.0.1\n'
+
+
+class Gauge:
+    """Counts the requests in flight, so several fake proxies can share one
+    count."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def __exit__(self, *exc_info):
+        with self.lock:
+            self.in_flight -= 1
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        if not self.path.startswith('http://'):
+            # A proxy needs the absolute url of the target
+            self.send_error(400)
+            return
+        with server.lock:
+            server.requests += 1
+        with server.gauge:
+            time.sleep(server.delay)
+        self.send_response(server.status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def do_CONNECT(self):
+        if self.server.accept_connect:
+            self.send_response(200, 'Connection established')
+            self.end_headers()
+        else:
+            self.send_response(405)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeProxy(ThreadingHTTPServer):
+    """A local HTTP proxy that answers every GET itself and counts the
+    connections and the requests it gets."""
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0, status: int = 200,
+                 accept_connect: bool = True, gauge: Gauge = None):
+        super().__init__(('127.0.0.1', 0), _ProxyHandler)
+        self.delay = delay
+        self.status = status
+        self.accept_connect = accept_connect
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.gauge = gauge or Gauge()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def handle_error(self, request, client_address):
+        pass  # The checks hang up on the slow proxies on purpose
+
+
+@pytest.fixture
+def fake_proxy():
+    """Starts fake proxies for a test: `fake_proxy(delay=0.1)` returns a
+    running FakeProxy."""
+    servers = []
+
+    def start(**kwargs) -> FakeProxy:
+        server = FakeProxy(**kwargs)
+        threading.Thread(
+            target=server.serve_forever, args=(0.05, ), daemon=True
+        ).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def dead_port() -> int:
+    """Returns a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
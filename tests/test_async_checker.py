@@ -0,0 +1,97 @@
+# tests/test_async_checker.py
+# CodeWriter21
+
+import socket
+import asyncio
+
+import pytest
+
+from conftest import Gauge
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyStatus, AsyncProxyChecker
+from ProxyEater.AsyncChecker import ProxyProtocolError, fetch_via_proxy, _http_connect
+
+URL = 'http://example.com/'
+
+
+def test_fetch_via_proxy_sends_the_absolute_url(fake_proxy):
+    server = fake_proxy()
+    proxy = Proxy('127.0.0.1', server.port, ProxyType.HTTP)
+
+    response = asyncio.run(fetch_via_proxy(proxy, URL))
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'text/plain'
+    assert response.body == b'127.0.0.1\n'
+    assert 0 < response.connect_time <= response.ttfb
+
+
+def test_the_dead_proxies_are_removed(fake_proxy, dead_port):
+    server = fake_proxy()
+    alive = Proxy('127.0.0.1', server.port, ProxyType.HTTP)
+    dead = Proxy('127.0.0.1', dead_port, ProxyType.HTTP)
+    proxies = ProxyList([alive, dead])
+
+    asyncio.run(AsyncProxyChecker(timeout=2, url=URL).check(proxies))
+
+    assert list(proxies) == [alive]
+    assert alive.status == ProxyStatus.ALIVE
+    assert dead.status == ProxyStatus.DEAD
+
+
+def test_a_non_200_response_marks_the_proxy_dead(fake_proxy):
+    server = fake_proxy(status=403)
+    proxy = Proxy('127.0.0.1', server.port, ProxyType.HTTP)
+    proxies = ProxyList([proxy])
+
+    asyncio.run(AsyncProxyChecker(timeout=2, url=URL).check(proxies, remove_dead=False))
+
+    assert proxy in proxies
+    assert proxy.status == ProxyStatus.DEAD
+
+
+@pytest.mark.parametrize('concurrency', [1, 3])
+def test_the_checks_in_flight_are_capped(fake_proxy, concurrency):
+    gauge = Gauge()
+    servers = [fake_proxy(delay=0.05, gauge=gauge) for _ in range(8)]
+    proxies = ProxyList(
+        Proxy('127.0.0.1', server.port, ProxyType.HTTP) for server in servers
+    )
+    progress = []
+
+    asyncio.run(
+        AsyncProxyChecker(timeout=5, concurrency=concurrency, url=URL).check(
+            proxies,
+            on_progress_callback=lambda proxy_list, value: progress.append(value)
+        )
+    )
+
+    assert len(proxies) == 8
+    assert gauge.max_in_flight == concurrency
+    assert len(progress) == 9 and progress[-1] == 100
+
+
+def test_the_concurrency_must_be_positive():
+    with pytest.raises(ValueError):
+        AsyncProxyChecker(concurrency=0)
+
+
+def _connect_through(server) -> None:
+    async def run():
+        loop = asyncio.get_running_loop()
+        sock = socket.create_connection(('127.0.0.1', server.port))
+        sock.setblocking(False)
+        try:
+            await _http_connect(loop, sock, 'example.com', 443)
+        finally:
+            sock.close()
+
+    asyncio.run(run())
+
+
+def test_http_connect_opens_a_tunnel_on_the_socket(fake_proxy):
+    _connect_through(fake_proxy())
+
+
+def test_http_connect_reports_a_refused_tunnel(fake_proxy):
+    with pytest.raises(ProxyProtocolError, match=r'CONNECT\(405\)'):
+        _connect_through(fake_proxy(accept_connect=False))
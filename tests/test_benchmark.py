@@ -0,0 +1,77 @@
+# tests/test_benchmark.py
+# CodeWriter21
+
+import asyncio
+
+import pytest
+
+from ProxyEater import ProxyList, ProxyStatus, AsyncProxyChecker
+from ProxyEater.Checker import ProxyChecker
+from ProxyEater.Benchmark import CHECK_URL, FakeProxyFarm, run_benchmark
+
+
+@pytest.fixture(scope='module')
+def farm():
+    with FakeProxyFarm(40, dead_rate=0.25, blackhole_rate=0.1, seed=1) as farm_:
+        yield farm_
+
+
+def alive_ports(proxies) -> set:
+    return {proxy.port for proxy in proxies if proxy.status == ProxyStatus.ALIVE}
+
+
+def test_the_async_checker_tells_the_fakes_apart(farm):
+    proxies = farm.proxy_list()
+
+    asyncio.run(AsyncProxyChecker(timeout=1, url=CHECK_URL).check(
+        proxies, remove_dead=False
+    ))
+
+    statuses = [proxy.status for proxy in proxies]
+    assert len(proxies) == 40
+    assert 0 < statuses.count(ProxyStatus.ALIVE) < 40
+    assert statuses.count(ProxyStatus.DEAD) == 40 - statuses.count(ProxyStatus.ALIVE)
+    # Every kind of fake has alive proxies
+    assert {proxy.type for proxy in proxies if proxy.is_alive} == \
+        {proxy.type for proxy in proxies}
+
+
+def test_threads_and_async_agree_on_a_farm(farm):
+    kinds = ('http', 'connect')  # The threads engine needs PySocks for SOCKS
+    ports = {port for port, kind in farm.addresses if kind in kinds}
+    threaded = ProxyList(proxy for proxy in farm.proxy_list() if proxy.port in ports)
+    async_ = ProxyList(proxy for proxy in farm.proxy_list() if proxy.port in ports)
+
+    with ProxyChecker(threads_no=10, timeout=1, url=CHECK_URL) as checker:
+        checker.check(threaded, remove_dead=False)
+    asyncio.run(AsyncProxyChecker(timeout=1, url=CHECK_URL).check(
+        async_, remove_dead=False
+    ))
+
+    assert alive_ports(threaded) == alive_ports(async_)
+    assert alive_ports(threaded)
+
+
+def test_run_benchmark_measures_the_checks_and_the_scraping():
+    results = run_benchmark(
+        sizes=(20, ), concurrency_levels=(5, ), engine='async', latency=0, jitter=0
+    )
+
+    checks = [result for result in results if result.case == 'check:async']
+    scrapes = [result for result in results if result.case.startswith('scrape:')]
+    assert len(checks) == 1
+    assert checks[0].size == 20 and checks[0].concurrency == 5
+    assert checks[0].found == 20
+    assert checks[0].rate > 0 and checks[0].p50 is not None
+    assert {result.case for result in scrapes} == \
+        {'scrape:pandas', 'scrape:json', 'scrape:text'}
+    assert all(result.found == 20 for result in scrapes)
+
+
+def test_the_farm_validates_its_options():
+    with pytest.raises(ValueError, match='size'):
+        FakeProxyFarm(0)
+    with pytest.raises(ValueError, match='kinds'):
+        FakeProxyFarm(10, kinds=['ftp'])
+    with pytest.raises(ValueError, match='drop_rate'):
+        FakeProxyFarm(10, drop_rate=2)
@@ -0,0 +1,170 @@
+# tests/test_cache.py
+# CodeWriter21
+
+import json
+import time
+
+import pytest
+
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyStatus
+from ProxyEater.Cache import CheckCache, SourceCache, proxy_key
+
+URL = 'https://example.com/proxies'
+
+
+def make_proxy(port: int, status: ProxyStatus = ProxyStatus.UNKNOWN) -> Proxy:
+    proxy = Proxy('10.0.0.1', port, ProxyType.HTTP)
+    proxy.status = status
+    return proxy
+
+
+def test_apply_reuses_the_fresh_results(tmp_path):
+    cache = CheckCache(tmp_path / 'checks.json')
+    alive = make_proxy(1, ProxyStatus.ALIVE)
+    alive.latency = 0.25
+    cache.store([alive, make_proxy(2, ProxyStatus.DEAD)])
+
+    proxies = ProxyList([make_proxy(1), make_proxy(2), make_proxy(3)])
+    to_check = cache.apply(proxies)
+
+    assert {proxy.port for proxy in to_check} == {3}
+    assert cache.hits == 2
+    statuses = {proxy.port: proxy.status for proxy in proxies}
+    assert statuses == {
+        1: ProxyStatus.ALIVE, 2: ProxyStatus.DEAD, 3: ProxyStatus.UNKNOWN
+    }
+    assert next(proxy for proxy in proxies if proxy.port == 1).latency == 0.25
+
+
+def test_the_expired_results_are_checked_again(tmp_path):
+    cache = CheckCache(tmp_path / 'checks.json', alive_ttl=10, dead_ttl=100)
+    cache.store([make_proxy(1, ProxyStatus.ALIVE), make_proxy(2, ProxyStatus.DEAD)])
+    for entry in cache._entries.values():
+        entry['checked_at'] -= 50
+
+    to_check = cache.apply(ProxyList([make_proxy(1), make_proxy(2)]))
+
+    # Only the alive result expired; the dead one is still cooling down
+    assert {proxy.port for proxy in to_check} == {1}
+
+
+def test_a_proxy_listed_with_another_type_is_found(tmp_path):
+    cache = CheckCache(tmp_path / 'checks.json')
+    alive = Proxy('10.0.0.1', 1080, ProxyType.SOCKS5)
+    alive.status = ProxyStatus.ALIVE
+    cache.store([alive])
+
+    proxy = Proxy('10.0.0.1', 1080, ProxyType.HTTP)
+    assert not cache.apply(ProxyList([proxy]))
+    # The result is only valid for the type it was found with
+    assert proxy.type == ProxyType.SOCKS5
+    assert proxy.status == ProxyStatus.ALIVE
+
+
+def test_the_unknown_results_are_not_stored(tmp_path):
+    cache = CheckCache(tmp_path / 'checks.json')
+    cache.store([make_proxy(1)])
+    assert len(cache) == 0
+
+
+def test_merge_saves_and_removes_the_dead_proxies(tmp_path):
+    path = tmp_path / 'checks.json'
+    cache = CheckCache(path)
+    cache.store([make_proxy(1, ProxyStatus.DEAD)])
+    proxies = ProxyList([make_proxy(1), make_proxy(2)])
+    to_check = cache.apply(proxies)
+    for proxy in to_check:
+        proxy.status = ProxyStatus.ALIVE
+
+    cache.merge(proxies, to_check)
+
+    assert {proxy.port for proxy in proxies} == {2}
+    assert set(json.loads(path.read_text())) == {'10.0.0.1:1', '10.0.0.1:2'}
+
+
+def test_save_leaves_the_expired_results_out(tmp_path):
+    path = tmp_path / 'checks.json'
+    cache = CheckCache(path, alive_ttl=10)
+    cache.store([make_proxy(1, ProxyStatus.ALIVE), make_proxy(2, ProxyStatus.ALIVE)])
+    cache._entries[proxy_key(make_proxy(1))]['checked_at'] = time.time() - 60
+    cache.save()
+
+    assert len(CheckCache(path)) == 1
+
+
+def test_a_damaged_file_is_ignored(tmp_path):
+    path = tmp_path / 'checks.json'
+    path.write_text('{not json')
+    assert len(CheckCache(path)) == 0
+
+
+def test_negative_ttls_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        CheckCache(tmp_path / 'checks.json', alive_ttl=-1)
+
+
+def test_the_checks_skip_the_cached_proxies(tmp_path, fake_proxy, dead_port):
+    server = fake_proxy()
+    proxies = ProxyList([
+        Proxy('127.0.0.1', server.port, ProxyType.HTTP),
+        Proxy('127.0.0.1', dead_port, ProxyType.HTTP)
+    ])
+    cache = CheckCache(tmp_path / 'checks.json')
+    proxies.check_all(timeout=2, url='http://example.com/', cache=cache)
+    assert len(proxies) == 1 and server.requests == 1
+
+    again = ProxyList([
+        Proxy('127.0.0.1', server.port, ProxyType.HTTP),
+        Proxy('127.0.0.1', dead_port, ProxyType.HTTP)
+    ])
+    again.check_all(
+        timeout=2, url='http://example.com/', cache=CheckCache(tmp_path / 'checks.json')
+    )
+
+    assert server.requests == 1
+    assert [proxy.status for proxy in again] == [ProxyStatus.ALIVE]
+def test_a_recently_fetched_page_is_reused(tmp_path):
+    cache = SourceCache(tmp_path / 'sources.json')
+    assert cache.get_fresh(URL, 300) is None
+    cache.store(URL, {}, [make_proxy(1), Proxy('10.0.0.2', 1080, ProxyType.SOCKS5)])
+
+    proxies = cache.get_fresh(URL, 300)
+
+    assert {(proxy.ip, proxy.port, proxy.type) for proxy in proxies} == {
+        ('10.0.0.1', 1, ProxyType.HTTP), ('10.0.0.2', 1080, ProxyType.SOCKS5)
+    }
+    assert cache.hits == 1
+    cache._entries[URL]['fetched_at'] -= 300
+    assert cache.get_fresh(URL, 300) is None
+
+
+def test_an_older_page_is_requested_conditionally(tmp_path):
+    cache = SourceCache(tmp_path / 'sources.json')
+    assert cache.headers(URL) == {}
+    cache.store(URL, {'ETag': '"v1"', 'Last-Modified': 'Sat, 17 Oct 2026 10:00:00 GMT'},
+                [make_proxy(1)])
+    cache._entries[URL]['fetched_at'] -= 600
+
+    assert cache.headers(URL) == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Sat, 17 Oct 2026 10:00:00 GMT'
+    }
+    # The server answered 304 Not Modified
+    assert {proxy.port for proxy in cache.revalidate(URL)} == {1}
+    assert cache.revalidations == 1
+    assert cache.get_fresh(URL, 300) is not None
+    assert len(cache.revalidate('https://example.com/other')) == 0
+
+
+def test_the_pages_are_kept_until_they_are_too_old(tmp_path):
+    path = tmp_path / 'sources.json'
+    cache = SourceCache(path, max_age=3600)
+    cache.store(URL, {'ETag': '"v1"'}, [make_proxy(1)])
+    cache.store(URL + '?page=2', {}, [make_proxy(2)])
+    cache._entries[URL + '?page=2']['fetched_at'] -= 7200
+    cache.save()
+
+    loaded = SourceCache(path, max_age=3600)
+    assert len(loaded) == 1
+    assert loaded.headers(URL) == {'If-None-Match': '"v1"'}
+    with pytest.raises(ValueError):
+        SourceCache(path, max_age=-1)
@@ -0,0 +1,209 @@
+# tests/test_checker.py
+# CodeWriter21
+
+import asyncio
+import threading
+
+import pytest
+
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyStatus, AsyncProxyChecker
+from ProxyEater.Checker import ProxyChecker, ShardedProxyChecker
+
+URL = 'http://example.com/'
+
+
+def make_proxies(fake_proxy, dead_port, alive: int = 3) -> ProxyList:
+    proxies = ProxyList(
+        Proxy('127.0.0.1', fake_proxy().port, ProxyType.HTTP) for _ in range(alive)
+    )
+    proxies.add(Proxy('127.0.0.1', dead_port, ProxyType.HTTP))
+    return proxies
+
+
+def test_the_workers_are_reused_by_the_next_checks(fake_proxy, dead_port):
+    with ProxyChecker(threads_no=4, timeout=2, url=URL) as checker:
+        threads = list(checker._threads)
+        first = make_proxies(fake_proxy, dead_port)
+        checker.check(first)
+        second = ProxyList(Proxy('127.0.0.1', fake_proxy().port, ProxyType.HTTP)
+                           for _ in range(2))
+        checker.check(second)
+
+        assert checker._threads == threads
+        assert all(thread.is_alive() for thread in threads)
+    assert len(first) == 3
+    assert len(second) == 2
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_threads_and_async_agree(fake_proxy, dead_port):
+    proxies = make_proxies(fake_proxy, dead_port)
+    threaded = ProxyList(proxies.copy())
+    async_ = ProxyList(proxies.copy())
+
+    with ProxyChecker(threads_no=4, timeout=2, url=URL) as checker:
+        checker.check(threaded)
+    asyncio.run(AsyncProxyChecker(timeout=2, url=URL).check(async_))
+
+    assert set(threaded) == set(async_)
+    assert len(threaded) == 3
+
+
+class _RaisingChecker(ProxyChecker):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checked = []
+
+    def check_proxy(self, proxy: Proxy, *args, **kwargs) -> bool:
+        self.checked.append(proxy)
+        raise RuntimeError('The check is broken.')
+
+
+def test_a_raising_check_stops_the_batch():
+    proxies = ProxyList(
+        Proxy('10.0.0.1', port, ProxyType.HTTP) for port in range(1, 51)
+    )
+
+    with _RaisingChecker(threads_no=1) as checker:
+        with pytest.raises(RuntimeError, match='broken'):
+            checker.check(proxies)
+    # The worker skipped the queued proxies of the stopped batch
+    assert len(checker.checked) == 1
+    assert len(proxies) == 50
+    assert all(proxy.status == ProxyStatus.UNKNOWN for proxy in proxies)
+
+
+def test_the_number_of_threads_must_be_positive():
+    with pytest.raises(ValueError):
+        ProxyChecker(threads_no=0)
+
+
+class _SessionChecker(ProxyChecker):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sessions = []
+
+    def create_session(self):
+        session = super().create_session()
+        self.sessions.append(session)
+        return session
+
+
+def test_each_worker_reuses_one_session(fake_proxy):
+    servers = [fake_proxy() for _ in range(4)]
+    with _SessionChecker(threads_no=2, timeout=2, url=URL) as checker:
+        for server in servers:
+            checker.check(ProxyList([Proxy('127.0.0.1', server.port, ProxyType.HTTP)]))
+    assert len(checker.sessions) == 2
+
+
+def test_a_proxy_checked_again_reuses_its_connection(fake_proxy):
+    server = fake_proxy()
+    proxies = ProxyList([Proxy('127.0.0.1', server.port, ProxyType.HTTP)])
+    with ProxyChecker(threads_no=1, timeout=2, url=URL) as checker:
+        for _ in range(3):
+            checker.check(proxies)
+    assert len(proxies) == 1
+    assert server.requests == 3
+    assert server.connections == 1
+
+
+def test_the_pools_of_the_least_recent_proxies_are_closed(fake_proxy):
+    servers = [fake_proxy() for _ in range(5)]
+    with _SessionChecker(threads_no=1, timeout=2, url=URL, proxy_pools=2) as checker:
+        checker.check(ProxyList(
+            Proxy('127.0.0.1', server.port, ProxyType.HTTP) for server in servers
+        ))
+        adapter = checker.sessions[0].get_adapter(URL)
+        assert len(adapter.proxy_manager) == 2
+
+
+def test_the_pool_sizes_must_be_positive():
+    with pytest.raises(ValueError, match='proxy_pools'):
+        ProxyChecker(proxy_pools=0)
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_the_sharded_checker_agrees_with_one_process(fake_proxy, dead_port, engine):
+    proxies = make_proxies(fake_proxy, dead_port, alive=5)
+    sharded = ProxyList(proxies.copy())
+    progress = []
+
+    with ProxyChecker(threads_no=4, timeout=2, url=URL) as checker:
+        checker.check(proxies)
+    ShardedProxyChecker(processes=2, engine=engine, timeout=2, url=URL).check(
+        sharded, on_progress_callback=lambda proxy_list, value: progress.append(value)
+    )
+
+    assert set(sharded) == set(proxies)
+    assert len(sharded) == 5
+    # The states of the proxies are copied back from the processes
+    assert all(proxy.is_alive and proxy.latency > 0 for proxy in sharded)
+    assert progress[-1] == 100
+
+
+def test_the_sharded_checker_validates_its_options():
+    with pytest.raises(ValueError, match='engine'):
+        ShardedProxyChecker(engine='fibers')
+    with pytest.raises(ValueError):
+        ShardedProxyChecker(threads_no=0)
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_the_check_stops_after_enough_alive_proxies(fake_proxy, engine):
+    servers = [fake_proxy(delay=0.05) for _ in range(10)]
+    proxies = ProxyList(
+        Proxy('127.0.0.1', server.port, ProxyType.HTTP) for server in servers
+    )
+
+    if engine == 'threads':
+        with ProxyChecker(threads_no=1, timeout=2, url=URL,
+                          stop_after_alive=2) as checker:
+            checker.check(proxies)
+    else:
+        asyncio.run(AsyncProxyChecker(
+            timeout=2, url=URL, concurrency=1, stop_after_alive=2
+        ).check(proxies))
+
+    statuses = [proxy.status for proxy in proxies]
+    assert len(proxies) == 10
+    assert statuses.count(ProxyStatus.ALIVE) == 2
+    assert statuses.count(ProxyStatus.UNKNOWN) == 8
+    assert sum(server.requests for server in servers) <= 3
+
+
+def test_stop_after_alive_must_be_positive():
+    with pytest.raises(ValueError, match='stop_after_alive'):
+        ProxyChecker(stop_after_alive=0)
+    with pytest.raises(ValueError, match='stop_after_alive'):
+        AsyncProxyChecker(stop_after_alive=0)
+
+
+def test_check_stream_checks_the_proxies_as_they_come(fake_proxy, dead_port):
+    servers = [fake_proxy() for _ in range(3)]
+    found = threading.Event()
+
+    def scraped():
+        for server in servers:
+            yield Proxy('127.0.0.1', server.port, ProxyType.HTTP)
+        # The first proxies are checked while the next ones are still awaited
+        assert found.wait(2)
+        yield Proxy('127.0.0.1', dead_port, ProxyType.HTTP)
+
+    checked = []
+
+    def on_checked(proxy: Proxy) -> None:
+        checked.append(proxy)
+        found.set()
+
+    with ProxyChecker(threads_no=2, timeout=2, url=URL) as checker:
+        checker.check_stream(scraped(), on_checked)
+        with pytest.raises(TypeError):
+            checker.check_stream([], None)
+
+    assert sorted(proxy.port for proxy in checked) == \
+        sorted([dead_port] + [server.port for server in servers])
+    assert [proxy.status for proxy in checked].count(ProxyStatus.ALIVE) == 3
+    assert all(server.requests == 1 for server in servers)
@@ -0,0 +1,112 @@
+# tests/test_classifier.py
+# CodeWriter21
+
+import json
+import socket
+import asyncio
+import threading
+
+import pytest
+
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyAnonymity, AsyncProxyChecker
+from ProxyEater.Checker import ProxyChecker
+from ProxyEater.Classifier import classify_anonymity, probe_connect
+
+REAL_IP = '1.2.3.4'
+URL = 'http://example.com/'
+
+
+def judge_body(*header_lines: bytes) -> str:
+    """Returns the body of a judge that echoes the caller's IP and the request
+    headers, one `Name: value` line each."""
+    return '5.6.7.8\n' + ''.join(line.decode() + '\n' for line in header_lines)
+
+
+def test_a_header_value_mentioning_via_is_not_a_via_header():
+    body = json.dumps({'headers': {'User-Agent': 'x', 'Accept': 'text/html,via-app'}})
+    assert classify_anonymity(body, {}, REAL_IP) == ProxyAnonymity.ELITE
+
+
+@pytest.mark.parametrize('body', [
+    json.dumps({'headers': {'User-Agent': 'x', 'Via': '1.1 proxy'}}),
+    json.dumps({'User-Agent': 'x', 'X-Forwarded-For': '5.6.7.8'}),
+    judge_body(b'User-Agent: x', b'Via: 1.1 proxy'),
+    'HTTP_USER_AGENT = x\nHTTP_X_FORWARDED_FOR = 5.6.7.8\n',
+    '<pre>User-Agent: x</pre>\n<pre>Forwarded: for=5.6.7.8</pre>\n',
+])
+def test_the_revealing_headers_are_found(body: str):
+    assert classify_anonymity(body, {}, REAL_IP) == ProxyAnonymity.ANONYMOUS
+
+
+def test_the_judge_shows_an_elite_proxy():
+    body = judge_body(b'Host: judge', b'User-Agent: x', b'Accept: */*')
+    assert classify_anonymity(body.encode(), {}, REAL_IP) == ProxyAnonymity.ELITE
+
+
+def test_our_ip_in_the_body_makes_the_proxy_transparent():
+    body = judge_body(b'User-Agent: x', f'X-Forwarded-For: {REAL_IP}'.encode())
+    assert classify_anonymity(body, {}, REAL_IP) == ProxyAnonymity.TRANSPARENT
+
+
+def test_a_body_with_only_the_ip_cannot_show_an_elite_proxy():
+    assert classify_anonymity('5.6.7.8\n', {}, REAL_IP) == ProxyAnonymity.ANONYMOUS
+
+
+def test_a_via_response_header_makes_the_proxy_anonymous():
+    body = judge_body(b'User-Agent: x')
+    headers = {'Via': '1.1 proxy'}
+    assert classify_anonymity(body, headers, REAL_IP) == ProxyAnonymity.ANONYMOUS
+
+
+def test_the_anonymity_is_unknown_without_our_ip():
+    assert classify_anonymity(judge_body(b'User-Agent: x'), {}, None) == \
+        ProxyAnonymity.UNKNOWN
+
+
+def serve_once(answer: bytes) -> socket.socket:
+    """Listens on a free port, reads one request and sends the answer."""
+    server = socket.create_server(('127.0.0.1', 0))
+
+    def handle() -> None:
+        connection, _ = server.accept()
+        with connection:
+            connection.recv(1024)
+            if answer:
+                connection.sendall(answer)
+
+    threading.Thread(target=handle, daemon=True).start()
+    return server
+
+
+@pytest.mark.parametrize('answer, accepted', [
+    (b'HTTP/1.1 200 Connection established\r\n\r\n', True),
+    (b'HTTP/1.1 403 Forbidden\r\n\r\n', False),
+    (b'', False),
+])
+def test_the_connect_probe_reads_the_status(answer: bytes, accepted: bool):
+    with serve_once(answer) as server:
+        proxy = Proxy('127.0.0.1', server.getsockname()[1], ProxyType.HTTP)
+        assert probe_connect(proxy, 'example.com', timeout=5) is accepted
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_the_checks_classify_the_alive_proxies(fake_proxy, engine):
+    accepting = fake_proxy()
+    refusing = fake_proxy(accept_connect=False)
+    proxies = ProxyList([
+        Proxy('127.0.0.1', accepting.port, ProxyType.HTTP),
+        Proxy('127.0.0.1', refusing.port, ProxyType.HTTP)
+    ])
+    options = dict(timeout=2, url=URL, classify=True, real_ip=REAL_IP)
+
+    if engine == 'threads':
+        with ProxyChecker(threads_no=2, **options) as checker:
+            checker.check(proxies)
+    else:
+        asyncio.run(AsyncProxyChecker(**options).check(proxies))
+
+    # The fake proxies only echo the IP, which cannot show an elite proxy
+    assert all(proxy.anonymity == ProxyAnonymity.ANONYMOUS for proxy in proxies)
+    assert {proxy.port: proxy.supports_https for proxy in proxies} == {
+        accepting.port: True, refusing.port: False
+    }
@@ -0,0 +1,125 @@
+# tests/test_collector.py
+# CodeWriter21
+
+import asyncio
+
+import pytest
+
+from ProxyEater import ProxyList, ProxyStatus
+from ProxyEater.Benchmark import FakeProxyFarm, CHECK_URL
+from ProxyEater.Checker import ProxyChecker
+from ProxyEater.AsyncChecker import AsyncProxyChecker
+from ProxyEater.Collector import ProxyCollector
+from ProxyEater.Stats import SourceStats
+
+
+@pytest.fixture(scope='module')
+def farm():
+    with FakeProxyFarm(60, kinds=('http', 'connect'), dead_rate=0.3, per_page=15,
+                       seed=1) as farm:
+        yield farm
+
+
+@pytest.fixture(scope='module')
+def alive(farm) -> set:
+    proxies = farm.proxy_list()
+    proxies.check_all(timeout=2, url=CHECK_URL)
+    return {proxy.port for proxy in proxies}
+
+
+def listed_ports(farm) -> set:
+    return {port for port, _ in farm.addresses}
+
+
+def collect(farm, **kwargs) -> ProxyCollector:
+    batches = []
+    collector = ProxyCollector(
+        farm.sources(), on_proxies_callback=batches.append, **kwargs
+    )
+    collector.run()
+    collector.batches = batches
+    return collector
+
+
+def threads_check(checker: ProxyChecker):
+    return lambda proxies, name: checker.check(proxies)
+
+
+def test_every_proxy_is_passed_on_once(farm):
+    collector = collect(farm)
+
+    # The three sources list the same proxies
+    ports = [proxy.port for batch in collector.batches for proxy in batch]
+    assert sorted(ports) == sorted(listed_ports(farm))
+    assert {scraper.name for scraper in collector.scraped} == {
+        'fake-pandas', 'fake-json', 'fake-text'
+    }
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_only_the_alive_proxies_are_passed_on(farm, alive: set, pipeline: bool):
+    with ProxyChecker(threads_no=8, timeout=2, url=CHECK_URL) as checker:
+        collector = collect(
+            farm, checker=checker, check_callback=threads_check(checker),
+            pipeline=pipeline
+        )
+    assert {proxy.port for proxy in collector.proxies} == alive
+    assert all(proxy.status == ProxyStatus.ALIVE for proxy in collector.proxies)
+
+
+def test_the_async_checks_take_the_queued_proxies_in_rounds(farm, alive: set):
+    checker = AsyncProxyChecker(concurrency=8, timeout=2, url=CHECK_URL)
+    rounds = []
+
+    def check(proxies: ProxyList, name: str) -> None:
+        rounds.append(name)
+        asyncio.run(checker.check(proxies))
+
+    collector = collect(farm, checker=checker, check_callback=check, pipeline=True)
+    assert {proxy.port for proxy in collector.proxies} == alive
+    assert set(rounds) == {'Pipeline'}
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_the_scraping_stops_once_enough_proxies_are_alive(farm, pipeline: bool):
+    with ProxyChecker(threads_no=4, timeout=2, url=CHECK_URL) as checker:
+        collector = collect(
+            farm, checker=checker, check_callback=threads_check(checker), want=5,
+            pipeline=pipeline
+        )
+        checker.close(wait=False)
+    assert collector.has_enough()
+    assert 5 <= collector.proxies.count < len(farm.addresses)
+
+
+def test_a_broken_source_does_not_stop_the_others(farm):
+    errors = []
+    sources = farm.sources() + [{'id': 'broken', 'url': 'http://127.0.0.1:1/',
+                                 'parser': {'xml': {}}}]
+    collector = ProxyCollector(sources, on_error_callback=lambda config, error: (
+        errors.append((config['id'], type(error)))
+    ))
+    collector.run()
+    assert errors == [('broken', ValueError)]
+    assert collector.proxies.count == len(listed_ports(farm))
+
+
+def test_the_sources_are_ordered_and_recorded_by_their_yield(farm, tmp_path):
+    stats = SourceStats(tmp_path / 'source-stats.json')
+    stats.record('fake-text', fetched=10, unique=10, seconds=1, failed=False,
+                 checked=10, alive=9)
+    stats.record('fake-json', fetched=10, unique=10, seconds=1, failed=False,
+                 checked=10, alive=0)
+    with ProxyChecker(threads_no=8, timeout=2, url=CHECK_URL) as checker:
+        collector = ProxyCollector(
+            farm.sources(), checker=checker, check_callback=threads_check(checker),
+            stats=stats, min_yield=1
+        )
+        assert collector.skipped == ['fake-json']
+        assert [source['id'] for source in collector.sources] == [
+            'fake-pandas', 'fake-text'
+        ]
+        collector.run()
+    assert stats.get('fake-text')['runs'] == 2
+    assert stats.get('fake-pandas')['runs'] == 1
+    assert stats.get('fake-pandas')['fetched'] == len(listed_ports(farm))
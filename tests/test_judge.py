@@ -0,0 +1,76 @@
+# tests/test_judge.py
+# CodeWriter21
+
+import asyncio
+import http.client
+
+import pytest
+import requests
+
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyAnonymity, AsyncProxyChecker
+from ProxyEater.Judge import JudgeServer
+from ProxyEater.Checker import ProxyChecker
+from ProxyEater.Classifier import UrlRotation
+
+
+@pytest.fixture
+def judge():
+    with JudgeServer(port=0) as server:
+        yield server
+
+
+def test_the_judge_echoes_the_ip_and_the_headers(judge):
+    response = requests.get(judge.url, headers={'X-Test': 'yes'}, timeout=5)
+
+    lines = response.text.splitlines()
+    assert response.status_code == 200
+    assert lines[0] == '127.0.0.1'
+    assert 'X-Test: yes' in lines
+
+
+def test_the_judge_keeps_the_connections_alive(judge):
+    connection = http.client.HTTPConnection('127.0.0.1', judge.port, timeout=5)
+    try:
+        for _ in range(3):
+            connection.request('GET', '/')
+            assert connection.getresponse().read().startswith(b'127.0.0.1\n')
+        assert connection.sock is not None
+    finally:
+        connection.close()
+    assert judge.requests == 3
+
+
+def test_the_render_skips_the_request_line():
+    head = b'GET / HTTP/1.1\r\nHost: judge\r\nVia: 1.1 proxy'
+    assert JudgeServer.render('5.6.7.8', head) == \
+        b'5.6.7.8\nHost: judge\nVia: 1.1 proxy\n'
+
+
+def test_the_urls_are_handed_out_in_turn():
+    urls = UrlRotation(['http://a/', 'http://b/'])
+    assert [urls.next() for _ in range(3)] == ['http://a/', 'http://b/', 'http://a/']
+    assert urls.first == 'http://a/'
+    assert len(UrlRotation('http://a/')) == 1
+    with pytest.raises(ValueError):
+        UrlRotation([])
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_the_checks_classify_with_the_judge(judge, engine):
+    # The judge answers the requests sent to it as a proxy, like a proxy that
+    # adds no headers would
+    proxies = ProxyList([Proxy('127.0.0.1', judge.port, ProxyType.HTTP)])
+    options = dict(
+        timeout=2, url=[judge.url, judge.url + 'second'], classify=True,
+        real_ip='1.2.3.4'
+    )
+
+    if engine == 'threads':
+        with ProxyChecker(threads_no=1, **options) as checker:
+            checker.check(proxies)
+    else:
+        asyncio.run(AsyncProxyChecker(**options).check(proxies))
+
+    proxy, = proxies
+    assert proxy.is_alive
+    assert proxy.anonymity == ProxyAnonymity.ELITE
@@ -0,0 +1,92 @@
+# tests/test_limits.py
+# CodeWriter21
+
+import asyncio
+
+import pytest
+
+from conftest import Gauge
+from ProxyEater import Proxy, ProxyList, ProxyType, AsyncProxyChecker
+from ProxyEater.Checker import ProxyChecker
+from ProxyEater.Limits import HostLimiter, check_order, interleave, subnet_of
+
+URL = 'http://example.com/'
+
+
+def test_subnet_of():
+    assert subnet_of('10.0.0.7') == '10.0.0.0/24'
+    assert subnet_of('10.0.0.7', 16) == '10.0.0.0/16'
+    assert subnet_of('2001:db8::1') == '2001:db8::/64'
+    assert subnet_of('example.com') == 'example.com'
+
+
+def test_interleave_spreads_the_subnets_and_the_hosts():
+    proxies = [Proxy('10.0.0.1', port, ProxyType.HTTP) for port in (1, 2, 3)] + \
+        [Proxy('10.0.0.2', 1, ProxyType.HTTP), Proxy('10.1.0.1', 1, ProxyType.HTTP)]
+
+    ordered = interleave(proxies)
+
+    assert [(proxy.ip, proxy.port) for proxy in ordered] == [
+        ('10.0.0.1', 1), ('10.1.0.1', 1), ('10.0.0.2', 1),
+        ('10.0.0.1', 2), ('10.0.0.1', 3)
+    ]
+
+
+def test_check_order_puts_the_fastest_proxies_first():
+    proxies = [Proxy('10.0.0.1', port, ProxyType.HTTP) for port in (1, 2, 3)]
+    proxies[0].record_check(True, latency=0.9)
+    proxies[2].record_check(True, latency=0.1)
+
+    ordered = check_order(proxies, 'latency')
+
+    # The proxies without a latency go last
+    assert [proxy.port for proxy in ordered] == [3, 1, 2]
+    assert check_order(proxies, lambda proxy: -proxy.port) == proxies[::-1]
+
+
+def test_the_limiter_waits_for_a_free_slot():
+    limiter = HostLimiter(max_per_host=1)
+    first = Proxy('10.0.0.1', 1, ProxyType.HTTP)
+    second = Proxy('10.0.0.1', 2, ProxyType.HTTP)
+
+    assert limiter.acquire(first)
+    assert not limiter.acquire(second, timeout=0.05)
+    limiter.release(first)
+    assert limiter.acquire(second, timeout=0.05)
+
+
+def test_the_limits_must_be_positive():
+    with pytest.raises(ValueError, match='max_per_subnet'):
+        HostLimiter(max_per_subnet=0)
+
+
+def make_proxies(fake_proxy, gauge: Gauge) -> ProxyList:
+    # All the fake proxies listen on 127.0.0.1, one host
+    return ProxyList(
+        Proxy('127.0.0.1', fake_proxy(delay=0.05, gauge=gauge).port, ProxyType.HTTP)
+        for _ in range(6)
+    )
+
+
+def test_the_threads_cap_the_checks_per_host(fake_proxy):
+    gauge = Gauge()
+    proxies = make_proxies(fake_proxy, gauge)
+
+    with ProxyChecker(threads_no=6, timeout=5, url=URL, max_per_host=2) as checker:
+        checker.check(proxies)
+
+    assert len(proxies) == 6
+    assert gauge.max_in_flight == 2
+
+
+def test_the_async_checks_cap_the_checks_per_host(fake_proxy):
+    gauge = Gauge()
+    proxies = make_proxies(fake_proxy, gauge)
+
+    asyncio.run(
+        AsyncProxyChecker(timeout=5, url=URL, concurrency=6, max_per_subnet=2)
+        .check(proxies)
+    )
+
+    assert len(proxies) == 6
+    assert gauge.max_in_flight == 2
@@ -0,0 +1,111 @@
+# tests/test_metrics.py
+# CodeWriter21
+
+import json
+import asyncio
+
+import pytest
+
+from ProxyEater import (Proxy, ProxyList, ProxyType, Metrics, AsyncProxyChecker,
+                        enable_metrics, disable_metrics)
+from ProxyEater.Checker import ProxyChecker, ShardedProxyChecker
+from ProxyEater.Metrics import Histogram
+
+URL = 'http://example.com/'
+
+
+@pytest.fixture
+def metrics():
+    yield enable_metrics()
+    disable_metrics()
+
+
+def histogram_counts(metrics: Metrics, name: str) -> dict:
+    return {tuple(sorted(item['labels'].items())): item['count']
+            for item in metrics.to_dict()['histograms'] if item['name'] == name}
+
+
+def test_the_histogram_estimates_the_quantiles():
+    histogram = Histogram((0.1, 0.2, 0.4))
+    for value in (0.05, 0.15, 0.15, 0.3, 1):
+        histogram.observe(value)
+
+    assert histogram.count == 5
+    assert histogram.cumulative()[-1] == (float('inf'), 5)
+    assert 0.1 < histogram.quantile(0.5) <= 0.2
+    assert histogram.quantile(1) == 0.4  # Above the last bound
+    assert Histogram().quantile(0.5) is None
+
+
+def test_the_metrics_merge_and_export():
+    first, second = Metrics((0.1, 1)), Metrics((0.1, 1))
+    first.observe('check_seconds', 0.05, result='alive')
+    second.observe('check_seconds', 0.5, result='alive')
+    second.increment('proxies_total', 3)
+
+    first.merge(second.to_dict())
+
+    data = json.loads(first.to_json())
+    histogram, = data['histograms']
+    assert histogram['count'] == 2
+    assert histogram['buckets'] == [['0.1', 1], ['1.0', 2], ['+Inf', 2]]
+    text = first.to_prometheus()
+    assert '# TYPE proxyeater_check_seconds histogram' in text
+    assert 'proxyeater_check_seconds_bucket{result="alive",le="0.1"} 1' in text
+    assert 'proxyeater_proxies_total 3' in text
+    with pytest.raises(ValueError, match='buckets'):
+        first.merge({'histograms': [
+            dict(histogram, buckets=[['1.0', 2], ['+Inf', 2]])
+        ]})
+
+
+def test_the_metrics_are_written_in_the_format_of_the_suffix(tmp_path):
+    metrics = Metrics()
+    metrics.observe('check_seconds', 0.5, result='dead')
+
+    metrics.write(tmp_path / 'metrics.json')
+    metrics.write(tmp_path / 'metrics.prom')
+
+    assert json.loads((tmp_path / 'metrics.json').read_text())['histograms']
+    assert (tmp_path / 'metrics.prom').read_text().startswith('# HELP')
+    with pytest.raises(ValueError):
+        metrics.write(tmp_path / 'metrics', 'xml')
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_the_checks_record_their_phases(metrics, fake_proxy, dead_port, engine):
+    proxies = ProxyList([Proxy('127.0.0.1', fake_proxy().port, ProxyType.HTTP),
+                         Proxy('127.0.0.1', dead_port, ProxyType.HTTP)])
+
+    if engine == 'threads':
+        with ProxyChecker(threads_no=2, timeout=2, url=URL) as checker:
+            checker.check(proxies)
+    else:
+        asyncio.run(AsyncProxyChecker(timeout=2, url=URL).check(proxies))
+
+    phases = histogram_counts(metrics, 'check_phase_seconds')
+    assert phases[(('phase', 'connect'), )] == 1
+    assert phases[(('phase', 'ttfb'), )] == 1
+    results = histogram_counts(metrics, 'check_seconds')
+    assert results[(('result', 'alive'), )] == 1
+    assert results[(('result', 'error'), )] == 1
+    assert histogram_counts(metrics, 'check_run_seconds') == {(('engine', engine), ): 1}
+
+
+def test_the_shards_send_their_metrics_back(metrics, fake_proxy):
+    proxies = ProxyList(Proxy('127.0.0.1', fake_proxy().port, ProxyType.HTTP)
+                        for _ in range(4))
+
+    ShardedProxyChecker(processes=2, timeout=2, url=URL).check(proxies)
+
+    assert histogram_counts(metrics, 'check_seconds') == {(('result', 'alive'), ): 4}
+
+
+def test_nothing_is_recorded_while_the_metrics_are_disabled(fake_proxy):
+    proxies = ProxyList([Proxy('127.0.0.1', fake_proxy().port, ProxyType.HTTP)])
+    metrics = enable_metrics()
+    disable_metrics()
+
+    asyncio.run(AsyncProxyChecker(timeout=2, url=URL).check(proxies))
+
+    assert metrics.to_dict() == {'counters': [], 'histograms': []}
@@ -0,0 +1,53 @@
+# tests/test_prefilter.py
+# CodeWriter21
+
+import asyncio
+
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyStatus, AsyncProxyChecker
+from ProxyEater.Checker import ProxyChecker
+from ProxyEater.Prefilter import tcp_prefilter
+
+URL = 'http://example.com/'
+
+
+def make_proxies(fake_proxy, dead_port):
+    listening = Proxy('127.0.0.1', fake_proxy().port, ProxyType.HTTP)
+    closed = Proxy('127.0.0.1', dead_port, ProxyType.HTTP)
+    return listening, closed, ProxyList([listening, closed])
+
+
+def test_the_closed_ports_are_removed(fake_proxy, dead_port):
+    listening, closed, proxies = make_proxies(fake_proxy, dead_port)
+
+    report = tcp_prefilter(proxies, timeout=1)
+
+    assert list(proxies) == [listening]
+    assert set(report.unreachable) == {closed}
+    assert report.checked == 2 and report.removed == 1
+    assert closed.status == ProxyStatus.DEAD
+    assert listening.status == ProxyStatus.UNKNOWN
+
+
+def test_the_closed_ports_are_kept_when_asked(fake_proxy, dead_port):
+    _, closed, proxies = make_proxies(fake_proxy, dead_port)
+
+    tcp_prefilter(proxies, timeout=1, remove_dead=False)
+
+    assert closed in proxies
+    assert closed.status == ProxyStatus.DEAD
+
+
+def test_both_engines_skip_the_full_check_of_unreachable_proxies(
+    fake_proxy, dead_port
+):
+    listening, closed, proxies = make_proxies(fake_proxy, dead_port)
+    async_proxies = ProxyList(proxies.copy())
+
+    with ProxyChecker(timeout=2, url=URL, prefilter_timeout=1) as checker:
+        checker.check(proxies)
+    async_checker = AsyncProxyChecker(timeout=2, url=URL, prefilter_timeout=1)
+    asyncio.run(async_checker.check(async_proxies))
+
+    assert list(proxies) == list(async_proxies) == [listening]
+    assert checker.prefilter_report.removed == 1
+    assert async_checker.prefilter_report.removed == 1
@@ -0,0 +1,109 @@
+# tests/test_proxy.py
+# CodeWriter21
+
+import json
+import asyncio
+
+from ProxyEater import Proxy, ProxyList, ProxyType, AsyncProxyChecker
+from ProxyEater.Checker import ProxyChecker
+
+URL = 'http://example.com/'
+
+
+def make_proxy(port: int, latency: float = None) -> Proxy:
+    proxy = Proxy('10.0.0.1', port, ProxyType.HTTP)
+    if latency is not None:
+        proxy.record_check(True, latency=latency)
+    return proxy
+
+
+def test_only_the_successful_checks_update_the_timings():
+    proxy = make_proxy(1)
+    proxy.record_check(True, connect_time=0.1, ttfb=0.2, latency=0.3)
+    proxy.record_check(False)
+
+    assert proxy.metrics['connect_time_ms'] == 100
+    assert proxy.metrics['ttfb_ms'] == 200
+    assert proxy.metrics['latency_ms'] == 300
+    assert proxy.last_success <= proxy.last_failure
+    assert proxy.success_ratio == 0.5
+
+
+def test_the_success_ratio_covers_the_recent_checks():
+    proxy = make_proxy(1)
+    assert proxy.success_ratio is None
+    for _ in range(Proxy.HISTORY_SIZE):
+        proxy.record_check(False)
+    proxy.record_check(True)
+
+    assert proxy.success_ratio == 1 / Proxy.HISTORY_SIZE
+
+
+def test_the_list_is_ordered_by_a_metric():
+    proxies = ProxyList(
+        [make_proxy(1, 0.3), make_proxy(2, 0.1), make_proxy(3), make_proxy(4, 0.2)]
+    )
+
+    assert [proxy.port for proxy in proxies.sort_by('latency')] == [2, 4, 1, 3]
+    assert [proxy.port for proxy in proxies.top(2)] == [2, 4]
+
+
+def test_the_metrics_are_in_the_text_format():
+    proxies = ProxyList([make_proxy(1, 0.25)])
+
+    assert proxies.to_text(format_='{ip}:{port} {latency_ms}') == '10.0.0.1:1 250'
+
+
+def test_both_engines_record_the_timings(fake_proxy):
+    server = fake_proxy(delay=0.05)
+    threaded = Proxy('127.0.0.1', server.port, ProxyType.HTTP)
+    async_ = Proxy('127.0.0.1', server.port, ProxyType.HTTP)
+
+    with ProxyChecker(threads_no=1, timeout=2, url=URL) as checker:
+        checker.check(ProxyList([threaded]))
+    asyncio.run(AsyncProxyChecker(timeout=2, url=URL).check(ProxyList([async_])))
+
+    for proxy in (threaded, async_):
+        assert proxy.success_ratio == 1
+        assert 0 < proxy.connect_time < proxy.latency
+        assert 0.05 <= proxy.ttfb <= proxy.latency
+
+
+def test_a_reused_connection_keeps_the_last_connect_time(fake_proxy):
+    server = fake_proxy()
+    proxy = Proxy('127.0.0.1', server.port, ProxyType.HTTP)
+
+    with ProxyChecker(threads_no=1, timeout=2, url=URL) as checker:
+        checker.check(ProxyList([proxy]))
+        connect_time = proxy.connect_time
+        checker.check(ProxyList([proxy]))
+
+    assert server.connections == 1
+    assert proxy.connect_time == connect_time
+    assert proxy.success_ratio == 1
+
+
+def test_the_output_files_are_appended_to(tmp_path):
+    first = ProxyList([make_proxy(1), make_proxy(2)])
+    second = ProxyList([make_proxy(3)])
+
+    for indent in (4, None):
+        path = tmp_path / f'proxies-{indent}.json'
+        ProxyList().to_json_file(path, indent=indent, append=True)
+        first.to_json_file(path, indent=indent, include_geolocation=False, append=True)
+        ProxyList().to_json_file(path, indent=indent, append=True)
+        second.to_json_file(path, indent=indent, include_geolocation=False, append=True)
+        assert sorted(item['port'] for item in json.loads(path.read_text())) == \
+            [1, 2, 3]
+
+    path = tmp_path / 'proxies.txt'
+    first.to_text_file(path, format_='{ip}:{port}')
+    second.to_text_file(path, format_='{ip}:{port}', append=True)
+    assert sorted(path.read_text().split('\n')) == \
+        ['10.0.0.1:1', '10.0.0.1:2', '10.0.0.1:3']
+
+    path = tmp_path / 'proxies.csv'
+    first.to_csv_file(path, include_geolocation=False, append=True)
+    second.to_csv_file(path, include_geolocation=False, append=True)
+    rows = path.read_text().splitlines()
+    assert rows[0].startswith('ip,port') and len(rows) == 4
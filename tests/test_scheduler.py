@@ -0,0 +1,189 @@
+# tests/test_scheduler.py
+# CodeWriter21
+
+import time
+import threading
+
+import pytest
+
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyStatus
+from ProxyEater.Scheduler import RevalidationScheduler
+
+
+class FakeChecker:
+    """Checks the proxies by looking their next status up instead of sending
+    requests."""
+
+    def __init__(self, results: dict) -> None:
+        self.results = results  # The port of each proxy and its next status
+        self.checked = []
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def check(self, proxies: ProxyList, remove_dead: bool = True) -> None:
+        for proxy in proxies:
+            proxy.status = self.results.get(proxy.port, ProxyStatus.DEAD)
+            proxy.record_check(proxy.status == ProxyStatus.ALIVE)
+            with self.lock:
+                self.checked.append(proxy.port)
+
+
+def make_proxy(port: int) -> Proxy:
+    return Proxy('10.0.0.1', port, ProxyType.HTTP)
+
+
+def make_scheduler(
+    proxies: ProxyList, results: dict, **kwargs
+) -> RevalidationScheduler:
+    return RevalidationScheduler(
+        proxies, checker=FakeChecker(results), min_interval=60, max_interval=1800,
+        **kwargs
+    )
+
+
+def test_the_interval_follows_the_success_ratio():
+    scheduler = make_scheduler(ProxyList(), {})
+    proxy = make_proxy(1)
+    assert scheduler.interval(proxy) == 60  # Never checked
+
+    for alive in (True, True, True, False):
+        proxy.record_check(alive)
+    assert scheduler.interval(proxy) == pytest.approx(60 + 1740 * 0.75)
+
+    proxy.status = ProxyStatus.DEAD
+    assert scheduler.interval(proxy) == 1800
+
+
+def test_new_proxies_are_due_at_once_and_checked_ones_later():
+    checked = make_proxy(2)
+    checked.record_check(True)
+    scheduler = make_scheduler(ProxyList([make_proxy(1), checked]), {})
+
+    assert len(scheduler) == 2
+    assert scheduler.due == 1
+    assert scheduler.next_due <= time.time()
+
+    scheduler.add([make_proxy(1)])  # Already scheduled
+    assert len(scheduler) == 2
+
+
+def test_the_checks_update_the_list_and_call_the_callbacks():
+    dead, recovered = [], []
+    alive_proxy, dying_proxy, dead_proxy = make_proxy(1), make_proxy(2), make_proxy(3)
+    dead_proxy.status = ProxyStatus.DEAD
+    proxies = ProxyList([alive_proxy, dying_proxy])
+    scheduler = make_scheduler(
+        proxies, {1: ProxyStatus.ALIVE, 2: ProxyStatus.DEAD, 3: ProxyStatus.ALIVE},
+        on_dead_callback=dead.append, on_recovered_callback=recovered.append
+    )
+    scheduler.add([dead_proxy])
+    assert dead_proxy not in proxies  # The dead ones wait outside the list
+
+    alive_proxy.record_check(False)  # Half of its checks will have failed
+    before = time.time()
+    scheduler._check(ProxyList([alive_proxy, dying_proxy, dead_proxy]))
+
+    assert set(proxies) == {alive_proxy, dead_proxy}
+    assert dead == [dying_proxy]
+    assert recovered == [dead_proxy]
+    assert scheduler.checks == 3
+    # Every proxy is scheduled again after the interval it earned
+    assert len(scheduler) == 6
+    dues = {}
+    for due, _, proxy in scheduler._heap:
+        dues[proxy.port] = max(dues.get(proxy.port, 0), due - before)
+    assert dues[1] == pytest.approx(60 + 1740 * 0.5, abs=1)
+    assert dues[2] == pytest.approx(1800, abs=1)
+    assert dues[3] == pytest.approx(1800, abs=1)
+
+
+def test_the_checks_are_started_at_the_rate():
+    proxies = ProxyList(make_proxy(port) for port in range(1, 41))
+    scheduler = make_scheduler(proxies, {}, rate=20)
+    with scheduler:
+        time.sleep(0.5)
+    checked = len(scheduler.checker.checked)
+    # All 40 proxies are due, but only about 10 checks fit in half a second
+    assert 5 <= checked <= 12
+
+
+class FailingChecker(FakeChecker):
+    """Fails every check, like a checker whose judge is down."""
+
+    def check(self, proxies: ProxyList, remove_dead: bool = True) -> None:
+        for proxy in proxies:
+            proxy.status = ProxyStatus.DEAD
+        raise ConnectionError('The judge is down.')
+
+
+def test_a_failed_batch_is_reported_and_scheduled_again():
+    errors = []
+    proxies = ProxyList([make_proxy(1), make_proxy(2)])
+    scheduler = RevalidationScheduler(
+        proxies, checker=FailingChecker({}), min_interval=60, max_interval=1800,
+        on_error_callback=lambda batch, error: errors.append((batch.count, error))
+    )
+    with scheduler:
+        deadline = time.time() + 5
+        while sum(count for count, _ in errors) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert all(isinstance(error, ConnectionError) for _, error in errors)
+    assert scheduler.errors == len(errors)
+    assert scheduler.checks == 0
+    # The proxies keep their status and are due again after min_interval
+    assert all(proxy.status == ProxyStatus.UNKNOWN for proxy in proxies)
+    assert set(proxies) == {make_proxy(1), make_proxy(2)}
+    assert scheduler.due == 0
+    assert scheduler.next_due == pytest.approx(time.time() + 60, abs=5)
+
+
+class SlowChecker(FakeChecker):
+    """Takes a while for every batch and counts the batches checked at once."""
+
+    def __init__(self, results: dict) -> None:
+        super().__init__(results)
+        self.running = 0
+        self.most_running = 0
+
+    def check(self, proxies: ProxyList, remove_dead: bool = True) -> None:
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.1)
+        super().check(proxies, remove_dead)
+        with self.lock:
+            self.running -= 1
+
+
+def test_only_a_few_batches_are_checked_at_once():
+    checker = SlowChecker({})
+    proxies = ProxyList(make_proxy(port) for port in range(1, 101))
+    scheduler = RevalidationScheduler(proxies, rate=200, checker=checker,
+                                      max_batches=2)
+    with scheduler:
+        time.sleep(0.5)
+    assert checker.most_running == 2
+    # stop() waited for the running batches
+    assert checker.running == 0
+    assert scheduler.checks == len(checker.checked)
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        make_scheduler(ProxyList(), {}, rate=0)
+    with pytest.raises(ValueError):
+        RevalidationScheduler(
+            ProxyList(), checker=FakeChecker({}), min_interval=100, max_interval=10
+        )
+    with pytest.raises(ValueError):
+        make_scheduler(ProxyList(), {}, max_batches=0)
+    with pytest.raises(TypeError):
+        make_scheduler(ProxyList(), {}, on_dead_callback='not callable')
+    with pytest.raises(TypeError):
+        make_scheduler(ProxyList(), {}, on_error_callback='not callable')
@@ -0,0 +1,354 @@
+# tests/test_scrape.py
+# CodeWriter21
+
+import io
+import sys
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from conftest import Gauge
+from ProxyEater import ProxyType
+from ProxyEater.Cache import SourceCache
+from ProxyEater.Scraper import Scraper
+from ProxyEater.__main__ import main
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        with self.server.gauge:
+            time.sleep(self.server.delay)
+        if self.path in self.server.lists:
+            body = self.server.lists[self.path].encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        # /<n> lists three proxies of the subnet 10.0.<n>.0/24 as text and
+        # /json/<n> as json; the pages after the last one are empty
+        number = int(self.path.rsplit('/', 1)[1])
+        ips = [f'10.0.{number}.{index}' for index in range(1, 4)]
+        if self.server.last_page is not None and number > self.server.last_page:
+            ips = []
+        if self.path.startswith('/json/'):
+            body = json.dumps({'data': [{'ip': ip, 'port': 8080} for ip in ips]})
+        else:
+            body = ''.join(f'{ip}:8080\n' for ip in ips)
+        with self.server.gauge.lock:
+            self.server.requests.append(self.path)
+        etag = f'"{number}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def pages():
+    """Serves text proxy lists that take `server.delay` seconds each."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+    server.daemon_threads = True
+    server.delay = 0.5
+    server.last_page = None
+    server.gauge = Gauge()
+    server.requests = []
+    server.lists = {}  # The bodies of the other paths
+    threading.Thread(target=server.serve_forever, args=(0.05, ), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def text_source(name: str, url: str) -> dict:
+    return {'id': name, 'url': url, 'method': 'GET',
+            'parser': {'text': {'type': {'default': 'HTTP'}}}}
+
+
+def run_scrape(monkeypatch, tmp_path, sources, *options: str,
+               check: bool = False) -> list:
+    source = tmp_path / 'sources.json'
+    source.write_text(json.dumps(sources))
+    output = tmp_path / 'proxies.txt'
+    if not check:
+        options += ('--no-check', )
+    monkeypatch.setattr(sys, 'argv', [
+        'ProxyEater', 'scrape', '--source', str(source), '--output', str(output),
+        '--useragent', 'ProxyEater', *options
+    ])
+    main()
+    return output.read_text().split() if output.exists() else []
+
+
+def test_the_sources_are_scraped_at_once(monkeypatch, tmp_path, pages):
+    base = f'http://127.0.0.1:{pages.server_address[1]}'
+    sources = [text_source(f'source-{number}', f'{base}/{number}')
+               for number in range(4)]
+
+    start_time = time.perf_counter()
+    proxies = run_scrape(monkeypatch, tmp_path, sources, '--source-concurrency', '4')
+
+    # One source at a time would take 2 seconds
+    assert time.perf_counter() - start_time < 1.5
+    assert len(proxies) == 12
+
+
+def test_a_broken_source_does_not_stop_the_others(monkeypatch, tmp_path, pages,
+                                                  dead_port):
+    base = f'http://127.0.0.1:{pages.server_address[1]}'
+    pages.delay = 0
+    sources = [text_source('broken', f'http://127.0.0.1:{dead_port}/0'),
+               text_source('working', f'{base}/1')]
+
+    proxies = run_scrape(monkeypatch, tmp_path, sources)
+
+    assert sorted(proxies) == [f'http://10.0.1.{index}:8080' for index in range(1, 4)]
+
+
+def test_the_source_timeout_cuts_a_slow_source_short(pages):
+    pages.delay = 2
+    errors = []
+    scraper = Scraper(
+        f'http://127.0.0.1:{pages.server_address[1]}/0',
+        {'text': {'type': {'default': 'HTTP'}}}, method='GET', useragent='ProxyEater',
+        timeout=0.3
+    )
+
+    start_time = time.perf_counter()
+    scraper.get_proxies(
+        on_failure_callback=lambda scraper_, error: errors.append(error)
+    )
+
+    assert time.perf_counter() - start_time < 1.5
+    assert not scraper.is_succeed
+    assert len(errors) == 1
+
+
+def paged_scraper(pages, **pages_config) -> Scraper:
+    return Scraper(
+        f'http://127.0.0.1:{pages.server_address[1]}/json/{{page}}',
+        {'json': {'data': 'data', 'ip': 'ip', 'port': 'port',
+                  'type': {'default': 'HTTP'}, 'pages': pages_config}},
+        method='GET', useragent='ProxyEater', page_concurrency=4
+    )
+
+
+def test_the_pages_are_fetched_ahead_until_an_empty_one(pages):
+    pages.delay = 0.2
+    pages.last_page = 8
+    scraper = paged_scraper(pages, start=1, end='no-proxy')
+
+    start_time = time.perf_counter()
+    proxies = scraper.get_proxies()
+
+    # One page at a time would take 1.8 seconds
+    assert time.perf_counter() - start_time < 1.2
+    assert scraper.is_succeed
+    assert proxies.count == 24
+    assert pages.gauge.max_in_flight == 4
+
+
+def test_a_numbered_range_is_fetched_at_once(pages):
+    pages.delay = 0.2
+    scraper = paged_scraper(pages, start=2, end=7, step=2, concurrency=2)
+
+    proxies = scraper.get_proxies()
+
+    assert sorted({proxy.ip.rsplit('.', 1)[0] for proxy in proxies}) == \
+        ['10.0.2', '10.0.4', '10.0.6']
+    assert pages.gauge.max_in_flight == 2
+
+
+def test_an_empty_text_page_ends_the_pages(pages):
+    pages.delay = 0
+    pages.last_page = 3
+    scraper = Scraper(
+        f'http://127.0.0.1:{pages.server_address[1]}/{{page}}',
+        {'text': {'type': {'default': 'HTTP'},
+                  'pages': {'start': 1, 'end': 'no-proxy'}}},
+        method='GET', useragent='ProxyEater'
+    )
+
+    proxies = scraper.get_proxies()
+
+    assert scraper.is_succeed
+    assert proxies.count == 9
+
+
+@pytest.mark.parametrize('engine, pipeline', [
+    ('threads', False), ('threads', True), ('async', True)
+])
+def test_each_proxy_is_checked_once(monkeypatch, tmp_path, pages, fake_proxy,
+                                    dead_port, engine, pipeline):
+    pages.delay = 0
+    servers = [fake_proxy() for _ in range(3)]
+    listed = [f'127.0.0.1:{server.port}' for server in servers]
+    pages.lists['/a'] = '\n'.join(listed[:2] + [f'127.0.0.1:{dead_port}'])
+    pages.lists['/b'] = '\n'.join(listed[1:])
+    url = f'http://127.0.0.1:{pages.server_address[1]}'
+    sources = [text_source('a', url + '/a'), text_source('b', url + '/b')]
+    options = ['--engine', engine, '--url', 'http://example.com/', '--timeout', '2',
+               '--format', '{ip}:{port}']
+    if pipeline:
+        options.append('--pipeline')
+
+    written = run_scrape(monkeypatch, tmp_path, sources, *options, check=True)
+
+    assert sorted(written) == sorted(listed)
+    assert [server.requests for server in servers] == [1, 1, 1]
+
+
+def test_the_state_spares_the_known_proxies(monkeypatch, tmp_path, pages,
+                                            fake_proxy):
+    pages.delay = 0
+    servers = [fake_proxy() for _ in range(3)]
+    listed = [f'127.0.0.1:{server.port}' for server in servers]
+    pages.lists['/a'] = '\n'.join(listed[:2])
+    url = f'http://127.0.0.1:{pages.server_address[1]}'
+    options = ['--url', 'http://example.com/', '--timeout', '2',
+               '--format', '{ip}:{port}', '--state', str(tmp_path / 'state.json')]
+
+    first = run_scrape(monkeypatch, tmp_path, [text_source('a', url + '/a')],
+                       *options, check=True)
+    pages.lists['/b'] = '\n'.join(listed[1:])
+    second = run_scrape(monkeypatch, tmp_path, [text_source('b', url + '/b')],
+                        *options, check=True)
+
+    assert sorted(first) == sorted(listed[:2])
+    # The known alive proxies are written again without being checked
+    assert sorted(second) == sorted(listed)
+    assert [server.requests for server in servers] == [1, 1, 1]
+
+    pages.requests.clear()
+    third = run_scrape(monkeypatch, tmp_path, [text_source('b', url + '/b')],
+                       *options, '--want', '2', check=True)
+    # The state has the wanted proxies, so the sources are not scraped
+    assert len(third) == 3
+    assert pages.requests == []
+
+
+def cached_scraper(pages, cache: SourceCache, min_refresh: float = 0) -> Scraper:
+    return Scraper(f'http://127.0.0.1:{pages.server_address[1]}/5',
+                   {'text': {'type': {'default': 'HTTP'}}}, method='GET',
+                   useragent='ProxyEater', cache=cache, min_refresh=min_refresh)
+
+
+def test_an_unchanged_page_is_not_downloaded_again(pages, tmp_path):
+    pages.delay = 0
+    cache = SourceCache(tmp_path / 'sources.json')
+    first = cached_scraper(pages, cache).get_proxies()
+    cache.save()
+
+    cache = SourceCache(tmp_path / 'sources.json')
+    second = cached_scraper(pages, cache).get_proxies()
+
+    assert first.count == second.count == 3
+    assert set(first) == set(second)
+    assert cache.revalidations == 1
+    assert pages.requests == ['/5', '/5']
+
+
+def test_a_fresh_page_is_not_requested(pages, tmp_path):
+    pages.delay = 0
+    cache = SourceCache(tmp_path / 'sources.json')
+    cached_scraper(pages, cache, min_refresh=300).get_proxies()
+
+    proxies = cached_scraper(pages, cache, min_refresh=300).get_proxies()
+
+    assert proxies.count == 3
+    assert cache.hits == 1
+    assert pages.requests == ['/5']
+    with pytest.raises(ValueError, match='refresh'):
+        cached_scraper(pages, cache, min_refresh=-1)
+
+
+@pytest.mark.parametrize('config, expected', [
+    ({'type': {'default': 'HTTP'}},
+     {('1.2.3.4', 80, ProxyType.HTTP), ('5.6.7.8', 1080, ProxyType.SOCKS5)}),
+    ({'pattern': r'(?P<ip>[\d.]+)</td><td>(?P<port>\d+)',
+      'type': {'default': 'SOCKS4'}},
+     {('9.9.9.9', 3128, ProxyType.SOCKS4)}),
+])
+def test_a_regex_source_finds_the_proxies_in_any_page(pages, config, expected):
+    pages.delay = 0
+    pages.lists['/page'] = (
+        '<p>Try 1.2.3.4:80 or socks5://5.6.7.8:1080 today</p><table>'
+        '<tr><td>9.9.9.9</td><td>3128</td></tr>'
+        '<tr><td>8.8.8.8</td><td>99999999</td></tr></table>'
+    )
+    scraper = Scraper(f'http://127.0.0.1:{pages.server_address[1]}/page',
+                      {'regex': config}, method='GET', useragent='ProxyEater')
+
+    proxies = scraper.get_proxies()
+
+    assert scraper.is_succeed
+    # The port out of range of 8.8.8.8 is skipped
+    assert {(proxy.ip, proxy.port, proxy.type) for proxy in proxies} == expected
+
+
+def parse_text(body: bytes, default_type: str = 'HTTP') -> list:
+    response = requests.Response()
+    response.raw = io.BytesIO(body)
+    response.headers['Content-Length'] = str(len(body))
+    scraper = Scraper('http://127.0.0.1/',
+                      {'text': {'type': {'default': default_type}}},
+                      method='GET', useragent='ProxyEater')
+    progress = []
+    proxies = scraper._parse_text(response, progress.append)
+    assert not progress or progress == sorted(progress) and progress[-1] <= 99
+    return [(proxy.ip, proxy.port, proxy.type) for proxy in proxies]
+
+
+def test_the_schemes_of_the_text_lines_pick_the_type():
+    body = (b'\xef\xbb\xbf1.1.1.1:80\r\n'
+            b'http://2.2.2.2:81\n'
+            b'HTTPS://3.3.3.3:82\n'
+            b'socks4://4.4.4.4:83\n'
+            b'  socks5h://5.5.5.5 : 84  \n'
+            b'ftp://6.6.6.6:85\n'
+            b'7.7.7.7:86')
+
+    assert parse_text(body, 'SOCKS5') == [
+        ('1.1.1.1', 80, ProxyType.SOCKS5), ('2.2.2.2', 81, ProxyType.HTTP),
+        ('3.3.3.3', 82, ProxyType.HTTPS), ('4.4.4.4', 83, ProxyType.SOCKS4),
+        ('5.5.5.5', 84, ProxyType.SOCKS5), ('6.6.6.6', 85, ProxyType.SOCKS5),
+        ('7.7.7.7', 86, ProxyType.SOCKS5)
+    ]
+
+
+def test_the_lines_that_are_not_proxies_are_skipped():
+    body = (b'# A free proxy list\n\n'
+            b'1.1.1.1:80 HTTP elite\n'
+            b'1.1.1.1\n'
+            b'2.2.2.2:8080\n'
+            b':3128\n')
+
+    assert parse_text(body) == [('2.2.2.2', 8080, ProxyType.HTTP)]
+
+
+def test_an_empty_text_body_has_no_proxies():
+    assert parse_text(b'') == []
+
+
+def test_the_lines_split_between_pieces_are_joined(monkeypatch):
+    # The package exports the class under the name of its module
+    monkeypatch.setattr(sys.modules['ProxyEater.Scraper'], 'CHUNK_SIZE', 5)
+    lines = [f'10.0.0.{index}:{8000 + index}' for index in range(1, 40)]
+
+    proxies = parse_text('\n'.join(lines).encode())
+
+    assert [f'{ip}:{port}' for ip, port, _ in proxies] == lines
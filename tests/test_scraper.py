@@ -0,0 +1,86 @@
+# tests/test_scraper.py
+# CodeWriter21
+
+import pytest
+
+from ProxyEater import ProxyType
+from ProxyEater.Scraper import Scraper
+
+# The sources with "engine": "pandas" need the pandas extra
+pandas = pytest.importorskip('pandas')
+
+
+def table_scraper(**config) -> Scraper:
+    return Scraper('http://127.0.0.1/', {'pandas': dict(config, engine='pandas')},
+                   method='GET', useragent='ProxyEater')
+
+
+def proxies_of(scraper: Scraper, dataframe: pandas.DataFrame) -> set:
+    return {(proxy.ip, proxy.port, proxy.type)
+            for proxy in scraper._parse_dataframe(dataframe)}
+
+
+def test_the_rows_with_an_invalid_port_are_skipped():
+    dataframe = pandas.DataFrame({
+        'IP': [' 1.1.1.1 ', '2.2.2.2', '3.3.3.3', '4.4.4.4', '5.5.5.5'],
+        'Port': ['80', ' 8080 ', 'n/a', None, '3128.5']
+    })
+    scraper = table_scraper(ip='IP', port='Port', type={'default': 'HTTP'})
+
+    assert proxies_of(scraper, dataframe) == {
+        ('1.1.1.1', 80, ProxyType.HTTP), ('2.2.2.2', 8080, ProxyType.HTTP)
+    }
+
+
+def test_the_float_ports_are_truncated_like_int():
+    dataframe = pandas.DataFrame({'IP': ['1.1.1.1', '2.2.2.2'],
+                                  'Port': [80.0, float('nan')]})
+    scraper = table_scraper(ip='IP', port='Port', type={'default': 'HTTP'})
+
+    assert proxies_of(scraper, dataframe) == {('1.1.1.1', 80, ProxyType.HTTP)}
+
+
+def test_the_protocol_column_picks_the_type():
+    dataframe = pandas.DataFrame({
+        'IP': ['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4', '5.5.5.5'],
+        'Port': [1, 2, 3, 4, 5],
+        'Protocol': ['HTTP', ' https ', 'socks4', 'SOCKS5', 'ftp']
+    })
+    scraper = table_scraper(ip='IP', port='Port', type={
+        'default': 'HTTP', 'protocols': {
+            'header': 'Protocol', 'http': 'http', 'https': 'https',
+            'socks4': 'socks4', 'socks5': 'socks5'
+        }
+    })
+
+    assert [type_ for _, _, type_ in sorted(proxies_of(scraper, dataframe))] == [
+        ProxyType.HTTP, ProxyType.HTTPS, ProxyType.SOCKS4, ProxyType.SOCKS5,
+        ProxyType.HTTP
+    ]
+
+
+def test_the_https_column_picks_the_type():
+    dataframe = pandas.DataFrame({
+        'IP': ['1.1.1.1', '2.2.2.2'], 'Port': [1, 2], 'Https': ['yes', 'no']
+    })
+    scraper = table_scraper(ip='IP', port='Port', type={
+        'default': 'HTTP', 'is_https_header': 'Https', 'is_https_value': 'yes'
+    })
+
+    assert proxies_of(scraper, dataframe) == {
+        ('1.1.1.1', 1, ProxyType.HTTPS), ('2.2.2.2', 2, ProxyType.HTTP)
+    }
+
+
+def test_the_combined_column_is_split():
+    dataframe = pandas.DataFrame({'Proxy': ['1.1.1.1:80', 'broken', '2.2.2.2:x']})
+    scraper = table_scraper(combined='Proxy', type={'default': 'SOCKS5'})
+
+    assert proxies_of(scraper, dataframe) == {('1.1.1.1', 80, ProxyType.HTTP)}
+
+
+def test_a_missing_column_gives_no_proxies():
+    dataframe = pandas.DataFrame({'IP': ['1.1.1.1'], 'Port': [80]})
+    scraper = table_scraper(ip='Address', port='Port', type={'default': 'HTTP'})
+
+    assert proxies_of(scraper, dataframe) == set()
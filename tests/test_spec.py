@@ -0,0 +1,77 @@
+# tests/test_spec.py
+# CodeWriter21
+
+import re
+
+import pytest
+
+from ProxyEater import ProxyType
+from ProxyEater.Spec import ParserSpec, compile_parser, DEFAULT_REGEX
+
+TABLE = {'pandas': {'table_index': 0, 'ip': 'IP Address', 'port': 'Port'}}
+
+
+def test_the_spec_of_a_config_is_made_once():
+    spec = compile_parser(TABLE)
+    # The same config in another order is the same spec
+    same = compile_parser({'pandas': {'port': 'Port', 'ip': 'IP Address',
+                                      'table_index': 0}})
+    assert spec is same
+    assert isinstance(spec, ParserSpec)
+    with pytest.raises(TypeError):
+        spec.config['ip'] = 'IP'  # Shared by the scrapers, so read only
+
+
+def test_the_defaults_are_filled_in():
+    spec = compile_parser(TABLE)
+    assert spec.type == 'pandas'
+    assert spec.table_engine == 'builtin'
+    assert spec.default_type == ProxyType.HTTP
+    assert spec.is_https_value == 'yes'
+    assert (spec.pages_start, spec.pages_end, spec.pages_step) == (1, 'no-proxy', 1)
+    assert spec.pattern is None
+
+
+def test_html_is_another_name_of_pandas():
+    spec = compile_parser({'html': {'ip': 'IP', 'port': 'Port', 'engine': 'pandas'}})
+    assert spec.type == 'pandas'
+    assert spec.table_engine == 'pandas'
+
+
+def test_the_first_protocol_wins():
+    spec = compile_parser({'pandas': {'type': {'protocols': {
+        'header': 'Type', 'http': 'proxy', 'socks5': 'proxy', 'socks4': 's4'
+    }}}})
+    assert spec.protocols_header == 'Type'
+    assert spec.protocol_map['proxy'] == ProxyType.HTTP
+    assert spec.protocol_map['s4'] == ProxyType.SOCKS4
+    assert spec.protocol_map['HTTPS'] == ProxyType.HTTPS
+
+
+@pytest.mark.parametrize('parser', [
+    {},
+    {'xml': {}},
+    {'pandas': {'engine': 'lxml'}},
+    {'json': {'pages': {'end': 'last'}}},
+    {'json': {'pages': {'start': 5, 'end': 2}}},
+    {'regex': {'pattern': '(?P<ip>'}},
+    {'regex': {'pattern': r'(?P<ip>\S+) (\d+)'}},
+])
+def test_the_invalid_configs_are_rejected(parser: dict):
+    with pytest.raises(ValueError):
+        compile_parser(parser)
+
+
+def test_the_regex_parser_compiles_its_pattern():
+    spec = compile_parser({'regex': {'pattern': r'(?P<ip>[\d.]+)\|(?P<port>\d+)'}})
+    assert spec.pattern.findall(b'1.2.3.4|80 5.6.7.8|3128') == [
+        (b'1.2.3.4', b'80'), (b'5.6.7.8', b'3128')
+    ]
+    assert compile_parser({'regex': {}}).pattern.pattern == DEFAULT_REGEX.encode()
+
+
+def test_the_default_regex_finds_the_addresses_and_schemes():
+    body = 'socks5://1.2.3.4:1080, 5.6.7.8 : 3128 and 11.2.3.4:123456 or 9.9.9.9.9:80'
+    matches = [match.group('scheme', 'ip', 'port')
+               for match in re.finditer(DEFAULT_REGEX, body)]
+    assert matches == [('socks5', '1.2.3.4', '1080'), (None, '5.6.7.8', '3128')]
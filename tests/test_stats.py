@@ -0,0 +1,95 @@
+# tests/test_stats.py
+# CodeWriter21
+
+import pytest
+
+from ProxyEater import Proxy, ProxyType
+from ProxyEater.Stats import SourceStats
+
+
+def make_stats(tmp_path, **kwargs) -> SourceStats:
+    return SourceStats(tmp_path / 'source-stats.json', **kwargs)
+
+
+def test_the_recent_runs_weigh_more(tmp_path):
+    stats = make_stats(tmp_path, decay=0.75)
+    stats.record('source', fetched=100, unique=80, seconds=2, failed=False,
+                 checked=80, alive=8)
+    stats.record('source', fetched=200, unique=40, seconds=4, failed=True,
+                 checked=40, alive=0)
+
+    entry = stats.get('source')
+    assert entry['runs'] == 2
+    assert entry['fetched'] == pytest.approx(125)
+    assert entry['unique'] == pytest.approx(70)
+    assert entry['alive'] == pytest.approx(6)
+    assert entry['errors'] == pytest.approx(0.25)
+    assert stats.yield_of('source') == pytest.approx(6 / 2.5)
+
+
+def test_the_unchecked_sources_have_no_yield(tmp_path):
+    stats = make_stats(tmp_path)
+    stats.record('unchecked', fetched=100, unique=100, seconds=1, failed=False)
+    stats.record('empty', fetched=0, unique=0, seconds=1, failed=False,
+                 checked=0, alive=0)
+
+    assert stats.yield_of('unchecked') is None
+    assert stats.yield_of('empty') == 0  # Listing nothing gave nothing
+    assert stats.yield_of('never-scraped') is None
+    assert stats.get('never-scraped') is None
+
+
+def test_the_best_sources_come_first(tmp_path):
+    stats = make_stats(tmp_path)
+    stats.record('slow', fetched=100, unique=100, seconds=10, failed=False,
+                 checked=100, alive=10)
+    stats.record('fast', fetched=100, unique=100, seconds=1, failed=False,
+                 checked=100, alive=10)
+    sources = [{'id': 'slow'}, {'id': 'fast'}, {'id': 'new'}]
+
+    assert [source['id'] for source in stats.order(sources)] == ['new', 'fast', 'slow']
+
+    slow, fast, new = (Proxy('10.0.0.1', port, ProxyType.HTTP) for port in (1, 2, 3))
+    key = stats.check_order({slow: 'slow', fast: 'fast', new: 'new'})
+    assert sorted([slow, fast, new], key=key) == [new, fast, slow]
+
+
+def test_a_low_yield_source_is_retried_now_and_then(tmp_path):
+    stats = make_stats(tmp_path, retry_after=2)
+    stats.record('poor', fetched=100, unique=100, seconds=10, failed=False,
+                 checked=100, alive=1)
+
+    assert not stats.skip('poor', min_yield=0.05)
+    assert [stats.skip('poor', min_yield=1) for _ in range(3)] == [True, True, False]
+    # Scraping it again starts the count over
+    stats.record('poor', fetched=100, unique=100, seconds=10, failed=False,
+                 checked=100, alive=1)
+    assert stats.skip('poor', min_yield=1)
+
+
+def test_the_statistics_are_saved(tmp_path):
+    stats = make_stats(tmp_path)
+    stats.record('source', fetched=100, unique=80, seconds=2, failed=False,
+                 checked=80, alive=8)
+    stats.record('unchecked', fetched=10, unique=10, seconds=1, failed=True)
+    stats.save()
+
+    loaded = make_stats(tmp_path)
+    assert len(loaded) == 2
+    assert loaded.get('source') == stats.get('source')
+    assert loaded.report().splitlines() == [
+        'Source     Runs  Fetched  Unique  Alive  Alive/s  Seconds  Errors',
+        'source        1      100      80    8.0     4.00     2.00      0%',
+        'unchecked     1       10      10      -        -     1.00    100%'
+    ]
+
+
+def test_a_damaged_file_is_ignored(tmp_path):
+    (tmp_path / 'source-stats.json').write_text('[1, 2')
+    assert len(make_stats(tmp_path)) == 0
+
+
+@pytest.mark.parametrize('kwargs', [{'decay': 1}, {'decay': -0.1}, {'retry_after': 0}])
+def test_the_invalid_settings_are_rejected(tmp_path, kwargs: dict):
+    with pytest.raises(ValueError):
+        make_stats(tmp_path, **kwargs)
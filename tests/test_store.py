@@ -0,0 +1,87 @@
+# tests/test_store.py
+# CodeWriter21
+
+import time
+
+import pytest
+
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyStatus, ProxyAnonymity
+from ProxyEater.Cache import proxy_key
+from ProxyEater.Store import ProxyStore
+
+
+def make_proxy(port: int, status: ProxyStatus = ProxyStatus.UNKNOWN) -> Proxy:
+    proxy = Proxy('10.0.0.1', port, ProxyType.HTTP)
+    proxy.status = status
+    return proxy
+
+
+def test_the_sightings_are_recorded(tmp_path):
+    store = ProxyStore(tmp_path / 'state.json')
+    store.record_seen([make_proxy(1), make_proxy(2)], 'first-source')
+    store.record_seen([make_proxy(1)], 'second-source')
+    store.record_seen([make_proxy(1)], 'second-source')
+
+    assert store.new == 2
+    sightings = store.sightings(make_proxy(1))
+    assert sightings['sources'] == ['first-source', 'second-source']
+    assert sightings['first_seen'] <= sightings['last_seen']
+    assert store.sightings(make_proxy(3)) is None
+
+
+def test_the_seen_proxies_are_checked_until_they_have_a_result(tmp_path):
+    store = ProxyStore(tmp_path / 'state.json')
+    store.record_seen([make_proxy(1), make_proxy(2)], 'source')
+    assert store.get(make_proxy(1)) is None  # Seen but never checked
+
+    alive = make_proxy(1, ProxyStatus.ALIVE)
+    alive.latency = 0.5
+    alive.anonymity = ProxyAnonymity.ELITE
+    store.store([alive, make_proxy(2)])  # The UNKNOWN one is not a result
+
+    to_check = store.apply(ProxyList([make_proxy(1), make_proxy(2)]))
+    assert {proxy.port for proxy in to_check} == {2}
+    # The results keep the sightings
+    assert store.sightings(make_proxy(1))['sources'] == ['source']
+
+
+def test_the_alive_proxies_are_listed_from_the_store(tmp_path):
+    store = ProxyStore(tmp_path / 'state.json', alive_ttl=60)
+    alive = make_proxy(1, ProxyStatus.ALIVE)
+    alive.latency = 0.5
+    alive.anonymity = ProxyAnonymity.ELITE
+    socks = Proxy('10.0.0.1', 4, ProxyType.SOCKS4)
+    socks.status = ProxyStatus.ALIVE
+    store.store([
+        alive, make_proxy(2, ProxyStatus.ALIVE), make_proxy(3, ProxyStatus.DEAD), socks
+    ])
+    store._entries[proxy_key(make_proxy(2))]['checked_at'] -= 120  # Stale
+
+    proxies = store.alive_proxies()
+
+    assert {proxy.port: proxy.type for proxy in proxies} == {
+        1: ProxyType.HTTP, 4: ProxyType.SOCKS4
+    }
+    proxy = next(proxy for proxy in proxies if proxy.port == 1)
+    assert proxy.status == ProxyStatus.ALIVE
+    assert proxy.latency == 0.5
+    assert proxy.anonymity == ProxyAnonymity.ELITE
+
+
+def test_the_proxies_no_source_lists_are_forgotten(tmp_path):
+    path = tmp_path / 'state.json'
+    store = ProxyStore(path, forget_after=3600)
+    store.record_seen([make_proxy(1), make_proxy(2)], 'source')
+    store.store([make_proxy(1, ProxyStatus.ALIVE)])
+    store._entries[proxy_key(make_proxy(2))]['last_seen'] = time.time() - 7200
+    store.save()
+
+    loaded = ProxyStore(path, forget_after=3600)
+    assert len(loaded) == 1
+    assert loaded.get(make_proxy(1))['status'] == 'alive'
+    assert loaded.sightings(make_proxy(1))['sources'] == ['source']
+
+
+def test_a_negative_forget_after_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ProxyStore(tmp_path / 'state.json', forget_after=-1)
@@ -0,0 +1,129 @@
+# tests/test_table.py
+# CodeWriter21
+
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from ProxyEater import ProxyType
+from ProxyEater.Scraper import Scraper
+from ProxyEater.Table import iter_table
+
+PAGE = '''<html><body>
+<table><tr><td></td></tr></table>
+<table class="menu"><tr><th>Menu</th></tr><tr><td>Home</td></tr></table>
+<table id="proxies" class="table striped">
+  <thead><tr><th>IP Address</th><th>Port</th><th>Protocol</th><th></th></tr></thead>
+  <tbody>
+    <tr><td> 1.1.1.1 </td><td>80</td><td>http</td><td>x</td></tr>
+    <tr><td>2.2.2.2</td><td>1080</td><td>socks5</td><td>y</td></tr>
+    <tr><td>3.3.3.3</td><td>n/a</td><td>http</td><td>z</td></tr>
+    <tr><td>4.4.4.4</td><td>8080</td><td>https</td><td>w</td></tr>
+  </tbody>
+</table>
+<table><tr><td>after</td></tr></table>
+</body></html>'''
+
+CONFIG = {'table_index': 1, 'ip': 'IP Address', 'port': 'Port', 'type': {
+    'default': 'HTTP', 'protocols': {
+        'header': 'Protocol', 'http': 'http', 'https': 'https',
+        'socks4': 'socks4', 'socks5': 'socks5'
+    }
+}}
+
+
+def test_the_rows_of_the_table_are_named_after_the_header():
+    rows = list(iter_table([PAGE], index=1))
+
+    assert len(rows) == 4
+    assert rows[0] == {'IP Address': '1.1.1.1', 'Port': '80', 'Protocol': 'http',
+                       'Unnamed: 3': 'x'}
+
+
+def test_the_selector_narrows_the_tables_counted():
+    # The empty table is not counted, as pandas skips it too
+    assert list(iter_table([PAGE], selector='table.menu')) == [{'Menu': 'Home'}]
+    assert len(list(iter_table([PAGE], selector='#proxies'))) == 4
+    with pytest.raises(ValueError, match='no table'):
+        list(iter_table([PAGE], index=5))
+
+
+def test_the_spans_are_expanded_and_the_repeated_names_numbered():
+    page = '''<table>
+      <tr><th>A</th><th>A</th><th>B</th></tr>
+      <tr><td colspan="2">wide</td><td rowspan="2">tall</td></tr>
+      <tr><td>1</td><td>2</td></tr>
+    </table>'''
+
+    assert list(iter_table([page])) == [
+        {'A': 'wide', 'A.1': 'wide', 'B': 'tall'},
+        {'A': '1', 'A.1': '2', 'B': 'tall'}
+    ]
+
+
+def test_the_page_is_not_read_after_the_table():
+    read = []
+
+    def chunks():
+        for index in range(0, len(PAGE), 64):
+            read.append(index)
+            yield PAGE[index:index + 64]
+
+    assert len(list(iter_table(chunks(), index=1))) == 4
+    assert len(read) < len(range(0, len(PAGE), 64))
+
+
+def test_a_negative_index_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_table([PAGE], index=-1))
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = PAGE.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def page_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, args=(0.05, ), daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+def scraped(url: str, config: dict) -> set:
+    scraper = Scraper(url, {'html': config}, method='GET', useragent='ProxyEater')
+    proxies = scraper.get_proxies()
+    assert scraper.is_succeed
+    return {(proxy.ip, proxy.port, proxy.type) for proxy in proxies}
+
+
+def test_the_scraper_reads_the_table_with_the_builtin_parser(page_url):
+    assert scraped(page_url, CONFIG) == {
+        ('1.1.1.1', 80, ProxyType.HTTP), ('2.2.2.2', 1080, ProxyType.SOCKS5),
+        ('4.4.4.4', 8080, ProxyType.HTTPS)
+    }
+
+
+def test_the_builtin_parser_agrees_with_pandas(page_url):
+    pytest.importorskip('pandas')
+    pytest.importorskip('lxml')
+
+    assert scraped(page_url, dict(CONFIG, engine='pandas')) == \
+        scraped(page_url, CONFIG)
+
+
+def test_an_unknown_engine_is_rejected():
+    with pytest.raises(ValueError, match='engine'):
+        Scraper('http://127.0.0.1/', {'pandas': {'engine': 'soup'}}, useragent='x')
@@ -0,0 +1,78 @@
+# tests/test_timeout.py
+# CodeWriter21
+
+import time
+import asyncio
+
+import pytest
+
+from ProxyEater import Proxy, ProxyList, ProxyType, ProxyStatus, AsyncProxyChecker
+from ProxyEater.Checker import ProxyChecker
+from ProxyEater.Timeout import TimeoutPolicy
+
+URL = 'http://example.com/'
+
+
+def test_one_number_is_used_for_both_timeouts():
+    assert TimeoutPolicy(3).get() == (3, 3)
+    assert TimeoutPolicy((1, 4)).get() == (1, 4)
+
+
+@pytest.mark.parametrize('timeout', [0, (1, 0), -2])
+def test_the_timeouts_must_be_positive(timeout):
+    with pytest.raises(ValueError):
+        TimeoutPolicy(timeout)
+
+
+def test_the_adaptive_timeouts_follow_the_percentile_of_the_latencies():
+    policy = TimeoutPolicy((2, 10), adaptive_percentile=50, min_samples=5)
+    for latency in (0.9, 0.1, 0.7, 0.3):
+        policy.record(latency)
+    assert policy.get() == (2, 10)  # Not enough samples yet
+
+    policy.record(0.5)
+    assert policy.get() == (0.5, 0.5)
+
+
+def test_the_adaptive_timeouts_keep_the_minimum():
+    policy = TimeoutPolicy(10, adaptive_percentile=10, min_samples=1, minimum=0.5)
+    policy.record(0.01)
+    assert policy.get() == (0.5, 0.5)
+
+
+def test_the_remaining_budget_caps_the_timeouts():
+    policy = TimeoutPolicy((2, 10))
+    assert policy.get(remaining=5) == (2, 5)
+    assert policy.get(remaining=-1) == (0.001, 0.001)
+
+
+def make_slow_proxies(fake_proxy, count: int = 3) -> ProxyList:
+    return ProxyList(
+        Proxy('127.0.0.1', fake_proxy(delay=1).port, ProxyType.HTTP)
+        for _ in range(count)
+    )
+
+
+def test_the_budget_marks_the_unfinished_proxies_unknown_threads(fake_proxy):
+    proxies = make_slow_proxies(fake_proxy)
+
+    start_time = time.perf_counter()
+    with ProxyChecker(threads_no=1, timeout=5, url=URL, budget=0.3) as checker:
+        checker.check(proxies)
+
+    assert time.perf_counter() - start_time < 1
+    assert len(proxies) == 3
+    assert all(proxy.status == ProxyStatus.UNKNOWN for proxy in proxies)
+
+
+def test_the_budget_marks_the_unfinished_proxies_unknown_async(fake_proxy):
+    proxies = make_slow_proxies(fake_proxy)
+
+    start_time = time.perf_counter()
+    asyncio.run(
+        AsyncProxyChecker(timeout=5, concurrency=1, url=URL, budget=0.3).check(proxies)
+    )
+
+    assert time.perf_counter() - start_time < 1
+    assert len(proxies) == 3
+    assert all(proxy.status == ProxyStatus.UNKNOWN for proxy in proxies)